@@ -0,0 +1,154 @@
+"""
+Async variants of the core routes in `calculations.py`, backed by an AsyncSession.
+
+Only the per-request hot path is ported; the batch and export routes keep
+their sync implementations, which `main.py` serves alongside these.
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import calculation_stats, calculation_versions, models, schemas
+from .calculations import CREATE_RESPONSES, READ_COLUMNS, decode_cursor, encode_cursor, queue_calculation, rows_to_json
+from .dependencies import get_async_db
+from .factory import CalculationFactory
+from .response_cache import response_cache
+from .security import get_current_user_async
+from .write_behind import write_behind
+
+router = APIRouter(prefix="/calculations", tags=["calculations"])
+
+async def _get_owned_calculation(db: AsyncSession, id: int, user_id: int) -> models.Calculation:
+    result = await db.execute(
+        select(models.Calculation).where(models.Calculation.id == id, models.Calculation.user_id == user_id)
+    )
+    calculation = result.scalars().first()
+    if calculation is None:
+        raise HTTPException(status_code=404, detail="Calculation not found")
+    return calculation
+
+@router.get("/", response_model=List[schemas.CalculationRead])
+async def read_calculations(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
+):
+    version = await db.run_sync(calculation_versions.current, current_user.id)
+    etag = calculation_versions.make_etag(current_user.id, version, "list", skip, limit, cursor)
+    if calculation_versions.etag_matches(if_none_match, etag):
+        return calculation_versions.not_modified(etag)
+    cached = response_cache.get(current_user.id, etag)
+    if cached is not None:
+        return cached.to_response(etag)
+
+    query = (
+        select(*READ_COLUMNS)
+        .where(models.Calculation.user_id == current_user.id)
+        .order_by(models.Calculation.id)
+    )
+    if cursor is not None:
+        query = query.where(models.Calculation.id > decode_cursor(cursor))
+    elif skip:
+        query = query.offset(skip)
+
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].id)
+    body = rows_to_json(rows)
+    return response_cache.put(current_user.id, etag, body, headers).to_response(etag)
+
+@router.get("/stats", response_model=schemas.CalculationStatsRead)
+async def read_calculation_stats(db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_user_async)):
+    return await db.run_sync(calculation_stats.read_stats, current_user.id)
+
+@router.get("/{id}", response_model=schemas.CalculationRead)
+async def read_calculation(id: int, if_none_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_user_async)):
+    version = await db.run_sync(calculation_versions.current, current_user.id)
+    etag = calculation_versions.make_etag(current_user.id, version, id)
+    if calculation_versions.etag_matches(if_none_match, etag):
+        return calculation_versions.not_modified(etag)
+    cached = response_cache.get(current_user.id, etag)
+    if cached is not None:
+        return cached.to_response(etag)
+
+    row = (await db.execute(
+        select(*READ_COLUMNS).where(models.Calculation.id == id, models.Calculation.user_id == current_user.id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Calculation not found")
+    body = to_json(row._asdict(), inf_nan_mode="null")
+    return response_cache.put(current_user.id, etag, body).to_response(etag)
+
+@router.post("/", response_model=schemas.CalculationRead, status_code=status.HTTP_201_CREATED, responses=CREATE_RESPONSES)
+async def create_calculation(calculation_in: schemas.CalculationCreate, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_user_async)):
+    try:
+        result = CalculationFactory.create_calculation(calculation_in.a, calculation_in.b, calculation_in.type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if write_behind.enabled:
+        # Buffering never blocks, so it is safe on the event loop
+        return queue_calculation(calculation_in, result, current_user.id)
+
+    calculation = models.Calculation(
+        a=calculation_in.a,
+        b=calculation_in.b,
+        type=calculation_in.type,
+        result=result,
+        user_id=current_user.id
+    )
+    db.add(calculation)
+    await db.flush()
+    await db.run_sync(calculation_stats.record_added, current_user.id, [calculation])
+    await db.run_sync(calculation_versions.bump, current_user.id)
+    await db.commit()
+    response_cache.invalidate_user(current_user.id)
+    # Load the server-generated created_at
+    await db.refresh(calculation)
+    return calculation
+
+@router.put("/{id}", response_model=schemas.CalculationRead)
+async def update_calculation(id: int, calculation_in: schemas.CalculationCreate, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_user_async)):
+    calculation = await _get_owned_calculation(db, id, current_user.id)
+
+    try:
+        result = CalculationFactory.create_calculation(calculation_in.a, calculation_in.b, calculation_in.type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    old_type, old_result = calculation.type, calculation.result
+    calculation.a = calculation_in.a
+    calculation.b = calculation_in.b
+    calculation.type = calculation_in.type
+    calculation.result = result
+    await db.flush()
+
+    # A recomputed summary row already includes the updated calculation
+    refreshed = await db.run_sync(calculation_stats.record_removed, current_user.id, old_type, old_result, calculation.created_at)
+    if not (refreshed and old_type == calculation.type):
+        await db.run_sync(calculation_stats.record_added, current_user.id, [calculation])
+    await db.run_sync(calculation_versions.bump, current_user.id)
+
+    await db.commit()
+    response_cache.invalidate_user(current_user.id)
+    return calculation
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_calculation(id: int, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_user_async)):
+    calculation = await _get_owned_calculation(db, id, current_user.id)
+
+    await db.delete(calculation)
+    await db.flush()
+    await db.run_sync(calculation_stats.record_removed, current_user.id, calculation.type, calculation.result, calculation.created_at)
+    await db.run_sync(calculation_versions.bump, current_user.id)
+    await db.commit()
+    response_cache.invalidate_user(current_user.id)
+    return None
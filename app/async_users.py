@@ -0,0 +1,111 @@
+"""
+Async variants of the routes in `users.py`, backed by an AsyncSession.
+
+Enabled with DATABASE_ASYNC=true; see `main.py` for how they replace the sync routes.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, schemas, security
+from .dependencies import get_async_db
+
+
+router = APIRouter(prefix="/users", tags=["users"])
+
+
+@router.post("/register", response_model=schemas.UserRead, status_code=status.HTTP_201_CREATED)
+async def create_user(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    user = models.User(
+        username=user_in.username,
+        email=user_in.email,
+        password_hash=await security.hash_password_async(user_in.password),
+    )
+    db.add(user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Username or email already exists")
+    security.user_cache.invalidate(user_in.username)
+    await db.refresh(user)
+    return user
+
+
+@router.post("/login", response_model=schemas.Token)
+async def login(
+    credentials: schemas.LoginRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not credentials.username and not credentials.email:
+        raise HTTPException(status_code=400, detail="Username or email is required")
+
+    query = select(models.User)
+    if credentials.username:
+        query = query.where(models.User.username == credentials.username)
+    if credentials.email:
+        query = query.where(models.User.email == credentials.email)
+
+    user = (await db.execute(query)).scalars().first()
+    if not user or not await security.verify_password_async(credentials.password, user.password_hash):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    access_token_expires = security.timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = security.create_access_token(
+        data={"sub": user.username}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.put("/me", response_model=schemas.UserRead)
+async def update_user_me(
+    user_update: schemas.UserUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(security.get_current_user_async),
+):
+    previous_username = current_user.username
+    if user_update.username:
+        # Check if username already exists
+        result = await db.execute(select(models.User).where(models.User.username == user_update.username))
+        existing_user = result.scalars().first()
+        if existing_user and existing_user.id != current_user.id:
+            raise HTTPException(status_code=400, detail="Username already taken")
+        current_user.username = user_update.username
+
+    if user_update.email:
+        # Check if email already exists
+        result = await db.execute(select(models.User).where(models.User.email == user_update.email))
+        existing_user = result.scalars().first()
+        if existing_user and existing_user.id != current_user.id:
+            raise HTTPException(status_code=400, detail="Email already taken")
+        current_user.email = user_update.email
+
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Username or email already exists")
+    security.user_cache.invalidate(previous_username, current_user.username)
+
+    return current_user
+
+
+@router.post("/me/password", status_code=status.HTTP_200_OK)
+async def change_password(
+    password_change: schemas.PasswordChange,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(security.get_current_user_async),
+):
+    if not await security.verify_password_async(password_change.old_password, current_user.password_hash):
+        raise HTTPException(status_code=400, detail="Incorrect old password")
+
+    if password_change.old_password == password_change.new_password:
+        raise HTTPException(status_code=400, detail="New password cannot be the same as old password")
+
+    current_user.password_hash = await security.hash_password_async(password_change.new_password)
+    await db.commit()
+    security.user_cache.invalidate(current_user.username)
+
+    return {"message": "Password updated successfully"}
@@ -0,0 +1,223 @@
+"""
+Incrementally maintained per-user calculation statistics.
+
+`calculation_stats` holds one row per (user, operation type) with the count,
+sum, min and max of `result` and the latest `created_at`. The write paths in
+`calculations.py` call `record_added` / `record_removed` in the same
+transaction as the change itself, so GET /calculations/stats reads a handful
+of rows instead of scanning the user's history.
+
+Counts and sums are adjusted atomically in SQL. Min, max and latest cannot be
+decremented, so removing a value on one of those boundaries recomputes that
+single (user, type) row from `calculations`. `rebuild` reconciles the whole
+table, e.g. after bulk changes made outside the API:
+
+    python -m app.calculation_stats rebuild [--user-id ID]
+"""
+
+import argparse
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+Stats = models.CalculationStats
+Calc = models.Calculation
+
+
+def _greatest(column, value):
+    return case((column.is_(None), value), (value > column, value), else_=column)
+
+
+def _least(column, value):
+    return case((column.is_(None), value), (value < column, value), else_=column)
+
+
+def _add_delta(db: Session, user_id: int, type: str, count: int, total: float,
+               min_result: float, max_result: float, last_created_at: Optional[datetime]) -> None:
+    """Atomically merge a delta of added rows into the (user_id, type) summary row."""
+    values = {
+        "user_id": user_id,
+        "type": type,
+        "count": count,
+        "total": total,
+        "min_result": min_result,
+        "max_result": max_result,
+        "last_created_at": last_created_at,
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(Stats).values(**values)
+        excluded = insert_stmt.excluded
+        db.execute(insert_stmt.on_conflict_do_update(
+            index_elements=[Stats.user_id, Stats.type],
+            set_={
+                "count": Stats.count + excluded.count,
+                "total": Stats.total + excluded.total,
+                "min_result": _least(Stats.min_result, excluded.min_result),
+                "max_result": _greatest(Stats.max_result, excluded.max_result),
+                "last_created_at": _greatest(Stats.last_created_at, excluded.last_created_at),
+            },
+        ))
+        return
+
+    updated = db.execute(
+        update(Stats)
+        .where(Stats.user_id == user_id, Stats.type == type)
+        .values(
+            count=Stats.count + count,
+            total=Stats.total + total,
+            min_result=_least(Stats.min_result, min_result),
+            max_result=_greatest(Stats.max_result, max_result),
+            last_created_at=_greatest(Stats.last_created_at, last_created_at),
+        )
+    )
+    if updated.rowcount == 0:
+        db.execute(insert(Stats).values(**values))
+
+
+def _deltas(rows: Iterable) -> dict:
+    """Group (type, result, created_at) tuples into type -> [count, total, min, max, latest]."""
+    deltas = {}
+    for type, result, created_at in rows:
+        delta = deltas.get(type)
+        if delta is None:
+            deltas[type] = [1, result, result, result, created_at]
+            continue
+        delta[0] += 1
+        delta[1] += result
+        delta[2] = min(delta[2], result)
+        delta[3] = max(delta[3], result)
+        if created_at is not None and (delta[4] is None or created_at > delta[4]):
+            delta[4] = created_at
+    return deltas
+
+
+def record_added(db: Session, user_id: int, calculations: Iterable[models.Calculation]) -> None:
+    """Account for calculations that were just inserted (or now carry new values)."""
+    deltas = _deltas((calculation.type, calculation.result, calculation.created_at) for calculation in calculations)
+    for type, (count, total, min_result, max_result, last_created_at) in deltas.items():
+        _add_delta(db, user_id, type, count, total, min_result, max_result, last_created_at)
+
+
+def _remove_delta(db: Session, user_id: int, type: str, count: int, total: float,
+                  min_result: float, max_result: float, last_created_at: Optional[datetime]) -> bool:
+    """Subtract a delta of removed rows from the (user_id, type) summary row; True if it was recomputed."""
+    row = db.execute(
+        select(Stats.count, Stats.min_result, Stats.max_result, Stats.last_created_at)
+        .where(Stats.user_id == user_id, Stats.type == type)
+    ).first()
+    if row is None:
+        return False
+    on_boundary = (
+        row.count <= count
+        or min_result <= row.min_result
+        or max_result >= row.max_result
+        or (last_created_at is not None and row.last_created_at is not None and last_created_at >= row.last_created_at)
+    )
+    if on_boundary:
+        refresh(db, user_id, type)
+        return True
+    db.execute(
+        update(Stats)
+        .where(Stats.user_id == user_id, Stats.type == type)
+        .values(count=Stats.count - count, total=Stats.total - total)
+    )
+    return False
+
+
+def record_removed(db: Session, user_id: int, type: str, result: float, created_at: Optional[datetime]) -> bool:
+    """
+    Account for a calculation that was deleted (or had its old values replaced).
+
+    The change to `calculations` must already be flushed. Returns True when the
+    summary row was recomputed from `calculations`, in which case it already
+    reflects every flushed row of that type.
+    """
+    return _remove_delta(db, user_id, type, 1, result, result, result, created_at)
+
+
+def record_removed_many(db: Session, user_id: int, rows: Iterable) -> None:
+    """Account for deleted rows, given as (type, result, created_at) tuples."""
+    for type, (count, total, min_result, max_result, last_created_at) in _deltas(rows).items():
+        _remove_delta(db, user_id, type, count, total, min_result, max_result, last_created_at)
+
+
+def _aggregate_query():
+    return select(
+        Calc.user_id,
+        Calc.type,
+        func.count().label("count"),
+        func.coalesce(func.sum(Calc.result), 0.0).label("total"),
+        func.min(Calc.result).label("min_result"),
+        func.max(Calc.result).label("max_result"),
+        func.max(Calc.created_at).label("last_created_at"),
+    ).group_by(Calc.user_id, Calc.type)
+
+
+def refresh(db: Session, user_id: int, type: str) -> None:
+    """Recompute one (user_id, type) summary row from `calculations`."""
+    db.execute(delete(Stats).where(Stats.user_id == user_id, Stats.type == type))
+    aggregate = db.execute(_aggregate_query().where(Calc.user_id == user_id, Calc.type == type)).first()
+    if aggregate is not None:
+        db.execute(insert(Stats).values(**aggregate._asdict()))
+
+
+def rebuild(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Recompute the summary rows of one user, or of every user, from `calculations`.
+
+    Returns the number of summary rows written. The caller commits.
+    """
+    clear = delete(Stats)
+    aggregate = _aggregate_query()
+    if user_id is not None:
+        clear = clear.where(Stats.user_id == user_id)
+        aggregate = aggregate.where(Calc.user_id == user_id)
+    db.execute(clear)
+    rows = [row._asdict() for row in db.execute(aggregate)]
+    if rows:
+        db.execute(insert(Stats), rows)
+    return len(rows)
+
+
+def read_stats(db: Session, user_id: int) -> schemas.CalculationStatsRead:
+    rows = db.execute(
+        select(Stats.type, Stats.count, Stats.total, Stats.min_result, Stats.max_result, Stats.last_created_at)
+        .where(Stats.user_id == user_id, Stats.count > 0)
+    ).all()
+    count = sum(row.count for row in rows)
+    total = sum(row.total for row in rows)
+    latest = [row.last_created_at for row in rows if row.last_created_at is not None]
+    return schemas.CalculationStatsRead(
+        count=count,
+        count_by_type={row.type: row.count for row in rows},
+        sum=total,
+        min=min((row.min_result for row in rows), default=None),
+        max=max((row.max_result for row in rows), default=None),
+        mean=total / count if count else None,
+        latest_created_at=max(latest, default=None),
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.calculation_stats", description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Reconcile calculation_stats with the calculations table")
+    rebuild_parser.add_argument("--user-id", type=int, default=None, help="Only rebuild this user's rows")
+    args = parser.parse_args(argv)
+
+    from .db import SessionLocal
+
+    with SessionLocal() as db:
+        written = rebuild(db, user_id=args.user_id)
+        db.commit()
+    print(f"Rebuilt {written} calculation_stats rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Per-user version counters and the ETags derived from them.
+
+Every write to a user's calculations bumps `calculation_versions.version` in
+the same transaction. The calculation reads derive a strong ETag from the
+version plus whatever selects the representation (an id, or the page
+parameters), so a conditional GET is answered with 304 after a single primary
+key lookup, without touching `calculations` or serializing anything.
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import Response, status
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+Version = models.CalculationVersion
+
+# Clients may keep the body but must revalidate before reusing it
+CACHE_CONTROL = "private, no-cache"
+
+
+def bump(db: Session, user_id: int) -> None:
+    """Atomically increment a user's version. The caller commits."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(Version).values(user_id=user_id, version=1)
+        db.execute(insert_stmt.on_conflict_do_update(
+            index_elements=[Version.user_id],
+            set_={"version": Version.version + 1},
+        ))
+        return
+
+    updated = db.execute(update(Version).where(Version.user_id == user_id).values(version=Version.version + 1))
+    if updated.rowcount == 0:
+        db.execute(insert(Version).values(user_id=user_id, version=1))
+
+
+def current(db: Session, user_id: int) -> int:
+    """A user's version; 0 before their first write."""
+    version = db.execute(select(Version.version).where(Version.user_id == user_id)).scalar()
+    return version or 0
+
+
+def make_etag(user_id: int, version: int, *key) -> str:
+    """Strong ETag for one representation of a user's calculations at `version`."""
+    raw = ":".join(str(part) for part in (user_id, version) + key)
+    return '"' + hashlib.blake2b(raw.encode(), digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 prescribes for this header)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
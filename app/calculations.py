@@ -1,42 +1,211 @@
-from typing import List
+import base64
+import binascii
+import csv
+import io
+import json
+import math
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy import and_, case, delete, distinct, false, func, insert, literal, not_, or_, select, true, update
 from sqlalchemy.orm import Session
 
-from . import models, schemas, operations
+from . import calculation_stats, calculation_versions, models, schemas
+from .factory import CalculationFactory
+from .operation_registry import OPERATIONS, OUT_OF_RANGE_ERROR, compute_batch, type_pattern
+from .response_cache import response_cache
+from .write_behind import write_behind
 from .users import security
 from .dependencies import get_db
 
+# Upper bound on the number of items accepted by POST /calculations/batch
+CALCULATION_BATCH_MAX_SIZE = int(os.getenv("CALCULATION_BATCH_MAX_SIZE", "1000"))
+
+# Rows fetched per round-trip by the server-side cursor behind GET /calculations/export
+CALCULATION_EXPORT_BATCH_SIZE = int(os.getenv("CALCULATION_EXPORT_BATCH_SIZE", "1000"))
+
+# Rows deleted or recomputed per statement (and per transaction) by the bulk
+# DELETE/PATCH routes, so that large jobs never hold locks for long
+CALCULATION_BULK_CHUNK_SIZE = int(os.getenv("CALCULATION_BULK_CHUNK_SIZE", "1000"))
+
+EXPORT_COLUMNS = ("id", "a", "b", "type", "result", "user_id", "created_at", "uuid")
+
+# Columns of the read path, in CalculationRead field order so that rows
+# serialize to the same JSON as the response model
+READ_COLUMNS = tuple(getattr(models.Calculation, name) for name in schemas.CalculationRead.model_fields)
+
 router = APIRouter(prefix="/calculations", tags=["calculations"])
 
+def encode_cursor(last_id: int) -> str:
+    """Build the opaque pagination cursor pointing just after `last_id`."""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def rows_to_json(rows) -> bytes:
+    """
+    Serialize READ_COLUMNS rows to a JSON array without building ORM objects or
+    models. pydantic-core's encoder is the one behind CalculationRead, and with
+    its inf/nan-as-null setting the bytes match serializing the rows through the
+    response model.
+    """
+    return to_json([row._asdict() for row in rows], inf_nan_mode="null")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_id = json.loads(raw)["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
 @router.get("/", response_model=List[schemas.CalculationRead])
-def read_calculations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
-    calculations = db.query(models.Calculation).filter(models.Calculation.user_id == current_user.id).offset(skip).limit(limit).all()
-    return calculations
+def read_calculations(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(security.get_current_user),
+):
+    etag = calculation_versions.make_etag(
+        current_user.id, calculation_versions.current(db, current_user.id), "list", skip, limit, cursor
+    )
+    if calculation_versions.etag_matches(if_none_match, etag):
+        return calculation_versions.not_modified(etag)
+    cached = response_cache.get(current_user.id, etag)
+    if cached is not None:
+        return cached.to_response(etag)
+
+    # Rows are ordered by id. With a cursor the page is a keyset seek on the
+    # (user_id, id) index; without one, skip/limit is kept for older clients.
+    query = (
+        select(*READ_COLUMNS)
+        .where(models.Calculation.user_id == current_user.id)
+        .order_by(models.Calculation.id)
+    )
+    if cursor is not None:
+        query = query.where(models.Calculation.id > decode_cursor(cursor))
+    elif skip:
+        query = query.offset(skip)
+
+    # Fetch one extra row to learn whether another page follows
+    rows = db.execute(query.limit(limit + 1)).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].id)
+    body = rows_to_json(rows)
+    return response_cache.put(current_user.id, etag, body, headers).to_response(etag)
+
+@router.get("/stats", response_model=schemas.CalculationStatsRead)
+def read_calculation_stats(db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
+    return calculation_stats.read_stats(db, current_user.id)
+
+def _iter_export_partitions(bind, user_id: int) -> Iterator[list]:
+    """
+    Stream a user's calculations in partitions of CALCULATION_EXPORT_BATCH_SIZE rows.
+
+    The request-scoped session is closed before a streaming body is sent, so the
+    export runs in its own session on the same bind (the engine, or the
+    connection a test has wrapped in a transaction).
+    """
+    columns = [getattr(models.Calculation, name) for name in EXPORT_COLUMNS]
+    stmt = (
+        select(*columns)
+        .where(models.Calculation.user_id == user_id)
+        .order_by(models.Calculation.id)
+        .execution_options(yield_per=CALCULATION_EXPORT_BATCH_SIZE)
+    )
+    with Session(bind=bind) as session:
+        yield from session.execute(stmt).partitions()
+
+def _export_ndjson(partitions: Iterator[list]) -> Iterator[bytes]:
+    for rows in partitions:
+        yield b"".join(
+            schemas.CalculationRead.model_validate(row, from_attributes=True).model_dump_json().encode() + b"\n"
+            for row in rows
+        )
+
+def _export_csv(partitions: Iterator[list]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in partitions:
+        for row in rows:
+            writer.writerow((row.id, row.a, row.b, row.type, row.result, row.user_id, row.created_at.isoformat(), row.uuid))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for a user with no calculations
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@router.get("/export")
+def export_calculations(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(security.get_current_user),
+):
+    partitions = _iter_export_partitions(db.get_bind(), current_user.id)
+    if format == "csv":
+        body, media_type = _export_csv(partitions), "text/csv"
+    else:
+        body, media_type = _export_ndjson(partitions), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="calculations.{format}"'},
+    )
 
 @router.get("/{id}", response_model=schemas.CalculationRead)
-def read_calculation(id: int, db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
-    calculation = db.query(models.Calculation).filter(models.Calculation.id == id, models.Calculation.user_id == current_user.id).first()
-    if calculation is None:
+def read_calculation(id: int, if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
+    etag = calculation_versions.make_etag(current_user.id, calculation_versions.current(db, current_user.id), id)
+    if calculation_versions.etag_matches(if_none_match, etag):
+        return calculation_versions.not_modified(etag)
+    cached = response_cache.get(current_user.id, etag)
+    if cached is not None:
+        return cached.to_response(etag)
+
+    row = db.execute(
+        select(*READ_COLUMNS).where(models.Calculation.id == id, models.Calculation.user_id == current_user.id)
+    ).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Calculation not found")
-    return calculation
+    body = to_json(row._asdict(), inf_nan_mode="null")
+    return response_cache.put(current_user.id, etag, body).to_response(etag)
 
-@router.post("/", response_model=schemas.CalculationRead, status_code=status.HTTP_201_CREATED)
+def queue_calculation(calculation_in: schemas.CalculationCreate, result: float, user_id: int) -> JSONResponse:
+    """Buffer a computed calculation for write-behind storage and acknowledge it with a 202."""
+    queued = schemas.CalculationQueued(
+        a=calculation_in.a,
+        b=calculation_in.b,
+        type=calculation_in.type,
+        result=result,
+        user_id=user_id,
+        created_at=datetime.now(timezone.utc),
+        uuid=str(uuid.uuid4()),
+    )
+    write_behind.submit(queued.model_dump())
+    return JSONResponse(content=queued.model_dump(mode="json"), status_code=status.HTTP_202_ACCEPTED)
+
+# Write-behind mode answers with a 202 instead, see app/write_behind.py
+CREATE_RESPONSES = {status.HTTP_202_ACCEPTED: {"model": schemas.CalculationQueued}}
+
+@router.post("/", response_model=schemas.CalculationRead, status_code=status.HTTP_201_CREATED, responses=CREATE_RESPONSES)
 def create_calculation(calculation_in: schemas.CalculationCreate, db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
-    # Perform calculation using operations module
     try:
-        if calculation_in.type == "add":
-            result = operations.add(calculation_in.a, calculation_in.b)
-        elif calculation_in.type == "subtract":
-            result = operations.subtract(calculation_in.a, calculation_in.b)
-        elif calculation_in.type == "multiply":
-            result = operations.multiply(calculation_in.a, calculation_in.b)
-        elif calculation_in.type == "divide":
-            result = operations.divide(calculation_in.a, calculation_in.b)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid calculation type")
+        result = CalculationFactory.create_calculation(calculation_in.a, calculation_in.b, calculation_in.type)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if write_behind.enabled:
+        return queue_calculation(calculation_in, result, current_user.id)
 
     calculation = models.Calculation(
         a=calculation_in.a,
@@ -46,10 +215,196 @@ def create_calculation(calculation_in: schemas.CalculationCreate, db: Session =
         user_id=current_user.id
     )
     db.add(calculation)
+    db.flush()
+    calculation_stats.record_added(db, current_user.id, [calculation])
+    calculation_versions.bump(db, current_user.id)
     db.commit()
+    response_cache.invalidate_user(current_user.id)
     db.refresh(calculation)
     return calculation
 
+def insert_calculations(db: Session, user_id: int, rows: List[dict]) -> List[models.Calculation]:
+    """
+    Insert already computed rows with one multi-row INSERT ... RETURNING and
+    account for them in the stats and the user's version. The caller commits.
+    """
+    stmt = insert(models.Calculation).returning(models.Calculation, sort_by_parameter_order=True)
+    created = db.scalars(stmt, rows).all()
+    calculation_stats.record_added(db, user_id, created)
+    calculation_versions.bump(db, user_id)
+    return created
+
+@router.post("/batch", response_model=schemas.CalculationBatchResult, status_code=status.HTTP_201_CREATED)
+def create_calculations_batch(batch_in: schemas.CalculationBatchCreate, db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
+    if len(batch_in.items) > CALCULATION_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size exceeds the maximum of {CALCULATION_BATCH_MAX_SIZE} items",
+        )
+
+    # Compute every item up front, one vectorized pass per operation type;
+    # failures (undefined or out-of-range results) are reported per item
+    # instead of aborting the whole batch, and never inserted.
+    items = batch_in.items
+    values, errors = compute_batch([item.type for item in items], [item.a for item in items], [item.b for item in items])
+    results = [schemas.CalculationBatchItemResult(index=index) for index in range(len(items))]
+    rows = []
+    row_indexes = []
+    for index, (item, result, error) in enumerate(zip(items, values.tolist(), errors)):
+        # Never insert a non-finite result, whatever produced it
+        if error is None and not math.isfinite(result):
+            error = OUT_OF_RANGE_ERROR
+        if error is not None:
+            results[index].error = error
+            continue
+        rows.append({"a": item.a, "b": item.b, "type": item.type, "result": result, "user_id": current_user.id})
+        row_indexes.append(index)
+
+    # Single multi-row INSERT ... RETURNING and a single commit for the whole batch
+    if rows:
+        created = insert_calculations(db, current_user.id, rows)
+        # Serialize before committing: RETURNING already populated every column,
+        # whereas the commit would expire the instances and force a reload each.
+        for index, calculation in zip(row_indexes, created):
+            results[index].calculation = schemas.CalculationRead.model_validate(calculation)
+        db.commit()
+        response_cache.invalidate_user(current_user.id)
+
+    return schemas.CalculationBatchResult(
+        created=len(rows),
+        failed=len(results) - len(rows),
+        results=results,
+    )
+
+def _bulk_conditions(user_id: int, ids: Optional[List[int]], type: Optional[str], created_before: Optional[datetime]) -> list:
+    if ids is None and type is None and created_before is None:
+        raise HTTPException(status_code=400, detail="At least one filter (ids, type, created_before) is required")
+    if ids is not None and len(ids) > CALCULATION_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {CALCULATION_BATCH_MAX_SIZE} ids are accepted",
+        )
+    Calc = models.Calculation
+    conditions = [Calc.user_id == user_id]
+    if ids is not None:
+        conditions.append(Calc.id.in_(ids))
+    if type is not None:
+        conditions.append(Calc.type == type)
+    if created_before is not None:
+        conditions.append(Calc.created_at < created_before)
+    return conditions
+
+def _bulk_chunks(db: Session, conditions: list) -> Iterator[list]:
+    """
+    Split the rows matching `conditions` into consecutive id windows of up to
+    CALCULATION_BULK_CHUNK_SIZE rows, yielding the conditions for each window.
+    """
+    Calc = models.Calculation
+    low = None
+    while True:
+        window = conditions + ([Calc.id > low] if low is not None else [])
+        high = db.execute(
+            select(Calc.id).where(*window).order_by(Calc.id).offset(CALCULATION_BULK_CHUNK_SIZE - 1).limit(1)
+        ).scalar()
+        if high is None:
+            yield window
+            return
+        yield window + [Calc.id <= high]
+        low = high
+
+def _recompute_window(db: Session, user_id: int, window: list, changes: schemas.CalculationChanges) -> tuple:
+    """
+    Apply `changes` to the rows of one window and recompute their results.
+
+    Operations with a SQL kernel are recomputed by a single UPDATE where their
+    operands cannot overflow; the rest are computed in one vectorized pass and
+    written back in one executemany.
+    Returns the numbers of rows updated and of rows left alone because the
+    result would be undefined.
+    """
+    Calc = models.Calculation
+    new_a = literal(changes.a) if changes.a is not None else Calc.a
+    new_b = literal(changes.b) if changes.b is not None else Calc.b
+    new_type = literal(changes.type) if changes.type is not None else Calc.type
+    sql_operations = [operation for operation in OPERATIONS.values() if operation.sql is not None]
+    undefined = or_(false(), *(
+        and_(new_type == operation.name, operation.sql_invalid(new_a, new_b))
+        for operation in sql_operations if operation.sql_invalid is not None
+    ))
+    # Rows whose operands could overflow are left to the vectorized path below
+    in_sql = or_(false(), *(
+        and_(new_type == operation.name, operation.sql_safe(new_a, new_b) if operation.sql_safe is not None else true())
+        for operation in sql_operations
+    ))
+
+    values = {"result": case(*((new_type == operation.name, operation.sql(new_a, new_b)) for operation in sql_operations))}
+    for column, value, changed in (("a", new_a, changes.a), ("b", new_b, changes.b), ("type", new_type, changes.type)):
+        if changed is not None:
+            values[column] = value
+    updated = db.execute(
+        update(Calc).where(*window, in_sql, not_(undefined)).values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    failed = db.execute(select(func.count()).select_from(Calc).where(*window, in_sql, undefined)).scalar()
+
+    rows = db.execute(select(Calc.id, new_a.label("a"), new_b.label("b"), new_type.label("type")).where(*window, not_(in_sql))).all()
+    if rows:
+        results, errors = compute_batch([row.type for row in rows], [row.a for row in rows], [row.b for row in rows])
+        params = [
+            {"id": row.id, "a": row.a, "b": row.b, "type": row.type, "result": result}
+            for row, result, error in zip(rows, results.tolist(), errors) if error is None
+        ]
+        if params:
+            # Bulk UPDATE by primary key: one executemany, still scoped to the user
+            db.execute(update(Calc).where(Calc.user_id == user_id).execution_options(synchronize_session=None), params)
+        updated += len(params)
+        failed += len(rows) - len(params)
+    return updated, failed
+
+@router.patch("/", response_model=schemas.CalculationBulkUpdateResult)
+def update_calculations(update_in: schemas.CalculationBulkUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
+    conditions = _bulk_conditions(current_user.id, update_in.ids, update_in.type, update_in.created_before)
+    updated = failed = 0
+    for window in _bulk_chunks(db, conditions):
+        # Min/max can move anywhere, so the affected summary rows are recomputed
+        types = set(db.scalars(select(distinct(models.Calculation.type)).where(*window)))
+        if update_in.set.type is not None:
+            types.add(update_in.set.type)
+        window_updated, window_failed = _recompute_window(db, current_user.id, window, update_in.set)
+        if window_updated:
+            for type in types:
+                calculation_stats.refresh(db, current_user.id, type)
+            calculation_versions.bump(db, current_user.id)
+        db.commit()
+        updated += window_updated
+        failed += window_failed
+    response_cache.invalidate_user(current_user.id)
+    return schemas.CalculationBulkUpdateResult(updated=updated, failed=failed)
+
+@router.delete("/", response_model=schemas.CalculationBulkDeleteResult)
+def delete_calculations(
+    ids: Optional[List[int]] = Query(None),
+    type: Optional[str] = Query(None, pattern=type_pattern()),
+    created_before: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(security.get_current_user),
+):
+    conditions = _bulk_conditions(current_user.id, ids, type, created_before)
+    Calc = models.Calculation
+    deleted = 0
+    for window in _bulk_chunks(db, conditions):
+        removed = db.execute(
+            delete(Calc).where(*window).returning(Calc.type, Calc.result, Calc.created_at)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if removed:
+            calculation_stats.record_removed_many(db, current_user.id, removed)
+            calculation_versions.bump(db, current_user.id)
+        db.commit()
+        deleted += len(removed)
+    response_cache.invalidate_user(current_user.id)
+    return schemas.CalculationBulkDeleteResult(deleted=deleted)
+
 @router.put("/{id}", response_model=schemas.CalculationRead)
 def update_calculation(id: int, calculation_in: schemas.CalculationCreate, db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
     calculation = db.query(models.Calculation).filter(models.Calculation.id == id, models.Calculation.user_id == current_user.id).first()
@@ -58,25 +413,25 @@ def update_calculation(id: int, calculation_in: schemas.CalculationCreate, db: S
     
     # Recalculate result
     try:
-        if calculation_in.type == "add":
-            result = operations.add(calculation_in.a, calculation_in.b)
-        elif calculation_in.type == "subtract":
-            result = operations.subtract(calculation_in.a, calculation_in.b)
-        elif calculation_in.type == "multiply":
-            result = operations.multiply(calculation_in.a, calculation_in.b)
-        elif calculation_in.type == "divide":
-            result = operations.divide(calculation_in.a, calculation_in.b)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid calculation type")
+        result = CalculationFactory.create_calculation(calculation_in.a, calculation_in.b, calculation_in.type)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    old_type, old_result = calculation.type, calculation.result
     calculation.a = calculation_in.a
     calculation.b = calculation_in.b
     calculation.type = calculation_in.type
     calculation.result = result
-    
+    db.flush()
+
+    # A recomputed summary row already includes the updated calculation
+    refreshed = calculation_stats.record_removed(db, current_user.id, old_type, old_result, calculation.created_at)
+    if not (refreshed and old_type == calculation.type):
+        calculation_stats.record_added(db, current_user.id, [calculation])
+    calculation_versions.bump(db, current_user.id)
+
     db.commit()
+    response_cache.invalidate_user(current_user.id)
     db.refresh(calculation)
     return calculation
 
@@ -87,5 +442,9 @@ def delete_calculation(id: int, db: Session = Depends(get_db), current_user: mod
         raise HTTPException(status_code=404, detail="Calculation not found")
     
     db.delete(calculation)
+    db.flush()
+    calculation_stats.record_removed(db, current_user.id, calculation.type, calculation.result, calculation.created_at)
+    calculation_versions.bump(db, current_user.id)
     db.commit()
+    response_cache.invalidate_user(current_user.id)
     return None
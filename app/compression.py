@@ -0,0 +1,255 @@
+"""
+Response compression for large JSON (and NDJSON/CSV) bodies.
+
+CompressionMiddleware compresses a response when
+
+- the client's Accept-Encoding allows one of the available encodings,
+- its media type is listed in COMPRESSION_CONTENT_TYPES,
+- its route template is not switched off in COMPRESSION_ROUTES, and
+- its body is at least COMPRESSION_MIN_SIZE bytes,
+
+so the tiny bodies of /add and friends, where compression costs more CPU than
+it saves bytes, go out as they are. Responses that already carry a
+Content-Encoding (the pre-compressed dashboard) are never touched.
+
+Both COMPRESSION_CONTENT_TYPES and COMPRESSION_ROUTES take comma-separated
+"key" or "key=algorithm:level" entries that override COMPRESSION_ALGORITHM and
+COMPRESSION_LEVEL, e.g. "/calculations/export=gzip:1" or "/metrics=off"; a
+route's entry wins over its media type's. The algorithm is used if the client
+accepts it and gzip, brotli (with the optional `brotli` package) or deflate
+otherwise, in that order.
+
+A body that arrives in one piece is compressed in one piece and keeps an
+exact Content-Length. A streamed body is buffered up to COMPRESSION_MIN_SIZE,
+then compressed chunk by chunk: every chunk is flushed (Z_SYNC_FLUSH for
+gzip/deflate) so clients can decode rows as they arrive, and memory stays
+bounded by one chunk. A compressed response's strong ETag is made weak, since
+its bytes differ from the identity representation's; If-None-Match is
+compared weakly, so the same validator still revalidates.
+
+`python -m benchmarks.compression` measures the CPU-versus-bytes tradeoff of
+each algorithm and level on CalculationRead pages.
+"""
+
+import logging
+import os
+import zlib
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from .frontend import parse_accept_encoding
+from .metrics import REGISTRY, Counter
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip and deflate are offered
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Level used when a rule names no level of its own. On CalculationRead pages
+# gzip 1 saves nearly as many bytes as 6 for a third of the CPU (see the benchmark)
+DEFAULT_LEVELS = {"gzip": 1, "deflate": 1, "br": 4}
+# Server preference when the configured algorithm is not acceptable to a client
+FALLBACK_ORDER = ("gzip", "br", "deflate")
+
+# Compress responses at all
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# gzip, br or deflate; br falls back to gzip when `brotli` is not installed
+COMPRESSION_ALGORITHM = os.getenv("COMPRESSION_ALGORITHM", "gzip").lower()
+# Empty for the algorithm's default (gzip/deflate 1, br 4)
+COMPRESSION_LEVEL = os.getenv("COMPRESSION_LEVEL", "")
+# Smaller bodies are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Media types worth compressing, optionally with their own "=algorithm:level"
+COMPRESSION_CONTENT_TYPES = os.getenv(
+    "COMPRESSION_CONTENT_TYPES", "application/json,application/x-ndjson,text/csv,text/plain,text/html")
+# Per-route-template overrides, e.g. "/calculations/export=gzip:1,/metrics=off"
+COMPRESSION_ROUTES = os.getenv("COMPRESSION_ROUTES", "")
+
+# An algorithm and level; None switches compression off
+Setting = Optional[Tuple[str, int]]
+
+COMPRESSED_RESPONSES = REGISTRY.register(Counter(
+    "http_compressed_responses_total", "Responses sent compressed, by encoding.", ("encoding",)))
+COMPRESSION_INPUT_BYTES = REGISTRY.register(Counter(
+    "http_compression_input_bytes_total", "Response bytes before compression, by encoding.", ("encoding",)))
+COMPRESSION_OUTPUT_BYTES = REGISTRY.register(Counter(
+    "http_compression_output_bytes_total", "Response bytes after compression, by encoding.", ("encoding",)))
+
+
+def available_algorithms() -> Tuple[str, ...]:
+    return tuple(algorithm for algorithm in FALLBACK_ORDER if algorithm != "br" or brotli is not None)
+
+
+def parse_setting(value: str, default: Setting) -> Setting:
+    """Parse "algorithm", "algorithm:level" or "off"; an empty value means `default`."""
+    value = value.strip().lower()
+    if not value:
+        return default
+    if value in ("off", "identity"):
+        return None
+    algorithm, _, level = value.partition(":")
+    if algorithm not in DEFAULT_LEVELS:
+        raise ValueError(f"Unknown compression algorithm: {algorithm!r}")
+    if algorithm == "br" and brotli is None:
+        logger.warning("brotli is not installed, compressing with gzip instead")
+        algorithm, level = "gzip", ""
+    return algorithm, int(level) if level else DEFAULT_LEVELS[algorithm]
+
+
+def parse_rules(spec: str, default: Setting) -> Dict[str, Setting]:
+    """Parse "key,key=algorithm:level,key=off" into a mapping; bare keys get `default`."""
+    rules = {}
+    for item in spec.split(","):
+        key, _, value = item.strip().partition("=")
+        if key:
+            rules[key.strip()] = parse_setting(value, default)
+    return rules
+
+
+class Encoder:
+    """Incremental compressor for one response body."""
+
+    def __init__(self, algorithm: str, level: int):
+        self.algorithm = algorithm
+        if algorithm == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            # wbits 31 writes a gzip header and trailer, 15 the zlib format HTTP calls "deflate"
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31 if algorithm == "gzip" else 15)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """Compress `data`; with `flush`, everything so far can be decoded from the output."""
+        if self.algorithm == "br":
+            return self._compressor.process(data) + (self._compressor.flush() if flush else b"")
+        return self._compressor.compress(data) + (self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self) -> bytes:
+        if self.algorithm == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing large responses as configured; see the module docstring."""
+
+    def __init__(self, app, enabled: bool = COMPRESSION_ENABLED, algorithm: str = COMPRESSION_ALGORITHM,
+                 level: str = COMPRESSION_LEVEL, min_size: int = COMPRESSION_MIN_SIZE,
+                 content_types: str = COMPRESSION_CONTENT_TYPES, routes: str = COMPRESSION_ROUTES):
+        self.app = app
+        self.enabled = enabled
+        default = parse_setting(f"{algorithm}:{level}" if level else algorithm, None)
+        self.min_size = min_size
+        self.content_types = {key.lower(): value for key, value in parse_rules(content_types, default).items()}
+        self.routes = parse_rules(routes, default)
+
+    def setting_for(self, route: Optional[str], content_type: Optional[str]) -> Setting:
+        """The configured algorithm and level for a response, or None to leave it uncompressed."""
+        media_type = (content_type or "").partition(";")[0].strip().lower()
+        if media_type not in self.content_types:
+            return None
+        if route in self.routes:
+            return self.routes[route]
+        return self.content_types[media_type]
+
+    @staticmethod
+    def negotiate(setting: Setting, accept_encoding: Optional[str]) -> Setting:
+        """`setting` if the client accepts its algorithm, else the first acceptable fallback."""
+        if setting is None:
+            return None
+        qualities = parse_accept_encoding(accept_encoding)
+        wildcard = qualities.get("*", 0.0)
+        configured, level = setting
+        for algorithm in (configured,) + available_algorithms():
+            if qualities.get(algorithm, wildcard) > 0:
+                return algorithm, level if algorithm == configured else DEFAULT_LEVELS[algorithm]
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        if not accept_encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder: Optional[Encoder] = None
+        buffered = b""
+        # True once the response goes out unchanged
+        passthrough = False
+
+        async def send_start(body_size: Optional[int]):
+            headers = MutableHeaders(raw=list(start_message["headers"]))
+            headers["Content-Encoding"] = encoder.algorithm
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            if body_size is None:
+                del headers["content-length"]
+            else:
+                headers["Content-Length"] = str(body_size)
+            COMPRESSED_RESPONSES.inc(encoder.algorithm)
+            await send({**start_message, "headers": headers.raw})
+
+        async def send_compressed(data: bytes, size: int, more_body: bool):
+            COMPRESSION_INPUT_BYTES.inc(encoder.algorithm, amount=size)
+            COMPRESSION_OUTPUT_BYTES.inc(encoder.algorithm, amount=len(data))
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, buffered, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                route = getattr(scope.get("route"), "path", None)
+                setting = None
+                if 200 <= message["status"] < 300 and message["status"] != 204 and "content-encoding" not in headers:
+                    setting = self.negotiate(self.setting_for(route, headers.get("content-type")), accept_encoding)
+                length = headers.get("content-length")
+                if setting is None or (length is not None and int(length) < self.min_size):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                encoder = Encoder(*setting)
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if start_message is not None:
+                # Nothing sent yet: wait until the body is known to be worth compressing
+                buffered += body
+                if len(buffered) < self.min_size:
+                    if more_body:
+                        return
+                    passthrough = True
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": buffered, "more_body": False})
+                    return
+                body, buffered = buffered, b""
+                if not more_body:
+                    compressed = encoder.compress(body) + encoder.finish()
+                    await send_start(len(compressed))
+                    await send_compressed(compressed, len(body), more_body=False)
+                    return
+                await send_start(None)
+                start_message = None
+
+            if more_body:
+                if body:
+                    await send_compressed(encoder.compress(body, flush=True), len(body), more_body=True)
+            else:
+                await send_compressed(encoder.compress(body) + encoder.finish(), len(body), more_body=False)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,7 +1,14 @@
 import os
+import threading
+import time
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .metrics import DB_QUERIES, DB_QUERY_DURATION, REGISTRY, Histogram, counter, gauge, histogram
 
 
 DATABASE_URL = os.getenv(
@@ -12,13 +19,187 @@ DATABASE_URL = os.getenv(
     ),
 )
 
+# Serve the users and calculations routes from the async stack (asyncpg/aiosqlite)
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Connection pool sizing, per worker process. With N uvicorn workers the
+# database sees up to N * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+
+# Buckets for the time spent waiting for a pooled connection, in seconds
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
 if DATABASE_URL.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
 else:
     connect_args = {}
 
-engine = create_engine(DATABASE_URL, future=True, connect_args=connect_args)
+
+class PoolStats:
+    """Checkout wait times and connection churn for one engine's pool."""
+
+    def __init__(self):
+        self.wait = Histogram(POOL_WAIT_BUCKETS)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def instrumented_pool_class(base: type, stats: PoolStats) -> type:
+    """
+    Subclass a queue pool so that every checkout records how long it waited.
+
+    Pool events only fire once a connection has been obtained, so the wait is
+    timed around `_do_get`. The stats live on the class, which survives the
+    pool being recreated by `engine.dispose()`.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return base._do_get(self)
+        except exc.TimeoutError:
+            stats.increment("timeouts")
+            raise
+        finally:
+            stats.wait.observe(time.perf_counter() - started)
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get, "stats": stats})
+
+
+def pool_options(url: str, base: type) -> dict:
+    """Engine keyword arguments for the configured, instrumented pool."""
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        # In-memory SQLite keeps its single-connection pool
+        return {}
+    return {
+        "poolclass": instrumented_pool_class(base, PoolStats()),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def instrument_pool_events(target: Engine) -> None:
+    stats = getattr(target.pool, "stats", None)
+    if stats is None:
+        return
+    event.listen(target, "checkout", lambda *args: stats.increment("checkouts"))
+    event.listen(target, "connect", lambda *args: stats.increment("connects"))
+    event.listen(target, "close", lambda *args: stats.increment("closes"))
+    event.listen(target, "invalidate", lambda *args: stats.increment("invalidations"))
+
+
+def pool_stats(target: Engine = None) -> dict:
+    """Current occupancy plus cumulative wait and churn statistics of an engine's pool."""
+    pool = (target or engine).pool
+    stats = getattr(pool, "stats", None)
+    if stats is None:
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "connects": stats.connects,
+        "closes": stats.closes,
+        "invalidations": stats.invalidations,
+        "wait": stats.wait.snapshot(),
+    }
+
+
+engine = create_engine(DATABASE_URL, future=True, connect_args=connect_args, **pool_options(DATABASE_URL, QueuePool))
+instrument_pool_events(engine)
+
+
+# Query counts and durations for every engine, including the async engine's
+# sync core. The start time rides on the execution context of the statement.
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    verb = statement.split(None, 1)[0].upper() if statement else ""
+    DB_QUERIES.inc(verb)
+    if started is not None:
+        DB_QUERY_DURATION.observe(time.perf_counter() - started, verb)
+
+
+def _collect_pool_stats():
+    stats = pool_stats()
+    if "wait" not in stats:
+        return
+    yield gauge("db_pool_size", "Configured size of the connection pool.", stats["size"])
+    yield gauge("db_pool_checked_out", "Connections currently checked out of the pool.", stats["checked_out"])
+    yield gauge("db_pool_overflow", "Connections open beyond pool_size (negative while the pool is not full).", stats["overflow"])
+    yield counter("db_pool_checkouts_total", "Connections checked out of the pool.", stats["checkouts"])
+    yield counter("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection.", stats["timeouts"])
+    yield counter("db_pool_connects_total", "New database connections opened.", stats["connects"])
+    yield counter("db_pool_closes_total", "Database connections closed.", stats["closes"])
+    yield counter("db_pool_invalidations_total", "Pooled connections invalidated.", stats["invalidations"])
+    yield histogram("db_pool_wait_seconds", "Time spent waiting to check out a connection.", engine.pool.stats.wait)
+
+
+REGISTRY.register_collector(_collect_pool_stats)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (asyncpg or aiosqlite)."""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# Created on first use so the async drivers are only imported when needed
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool)
+        )
+        instrument_pool_events(_async_engine.sync_engine)
+    return _async_engine
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    global _async_session_factory
+    if _async_session_factory is None:
+        # expire_on_commit=False: attribute access after commit must not do implicit IO
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
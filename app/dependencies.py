@@ -1,6 +1,7 @@
-from typing import Generator
+from typing import AsyncGenerator, Callable, Generator
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .db import SessionLocal
+from .db import SessionLocal, get_async_session_factory
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -8,3 +9,15 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+def get_session_factory() -> Callable[[], Session]:
+    """
+    Session factory for handlers that outlive one unit of work, such as
+    WebSockets: a `get_db` session would hold its connection until the socket
+    closes, so they open a short-lived session per unit of work instead.
+    """
+    return SessionLocal
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with get_async_session_factory()() as db:
+        yield db
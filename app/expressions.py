@@ -0,0 +1,204 @@
+"""
+Arithmetic expression engine behind POST /evaluate.
+
+An expression such as `(a + b) * c / d` is parsed with Python's `ast` module
+and accepted only if it consists of numeric literals, variable names,
+parentheses, unary +/-, the infix operators of the registered operations
+(`+ - * / ** %`) and calls to registered unary operations such as `sqrt(x)`.
+The validated tree is compiled once into a `CompiledExpression`, a tree of
+closures over the operations' vectorized kernels, and kept in an LRU cache
+keyed by the expression text, so hot formulas are parsed once per process.
+
+A compiled expression evaluates against many variable bindings in a single
+vectorized pass. As with `divide_array`, division by zero does not raise: the
+affected results are NaN and flagged in the returned mask, as are the results
+of any other operation that is undefined for its operands.
+"""
+
+import ast
+import math
+import os
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .metrics import REGISTRY, counter, gauge
+from .operation_registry import OPERATIONS, Operation
+
+# Hard limits on what a client may submit
+EXPRESSION_MAX_LENGTH = int(os.getenv("EXPRESSION_MAX_LENGTH", "1000"))
+EXPRESSION_MAX_DEPTH = int(os.getenv("EXPRESSION_MAX_DEPTH", "32"))
+EXPRESSION_MAX_NODES = int(os.getenv("EXPRESSION_MAX_NODES", "256"))
+EXPRESSION_MAX_BINDINGS = int(os.getenv("EXPRESSION_MAX_BINDINGS", "10000"))
+# Compiled expressions kept per process
+EXPRESSION_CACHE_SIZE = int(os.getenv("EXPRESSION_CACHE_SIZE", "256"))
+
+# An evaluator maps the variable columns (and row count) to results and a
+# mask of the rows where an operation was undefined
+Evaluator = Callable[[Mapping[str, np.ndarray], int], Tuple[np.ndarray, np.ndarray]]
+
+
+class ExpressionError(ValueError):
+    """The expression is malformed, uses unsupported syntax or exceeds a limit."""
+
+
+# Python operator nodes by the symbol operations register under
+AST_OPERATORS = {
+    ast.Add: "+",
+    ast.Sub: "-",
+    ast.Mult: "*",
+    ast.Div: "/",
+    ast.Pow: "**",
+    ast.Mod: "%",
+}
+
+
+def _infix_operation(node: ast.BinOp) -> Optional[Operation]:
+    symbol = AST_OPERATORS.get(type(node.op))
+    if symbol is None:
+        return None
+    return next((operation for operation in OPERATIONS.values() if operation.symbol == symbol), None)
+
+
+def _merge_invalid(values: np.ndarray, invalid: np.ndarray, *masks: Optional[np.ndarray]):
+    for mask in masks:
+        if mask is not None:
+            invalid = invalid | mask
+    return values, invalid
+
+
+class CompiledExpression:
+    """A validated expression, ready to be evaluated against variable bindings."""
+
+    def __init__(self, text: str, evaluator: Evaluator, variables: FrozenSet[str]):
+        self.text = text
+        self.variables = variables
+        self._evaluator = evaluator
+
+    def evaluate(self, bindings: Sequence[Mapping[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate once per binding.
+
+        Returns the results and a boolean mask that is True wherever an
+        operation was undefined, e.g. a division by zero (the result there is NaN).
+
+        Raises:
+        - ExpressionError: If a binding lacks one of the expression's variables.
+        """
+        if len(bindings) > EXPRESSION_MAX_BINDINGS:
+            raise ExpressionError(f"At most {EXPRESSION_MAX_BINDINGS} bindings are allowed")
+        columns = {}
+        for name in self.variables:
+            try:
+                columns[name] = np.fromiter((binding[name] for binding in bindings), dtype=np.float64, count=len(bindings))
+            except KeyError:
+                raise ExpressionError(f"Missing value for variable: {name}")
+        return self._evaluator(columns, len(bindings))
+
+
+def _compile_node(node: ast.AST, depth: int, stats: Dict[str, int], variables: set) -> Evaluator:
+    if depth > EXPRESSION_MAX_DEPTH:
+        raise ExpressionError(f"Expression is nested deeper than {EXPRESSION_MAX_DEPTH} levels")
+    stats["nodes"] += 1
+    if stats["nodes"] > EXPRESSION_MAX_NODES:
+        raise ExpressionError(f"Expression has more than {EXPRESSION_MAX_NODES} terms")
+
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        try:
+            value = float(node.value)
+        except OverflowError:
+            value = math.inf
+        if not math.isfinite(value):
+            raise ExpressionError("Numeric literal out of range")
+        return lambda columns, n: (np.full(n, value), None)
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        variables.add(name)
+        return lambda columns, n: (columns[name], None)
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        operand = _compile_node(node.operand, depth + 1, stats, variables)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+
+        def negate(columns, n):
+            values, invalid = operand(columns, n)
+            return np.negative(values), invalid
+        return negate
+
+    if isinstance(node, ast.BinOp) and _infix_operation(node) is not None:
+        operation = _infix_operation(node)
+        left = _compile_node(node.left, depth + 1, stats, variables)
+        right = _compile_node(node.right, depth + 1, stats, variables)
+
+        def apply(columns, n):
+            left_values, left_invalid = left(columns, n)
+            right_values, right_invalid = right(columns, n)
+            values, invalid = operation.compute_many(left_values, right_values)
+            return _merge_invalid(values, invalid, left_invalid, right_invalid)
+        return apply
+
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in OPERATIONS
+            and OPERATIONS[node.func.id].arity == 1 and len(node.args) == 1 and not node.keywords):
+        operation = OPERATIONS[node.func.id]
+        argument = _compile_node(node.args[0], depth + 1, stats, variables)
+
+        def call(columns, n):
+            argument_values, argument_invalid = argument(columns, n)
+            values, invalid = operation.compute_many(argument_values)
+            return _merge_invalid(values, invalid, argument_invalid)
+        return call
+
+    raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(text: str) -> CompiledExpression:
+    """
+    Parse, validate and compile an expression. Results are cached by text.
+
+    Raises:
+    - ExpressionError: If the expression is invalid or exceeds a limit.
+
+    Example:
+    >>> compiled = compile_expression("(a + b) * 2")
+    >>> results, invalid = compiled.evaluate([{"a": 1, "b": 2}])
+    >>> results.tolist(), invalid.tolist()
+    ([6.0], [False])
+    """
+    if len(text) > EXPRESSION_MAX_LENGTH:
+        raise ExpressionError(f"Expression is longer than {EXPRESSION_MAX_LENGTH} characters")
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except (SyntaxError, RecursionError, MemoryError):
+        raise ExpressionError("Expression is not valid arithmetic")
+
+    variables: set = set()
+    evaluator = _compile_node(tree.body, 1, {"nodes": 0}, variables)
+
+    def evaluate(columns, n):
+        values, invalid = evaluator(columns, n)
+        return values, invalid if invalid is not None else np.zeros(n, dtype=bool)
+
+    return CompiledExpression(text, evaluate, frozenset(variables))
+
+
+def evaluate(text: str, bindings: Sequence[Mapping[str, float]]) -> Tuple[List[float], List[bool]]:
+    """Evaluate an expression per binding; invalid results are returned as None."""
+    results, invalid = compile_expression(text).evaluate(bindings)
+    values = results.tolist()
+    for index in np.flatnonzero(invalid).tolist():
+        values[index] = None
+    return values, invalid.tolist()
+
+
+def _collect_expression_cache():
+    info = compile_expression.cache_info()
+    yield gauge("expression_cache_size", "Compiled expressions held in the cache.", info.currsize)
+    yield counter("expression_cache_hits_total", "Compiled-expression cache hits.", info.hits)
+    yield counter("expression_cache_misses_total", "Compiled-expression cache misses.", info.misses)
+
+
+REGISTRY.register_collector(_collect_expression_cache)
@@ -1,30 +1,21 @@
-from typing import Union
-from .operations import add, subtract, multiply, divide
+from typing import Optional, Union
+from .operation_registry import get_operation
 
 class CalculationFactory:
     @staticmethod
-    def create_calculation(a: Union[int, float], b: Union[int, float], operation_type: str) -> float:
+    def create_calculation(a: Union[int, float], b: Optional[Union[int, float]], operation_type: str) -> float:
         """
         Perform calculation based on the operation type.
         
         Args:
             a (int | float): First number
-            b (int | float): Second number
-            operation_type (str): Type of operation ('add', 'subtract', 'multiply', 'divide')
+            b (int | float): Second number (ignored by unary operations such as 'sqrt')
+            operation_type (str): Name of a registered operation ('add', 'subtract', 'multiply', 'divide', ...)
             
         Returns:
             float: Result of the calculation
             
         Raises:
-            ValueError: If operation type is invalid or division by zero occurs
+            ValueError: If operation type is invalid or the result is undefined (e.g. division by zero)
         """
-        if operation_type == "add":
-            return add(a, b)
-        elif operation_type == "subtract":
-            return subtract(a, b)
-        elif operation_type == "multiply":
-            return multiply(a, b)
-        elif operation_type == "divide":
-            return divide(a, b)
-        else:
-            raise ValueError(f"Invalid operation type: {operation_type}")
+        return get_operation(operation_type).compute(a, b)
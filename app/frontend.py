@@ -0,0 +1,86 @@
+"""
+The dashboard page, rendered once and served pre-compressed.
+
+templates/index.html only depends on the registered operations, which are
+fixed once the app has been imported, so `main.py` renders it a single time at
+startup. The page is compressed up front with gzip and, when the optional
+`brotli` package is installed, with brotli; a request only picks the variant
+its Accept-Encoding allows. Each variant has a strong ETag derived from its
+bytes, so a repeat visitor's revalidation is answered with an empty 304.
+"""
+
+import gzip
+import hashlib
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+from .calculation_versions import etag_matches
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip and identity are offered
+    brotli = None
+
+# The ETag makes revalidation cheap once this expires
+FRONTEND_CACHE_CONTROL = os.getenv("FRONTEND_CACHE_CONTROL", "public, max-age=86400")
+
+# Preferred first when a client accepts several encodings equally
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Map each coding of an Accept-Encoding header to its quality value."""
+    qualities = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities
+
+
+class StaticPage:
+    """One document held as identity, gzip and (optionally) brotli bytes, each with its own ETag."""
+
+    def __init__(self, body: bytes, media_type: str = "text/html; charset=utf-8"):
+        self.media_type = media_type
+        digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.variants: Dict[str, Tuple[bytes, str]] = {
+            "identity": (body, f'"{digest}"'),
+            "gzip": (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gzip"'),
+        }
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+
+    def negotiate(self, accept_encoding: Optional[str]) -> str:
+        """The best variant for an Accept-Encoding header; identity when nothing else is acceptable."""
+        qualities = parse_accept_encoding(accept_encoding)
+        wildcard = qualities.get("*", 0.0)
+        best, best_quality = "identity", 0.0
+        for encoding in ENCODING_PREFERENCE:
+            if encoding not in self.variants:
+                continue
+            default = 1.0 if encoding == "identity" and "*" not in qualities else wildcard
+            quality = qualities.get(encoding, default)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def response(self, request: Request) -> Response:
+        encoding = self.negotiate(request.headers.get("accept-encoding"))
+        body, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": FRONTEND_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
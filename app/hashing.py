@@ -0,0 +1,191 @@
+"""
+Password hashing offloaded to a dedicated process pool with admission control.
+
+pbkdf2_sha256 is deliberately CPU-bound. Running it in a separate pool keeps a
+burst of logins from occupying the threadpool that serves every other sync
+route, and the bounded number of admitted jobs turns overload into a fast 503
+instead of an ever-growing queue.
+
+This module is imported by the pool's worker processes, so apart from the
+dependency-free `.metrics` helpers it must stay free of application imports
+(database, models, routers).
+
+A worker that dies (e.g. killed by the OOM killer) breaks its whole
+ProcessPoolExecutor; the jobs it held fail, and the pool is replaced so that
+the next jobs run in fresh workers.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .metrics import REGISTRY, Histogram, counter, gauge, histogram
+
+# Worker processes dedicated to hashing; 0 hashes inline in the calling thread
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Jobs admitted at once (running plus queued); further requests get a 503
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+# Seconds advertised in Retry-After when a request is rejected
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+
+def compute_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def check_hash(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class HashingOverloaded(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password hashing is overloaded, please retry shortly",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class HashPool:
+    def __init__(self, workers: int, queue_size: int, retry_after: int = 1):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self.latency = Histogram()
+        self.rejected = 0
+        self._depth = 0
+        self._max_depth = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that already runs threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Stop using a broken executor; the next job starts a new one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._depth >= self.queue_size:
+                self.rejected += 1
+                raise HashingOverloaded(self.retry_after)
+            self._depth += 1
+            self._max_depth = max(self._max_depth, self._depth)
+
+    def _release(self, started: float) -> None:
+        self.latency.observe(time.perf_counter() - started)
+        with self._lock:
+            self._depth -= 1
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        Schedule `fn(*args)` and return its future.
+
+        Raises:
+            HashingOverloaded: If `queue_size` jobs are already admitted.
+        """
+        self._admit()
+        started = time.perf_counter()
+        # Callers wait on `future`, which is only resolved after the job has
+        # been released, so the stats never trail behind a returned result.
+        future: Future = Future()
+
+        executor: Optional[ProcessPoolExecutor] = None
+
+        def settle(outcome: Future) -> None:
+            self._release(started)
+            error = outcome.exception()
+            if isinstance(error, BrokenProcessPool) and executor is not None:
+                self._discard_executor(executor)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(outcome.result())
+
+        if self.workers <= 0:
+            inline: Future = Future()
+            try:
+                inline.set_result(fn(*args))
+            except Exception as e:
+                inline.set_exception(e)
+            settle(inline)
+            return future
+        try:
+            executor = self._get_executor()
+            try:
+                job = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # Broken by an earlier job: retry once in a fresh pool
+                self._discard_executor(executor)
+                executor = self._get_executor()
+                job = executor.submit(fn, *args)
+        except BaseException:
+            self._release(started)
+            raise
+        job.add_done_callback(settle)
+        return future
+
+    def run(self, fn: Callable, *args):
+        """Run `fn(*args)` in the pool, blocking the calling thread until it finishes."""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn: Callable, *args):
+        """Run `fn(*args)` in the pool without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict:
+        with self._lock:
+            depth, max_depth, rejected = self._depth, self._max_depth, self.rejected
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queue_depth": depth,
+            "max_queue_depth": max_depth,
+            "rejected": rejected,
+            "latency": self.latency.snapshot(),
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+hash_pool = HashPool(
+    workers=PASSWORD_HASH_WORKERS,
+    queue_size=PASSWORD_HASH_QUEUE_SIZE,
+    retry_after=PASSWORD_HASH_RETRY_AFTER,
+)
+
+
+def _collect_hash_pool():
+    stats = hash_pool.stats()
+    yield gauge("password_hash_queue_depth", "Password hashing jobs running or queued.", stats["queue_depth"])
+    yield gauge("password_hash_queue_size", "Password hashing jobs admitted at once.", stats["queue_size"])
+    yield counter("password_hash_rejected_total", "Password hashing jobs rejected with a 503.", stats["rejected"])
+    yield histogram("password_hash_duration_seconds", "Time from admission to completion of a hashing job.", hash_pool.latency)
+
+
+REGISTRY.register_collector(_collect_hash_pool)
@@ -0,0 +1,170 @@
+"""
+Non-blocking logging pipeline.
+
+Records are handed to a bounded in-memory queue and written to stdout by a
+background QueueListener thread, so request handlers never wait on stream I/O.
+Two handler-level filters keep the volume down on the hot path:
+
+- RouteSampler keeps only a fraction of low-severity records tagged with a
+  route (`extra={"route": ...}`), per route.
+- RateLimiter lets through a burst of records per `rate_limit_key` and
+  interval, and reports how many were suppressed once the key is let through
+  again.
+
+Log calls should use lazy %-style arguments (`logger.info("a=%s", a)`) so
+that nothing is formatted for records that are filtered out.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from .metrics import REGISTRY, counter
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Records buffered for the writer thread; once full, new records are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Per-route sampling for INFO and below, e.g. "/add=0.01,/calculations/=0.1"
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_DEFAULT_SAMPLE_RATE = float(os.getenv("LOG_DEFAULT_SAMPLE_RATE", "1.0"))
+# Records allowed per rate_limit_key in each interval
+LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "10"))
+LOG_RATE_LIMIT_INTERVAL = float(os.getenv("LOG_RATE_LIMIT_INTERVAL", "60"))
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "route=rate,route=rate" into a mapping."""
+    rates = {}
+    for item in spec.split(","):
+        route, sep, rate = item.strip().rpartition("=")
+        if sep and route:
+            rates[route] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class RouteSampler(logging.Filter):
+    """Keep a per-route fraction of INFO-and-below records tagged with a route."""
+
+    def __init__(self, rates: Dict[str, float], default_rate: float = 1.0):
+        super().__init__()
+        self.rates = rates
+        self.default_rate = default_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        route = getattr(record, "route", None)
+        if route is None:
+            return True
+        rate = self.rates.get(route, self.default_rate)
+        return rate >= 1.0 or random.random() < rate
+
+
+class RateLimiter(logging.Filter):
+    """Allow `burst` records per `rate_limit_key` every `interval` seconds."""
+
+    # Upper bound on tracked keys, so unbounded key spaces cannot grow memory
+    MAX_KEYS = 1024
+
+    def __init__(self, burst: int, interval: float):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        # key -> [window start, records allowed in window, records suppressed]
+        self._windows: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "rate_limit_key", None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                if window is None and len(self._windows) >= self.MAX_KEYS:
+                    self._windows.clear()
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                return True
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.msg} (suppressed {suppressed} similar messages)"
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """A QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def setup_logging(level: str = LOG_LEVEL) -> DroppingQueueHandler:
+    """
+    Route the root logger through the background writer. Safe to call more than once.
+    """
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        return _queue_handler
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    handler.addFilter(RouteSampler(parse_sample_rates(LOG_SAMPLE_RATES), LOG_DEFAULT_SAMPLE_RATE))
+    handler.addFilter(RateLimiter(LOG_RATE_LIMIT_BURST, LOG_RATE_LIMIT_INTERVAL))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(handler)
+
+    _listener = QueueListener(handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    _queue_handler = handler
+    atexit.register(shutdown_logging)
+    return handler
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+def _collect_logging():
+    if _queue_handler is not None:
+        yield counter("log_records_dropped_total", "Log records dropped because the log queue was full.", _queue_handler.dropped)
+
+
+REGISTRY.register_collector(_collect_logging)
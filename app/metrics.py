@@ -0,0 +1,260 @@
+"""
+Lightweight in-process instrumentation and the Prometheus text exposition
+served by GET /metrics.
+
+Recording is a dict lookup plus an addition under a lock, which keeps the
+per-request overhead in the low microseconds.
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Iterable, List, Sequence
+
+# Default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of observed values.
+
+    `observe` is a bisect plus two additions under a lock, cheap enough to call
+    on every request.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket plus the +Inf overflow slot
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            if value > self._max:
+                self._max = value
+
+    def snapshot(self) -> dict:
+        """Return the count, sum, max and cumulative bucket counts (keyed by upper bound)."""
+        with self._lock:
+            counts = list(self._counts)
+            total, maximum = self._sum, self._max
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            cumulative[bound] = running
+        return {"count": running, "sum": total, "max": maximum, "buckets": cumulative}
+
+
+class Metric:
+    """A metric family: one value (or histogram) per combination of label values."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def _labels(self, labelvalues: tuple) -> str:
+        if not labelvalues:
+            return ""
+        pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labelvalues))
+        return "{" + pairs + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{self._labels(labelvalues)} {_format(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, *labelvalues: str, value: float) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+
+class HistogramFamily(Metric):
+    """A `Histogram` per combination of label values."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def child(self, *labelvalues: str) -> Histogram:
+        histogram = self._values.get(labelvalues)
+        if histogram is None:
+            with self._lock:
+                histogram = self._values.setdefault(labelvalues, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        self.child(*labelvalues).observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, histogram in items:
+            snapshot = histogram.snapshot()
+            labels = self._labels(labelvalues)
+            prefix = labels[:-1] + "," if labels else "{"
+            for bound, count in snapshot["buckets"].items():
+                le = "+Inf" if bound == float("inf") else _format(bound)
+                lines.append(f'{self.name}_bucket{prefix}le="{le}"}} {count}')
+            lines.append(f"{self.name}_sum{labels} {_format(snapshot['sum'])}")
+            lines.append(f"{self.name}_count{labels} {snapshot['count']}")
+        return lines
+
+
+def gauge(name: str, documentation: str, value: float) -> Gauge:
+    """Build an unlabelled gauge holding `value`, for use in collectors."""
+    metric = Gauge(name, documentation)
+    metric.set(value=value)
+    return metric
+
+
+def counter(name: str, documentation: str, value: float) -> Counter:
+    """Build an unlabelled counter holding `value`, for use in collectors."""
+    metric = Counter(name, documentation)
+    metric.inc(amount=value)
+    return metric
+
+
+def histogram(name: str, documentation: str, source: Histogram) -> HistogramFamily:
+    """Expose an existing `Histogram` as an unlabelled histogram family, for use in collectors."""
+    metric = HistogramFamily(name, documentation, buckets=source.buckets)
+    metric._values[()] = source
+    return metric
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """
+    Metrics rendered by GET /metrics.
+
+    Long-lived metrics are registered once; collectors are called at scrape
+    time to turn statistics kept elsewhere (caches, pools) into metric families.
+    """
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.", ("method", "route", "status")))
+HTTP_REQUEST_DURATION = REGISTRY.register(HistogramFamily(
+    "http_request_duration_seconds", "HTTP request latency by method and route template.", ("method", "route")))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served."))
+HTTP_REQUESTS_IN_FLIGHT.set(value=0)
+HTTP_ERRORS = REGISTRY.register(Counter(
+    "http_errors_total", "HTTP responses with a 4xx or 5xx status code.", ("status",)))
+DB_QUERIES = REGISTRY.register(Counter(
+    "db_queries_total", "SQL statements executed, by statement verb.", ("verb",)))
+DB_QUERY_DURATION = REGISTRY.register(HistogramFamily(
+    "db_query_duration_seconds", "SQL statement execution time, by statement verb.", ("verb",)))
+
+# Requests that did not match any route share one label value, keeping
+# the label cardinality bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency and in-flight requests.
+
+    Requests are labelled with the matched route template (e.g.
+    `/calculations/{id}`), never the raw path. FastAPI stores the route in the
+    scope during routing, so the label is read after the request is handled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            status = str(status_code)
+            HTTP_REQUESTS.inc(method, path, status)
+            HTTP_REQUEST_DURATION.observe(elapsed, method, path)
+            if status_code >= 400:
+                HTTP_ERRORS.inc(status)
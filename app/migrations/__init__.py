@@ -0,0 +1,166 @@
+"""
+Versioned schema migrations.
+
+Each module in `versions/` is one migration, named `NNNN_description.py` and
+applied in order of NNNN. A migration defines `upgrade(conn)` and
+`downgrade(conn)` and describes the schema in its own terms (never through
+`app.models`, which only knows the latest schema). Applied versions are
+recorded in the `schema_migrations` table.
+
+Migrations run inside a transaction unless they set `transactional = False`,
+which runs them in autocommit mode so they can use statements such as
+Postgres' `CREATE INDEX CONCURRENTLY` that refuse to run in a transaction.
+Such a migration must be safe to rerun (`IF NOT EXISTS`), since it is only
+recorded after it completed; `create_index` builds an index that way.
+
+The application never touches the schema itself; run the migrations before
+starting it:
+
+    python -m app.migrations upgrade [--to VERSION]
+    python -m app.migrations downgrade --to VERSION
+    python -m app.migrations status
+"""
+
+import importlib
+import pkgutil
+from datetime import datetime, timezone
+from types import ModuleType
+from typing import Dict, List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, delete, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from . import versions
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+# Serializes concurrent runners on Postgres, e.g. several containers starting at once
+ADVISORY_LOCK_ID = 7_254_301
+
+
+def concurrently(conn: Connection) -> str:
+    """"CONCURRENTLY " on Postgres, where index builds and drops can avoid blocking writes."""
+    return "CONCURRENTLY " if conn.dialect.name == "postgresql" else ""
+
+
+def create_index(conn: Connection, name: str, table: str, columns: str, unique: bool = False) -> None:
+    """
+    CREATE INDEX IF NOT EXISTS, concurrently on Postgres.
+
+    A failed concurrent build leaves an INVALID index behind that IF NOT EXISTS
+    would keep, so such a leftover is dropped first and the build rerun.
+    """
+    if conn.dialect.name == "postgresql":
+        invalid = conn.execute(text(
+            "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND pg_catalog.pg_table_is_visible(c.oid)"
+        ), {"name": name}).scalar()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    unique_sql = "UNIQUE " if unique else ""
+    conn.execute(text(f"CREATE {unique_sql}INDEX {concurrently(conn)}IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+class Migration:
+    def __init__(self, version: int, name: str, module: ModuleType):
+        self.version = version
+        self.name = name
+        self.module = module
+        self.transactional = getattr(module, "transactional", True)
+
+    def __repr__(self) -> str:
+        return f"{self.version:04d}_{self.name}"
+
+
+def discover() -> List[Migration]:
+    """Every migration in `versions/`, in order."""
+    migrations = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        number, _, name = info.name.partition("_")
+        if not number.isdigit():
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{info.name}")
+        migrations.append(Migration(int(number), name, module))
+    migrations.sort(key=lambda migration: migration.version)
+    seen = [migration.version for migration in migrations]
+    if len(seen) != len(set(seen)):
+        raise RuntimeError(f"Duplicate migration versions: {seen}")
+    return migrations
+
+
+def applied_versions(engine: Engine) -> Dict[int, datetime]:
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        rows = conn.execute(select(schema_migrations.c.version, schema_migrations.c.applied_at)).all()
+    return {row.version: row.applied_at for row in rows}
+
+
+def _run(engine: Engine, migration: Migration, step: str) -> None:
+    if migration.transactional:
+        with engine.begin() as conn:
+            getattr(migration.module, step)(conn)
+            _record(conn, migration, step)
+        return
+    with engine.connect() as conn:
+        getattr(migration.module, step)(conn.execution_options(isolation_level="AUTOCOMMIT"))
+    with engine.begin() as conn:
+        _record(conn, migration, step)
+
+
+def _record(conn: Connection, migration: Migration, step: str) -> None:
+    if step == "upgrade":
+        conn.execute(insert(schema_migrations).values(
+            version=migration.version, name=migration.name, applied_at=datetime.now(timezone.utc),
+        ))
+    else:
+        conn.execute(delete(schema_migrations).where(schema_migrations.c.version == migration.version))
+
+
+class _Lock:
+    """Postgres advisory lock around a run; other databases rely on running one runner at a time."""
+
+    def __init__(self, engine: Engine):
+        self.conn = engine.connect() if engine.dialect.name == "postgresql" else None
+
+    def __enter__(self):
+        if self.conn is not None:
+            self.conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+            self.conn.commit()
+        return self
+
+    def __exit__(self, *exc):
+        if self.conn is not None:
+            self.conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+            self.conn.commit()
+            self.conn.close()
+
+
+def upgrade(engine: Engine, to: Optional[int] = None) -> List[Migration]:
+    """Apply every pending migration up to version `to` (default: all). Returns those applied."""
+    with _Lock(engine):
+        applied = applied_versions(engine)
+        pending = [m for m in discover() if m.version not in applied and (to is None or m.version <= to)]
+        for migration in pending:
+            _run(engine, migration, "upgrade")
+    return pending
+
+
+def downgrade(engine: Engine, to: int) -> List[Migration]:
+    """Revert every applied migration above version `to`, newest first. Returns those reverted."""
+    with _Lock(engine):
+        applied = applied_versions(engine)
+        reverted = [m for m in reversed(discover()) if m.version in applied and m.version > to]
+        for migration in reverted:
+            _run(engine, migration, "downgrade")
+    return reverted
+
+
+def pending_migrations(engine: Engine) -> List[Migration]:
+    applied = applied_versions(engine)
+    return [migration for migration in discover() if migration.version not in applied]
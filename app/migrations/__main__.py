@@ -0,0 +1,32 @@
+import argparse
+
+from . import __doc__ as DOC, applied_versions, discover, downgrade, upgrade
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description=DOC.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = subparsers.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, default=None, help="Stop after this version (default: latest)")
+    downgrade_parser = subparsers.add_parser("downgrade", help="Revert applied migrations")
+    downgrade_parser.add_argument("--to", type=int, required=True, help="Revert every version above this one (0 reverts all)")
+    subparsers.add_parser("status", help="List migrations and whether they are applied")
+    args = parser.parse_args(argv)
+
+    from ..db import engine
+
+    if args.command == "upgrade":
+        applied = upgrade(engine, args.to)
+        print(f"Applied {len(applied)} migration(s)" + "".join(f"\n  {migration}" for migration in applied))
+    elif args.command == "downgrade":
+        reverted = downgrade(engine, args.to)
+        print(f"Reverted {len(reverted)} migration(s)" + "".join(f"\n  {migration}" for migration in reverted))
+    else:
+        applied = applied_versions(engine)
+        for migration in discover():
+            state = f"applied {applied[migration.version]}" if migration.version in applied else "pending"
+            print(f"{migration}: {state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Users and calculations, as the application first created them."""
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, func
+
+metadata = MetaData()
+
+users = Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(50), unique=True, nullable=False, index=True),
+    Column("email", String(255), unique=True, nullable=False, index=True),
+    Column("password_hash", String(255), nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+calculations = Table(
+    "calculations",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("a", Float, nullable=False),
+    Column("b", Float, nullable=False),
+    Column("type", String(20), nullable=False),
+    Column("result", Float, nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+def upgrade(conn):
+    # checkfirst adopts databases that create_all set up before migrations existed
+    metadata.create_all(conn, checkfirst=True)
+
+
+def downgrade(conn):
+    metadata.drop_all(conn)
@@ -0,0 +1,16 @@
+"""Composite (user_id, id) index behind keyset pagination of GET /calculations."""
+
+from sqlalchemy import text
+
+from app.migrations import concurrently, create_index
+
+# CREATE INDEX CONCURRENTLY does not block writes but cannot run in a transaction
+transactional = False
+
+
+def upgrade(conn):
+    create_index(conn, "ix_calculations_user_id_id", "calculations", "user_id, id")
+
+
+def downgrade(conn):
+    conn.execute(text(f"DROP INDEX {concurrently(conn)}IF EXISTS ix_calculations_user_id_id"))
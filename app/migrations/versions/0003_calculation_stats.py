@@ -0,0 +1,49 @@
+"""Per-user, per-operation summary of calculations, backfilled from existing rows."""
+
+from sqlalchemy import (Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, column, func, insert,
+                        inspect, select, table)
+
+metadata = MetaData()
+
+# Only the target of the foreign key; never created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+calculation_stats = Table(
+    "calculation_stats",
+    metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("type", String(20), primary_key=True),
+    Column("count", Integer, nullable=False, default=0),
+    Column("total", Float, nullable=False, default=0.0),
+    Column("min_result", Float, nullable=True),
+    Column("max_result", Float, nullable=True),
+    Column("last_created_at", DateTime(timezone=True), nullable=True),
+)
+
+calculations = table("calculations", column("user_id"), column("type"), column("result"), column("created_at"))
+
+
+def upgrade(conn):
+    if inspect(conn).has_table("calculation_stats"):
+        # Created by create_all and maintained by the application since
+        return
+    calculation_stats.create(conn)
+    summary = (
+        select(
+            calculations.c.user_id,
+            calculations.c.type,
+            func.count(),
+            func.sum(calculations.c.result),
+            func.min(calculations.c.result),
+            func.max(calculations.c.result),
+            func.max(calculations.c.created_at),
+        )
+        .group_by(calculations.c.user_id, calculations.c.type)
+    )
+    conn.execute(insert(calculation_stats).from_select(
+        ["user_id", "type", "count", "total", "min_result", "max_result", "last_created_at"], summary,
+    ))
+
+
+def downgrade(conn):
+    calculation_stats.drop(conn)
@@ -0,0 +1,24 @@
+"""Per-user write counter behind the ETags of calculation reads."""
+
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, Table
+
+metadata = MetaData()
+
+# Only the target of the foreign key; never created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+calculation_versions = Table(
+    "calculation_versions",
+    metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("version", Integer, nullable=False, default=0),
+)
+
+
+def upgrade(conn):
+    # A missing row reads as version 0, so there is nothing to backfill
+    calculation_versions.create(conn, checkfirst=True)
+
+
+def downgrade(conn):
+    calculation_versions.drop(conn)
@@ -0,0 +1,19 @@
+"""calculations.uuid, which identifies calculations acknowledged in write-behind mode."""
+
+from sqlalchemy import inspect, text
+
+from app.migrations import concurrently, create_index
+
+transactional = False
+
+
+def upgrade(conn):
+    if "uuid" not in {c["name"] for c in inspect(conn).get_columns("calculations")}:
+        # Nullable without a default: a catalog-only change, no table rewrite
+        conn.execute(text("ALTER TABLE calculations ADD COLUMN uuid VARCHAR(36)"))
+    create_index(conn, "ix_calculations_uuid", "calculations", "uuid", unique=True)
+
+
+def downgrade(conn):
+    conn.execute(text(f"DROP INDEX {concurrently(conn)}IF EXISTS ix_calculations_uuid"))
+    conn.execute(text("ALTER TABLE calculations DROP COLUMN uuid"))
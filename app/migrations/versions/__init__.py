@@ -0,0 +1 @@
+"""Migration modules, see `app.migrations`."""
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String, Float, ForeignKey, func
+from sqlalchemy import Column, DateTime, Integer, String, Float, ForeignKey, Index, func
 
 from .db import Base
 
@@ -23,3 +23,34 @@ class Calculation(Base):
     result = Column(Float, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Set on calculations created in write-behind mode, which are acknowledged before they have an id
+    uuid = Column(String(36), nullable=True)
+
+    __table_args__ = (
+        # Serves the per-user listing ordered by id (keyset pagination)
+        Index("ix_calculations_user_id_id", "user_id", "id"),
+        Index("ix_calculations_uuid", "uuid", unique=True),
+    )
+
+
+class CalculationStats(Base):
+    """Per-user, per-operation aggregates of `calculations`, maintained incrementally."""
+
+    __tablename__ = "calculation_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    type = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+    min_result = Column(Float, nullable=True)
+    max_result = Column(Float, nullable=True)
+    last_created_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class CalculationVersion(Base):
+    """Per-user counter bumped on every write to `calculations`; backs the read ETags."""
+
+    __tablename__ = "calculation_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,207 @@
+"""
+The single registry of calculator operations.
+
+Every entry point dispatches through `OPERATIONS`: the stateless routes in
+`main.py` (one generated per operation), POST /batch/{op}, POST /evaluate,
+`CalculationFactory`, the calculation routes and the `type` pattern of
+`schemas.CalculationCreate`. Adding an operation is one `register` call.
+
+Each operation declares:
+
+- a scalar kernel, which raises ValueError when the result is undefined;
+- a vectorized kernel returning the results and a mask of undefined elements.
+  When an operation has none, one is derived from the scalar kernel, so
+  every operation has a batched path;
+- its arity (unary operations ignore `b`), an optional expression symbol, and
+  the error reported for undefined elements of a batch;
+- optionally a SQL kernel (and the SQL condition under which it is undefined)
+  that lets bulk updates recompute results inside a single UPDATE statement.
+  It is only given where every supported database computes exactly what the
+  scalar kernel does, and comes with the condition under which it cannot
+  overflow (`sql_safe`): SQLite would store inf and Postgres raises, so rows
+  outside it are recomputed by the vectorized kernel, which flags overflow.
+
+Results that overflow to infinity from finite operands are undefined for every
+operation: `compute` raises and `compute_many` flags them, so an overflowing
+pair never reaches a response or the database as inf.
+"""
+
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, func
+from sqlalchemy.sql.elements import ColumnElement
+
+from . import operations
+from .operations import ArrayLike, Number
+
+VectorKernel = Callable[..., Tuple[np.ndarray, np.ndarray]]
+
+OUT_OF_RANGE_ERROR = "Result is out of range!"
+
+# Operands up to this magnitude cannot overflow a float when added, subtracted or multiplied
+SQL_SAFE_MAGNITUDE = 1e150
+SqlKernel = Callable[[ColumnElement, ColumnElement], ColumnElement]
+
+
+class Operation:
+    """A registered operation and its kernels."""
+
+    def __init__(self, name: str, scalar: Callable[..., Number], vector: Optional[VectorKernel] = None,
+                 arity: int = 2, symbol: Optional[str] = None, error: str = "Operation is undefined for these operands",
+                 description: str = "", sql: Optional[SqlKernel] = None, sql_invalid: Optional[SqlKernel] = None,
+                 sql_safe: Optional[SqlKernel] = None):
+        self.name = name
+        self.scalar = scalar
+        self.vector = vector or self._vectorize(scalar)
+        self.arity = arity
+        self.symbol = symbol
+        self.error = error
+        self.description = description
+        self.sql = sql
+        self.sql_invalid = sql_invalid
+        self.sql_safe = sql_safe
+
+    @staticmethod
+    def _vectorize(scalar: Callable[..., Number]) -> VectorKernel:
+        def kernel(*operands: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+            columns = [np.asarray(operand, dtype=np.float64) for operand in operands]
+            result = np.full(columns[0].shape, np.nan)
+            invalid = np.zeros(columns[0].shape, dtype=bool)
+            for index, values in enumerate(zip(*(column.tolist() for column in columns))):
+                try:
+                    result[index] = scalar(*values)
+                except ValueError:
+                    invalid[index] = True
+            return result, invalid
+        return kernel
+
+    def compute(self, a: Number, b: Optional[Number] = None) -> Number:
+        """Apply the scalar kernel. Raises ValueError if the result is undefined or out of range."""
+        operands = (a,) if self.arity == 1 else (a, b)
+        result = self.scalar(*operands)
+        if not math.isfinite(result) and all(math.isfinite(operand) for operand in operands):
+            raise ValueError(OUT_OF_RANGE_ERROR)
+        return result
+
+    def compute_many(self, a: ArrayLike, b: Optional[ArrayLike] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Apply the vectorized kernel. Returns the results and a mask of the
+        undefined or out-of-range elements (NaN in the results).
+        """
+        result, invalid, overflow = self._compute_many(a, b)
+        return result, invalid | overflow
+
+    def _compute_many(self, a: ArrayLike, b: Optional[ArrayLike]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The results, the kernel's mask of undefined elements and a mask of overflowed elements."""
+        if self.arity == 1:
+            operands = (np.asarray(a, dtype=np.float64),)
+        elif b is None:
+            raise ValueError(f"Operation {self.name} requires two operands")
+        else:
+            operands = (np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+        # Overflow is expected here and flagged below
+        with np.errstate(over="ignore"):
+            result, invalid = self.vector(*operands)
+        overflow = ~np.isfinite(result) & ~invalid
+        for operand in operands:
+            overflow &= np.isfinite(operand)
+        result[overflow] = np.nan
+        return result, invalid, overflow
+
+
+OPERATIONS: Dict[str, Operation] = {}
+
+
+def register(name: str, scalar: Callable[..., Number], vector: Optional[VectorKernel] = None, **options) -> Operation:
+    """Register an operation; see `Operation` for the options."""
+    operation = Operation(name, scalar, vector, **options)
+    OPERATIONS[name] = operation
+    return operation
+
+
+def get_operation(name: str) -> Operation:
+    """
+    Look up an operation by name.
+
+    Raises:
+    - ValueError: If no operation is registered under the name.
+    """
+    try:
+        return OPERATIONS[name]
+    except KeyError:
+        raise ValueError(f"Invalid operation type: {name}")
+
+
+def operation_names() -> List[str]:
+    return list(OPERATIONS)
+
+
+def type_pattern() -> str:
+    """Regex accepting exactly the registered operation names."""
+    return "^(" + "|".join(OPERATIONS) + ")$"
+
+
+def compute_batch(types: Sequence[str], a: Sequence[Number], b: Sequence[Number]) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """
+    Compute rows of mixed operation types with one vectorized call per type.
+
+    Returns the results and, per row, None or the error for that row.
+    """
+    results = np.full(len(types), np.nan)
+    errors: List[Optional[str]] = [None] * len(types)
+    indexes: Dict[str, List[int]] = {}
+    for index, name in enumerate(types):
+        indexes.setdefault(name, []).append(index)
+    a_arr = np.asarray(a, dtype=np.float64)
+    b_arr = np.asarray(b, dtype=np.float64)
+    for name, rows in indexes.items():
+        operation = OPERATIONS.get(name)
+        if operation is None:
+            for index in rows:
+                errors[index] = f"Invalid operation type: {name}"
+            continue
+        values, invalid, overflow = operation._compute_many(a_arr[rows], b_arr[rows])
+        results[rows] = values
+        for index in np.asarray(rows)[invalid].tolist():
+            errors[index] = operation.error
+        for index in np.asarray(rows)[overflow].tolist():
+            errors[index] = OUT_OF_RANGE_ERROR
+    return results, errors
+
+
+def _elementwise(kernel: Callable[[ArrayLike, ArrayLike], np.ndarray]) -> VectorKernel:
+    """Adapt a kernel that is defined for all operands to return an all-False mask (overflow is flagged by `compute_many`)."""
+    def vector(a: ArrayLike, b: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+        result = kernel(a, b)
+        return result, np.zeros(result.shape, dtype=bool)
+    return vector
+
+
+def _sql_bounded(a: ColumnElement, b: ColumnElement) -> ColumnElement:
+    return and_(func.abs(a) <= SQL_SAFE_MAGNITUDE, func.abs(b) <= SQL_SAFE_MAGNITUDE)
+
+
+def _sql_divide_bounded(a: ColumnElement, b: ColumnElement) -> ColumnElement:
+    # Zero divisors fall outside too and are reported by the vectorized kernel
+    return and_(func.abs(a) <= SQL_SAFE_MAGNITUDE, func.abs(b) >= 1 / SQL_SAFE_MAGNITUDE)
+
+
+register("add", operations.add, _elementwise(operations.add_array), symbol="+", description="Add two numbers.",
+         sql=lambda a, b: a + b, sql_safe=_sql_bounded)
+register("subtract", operations.subtract, _elementwise(operations.subtract_array), symbol="-", description="Subtract two numbers.",
+         sql=lambda a, b: a - b, sql_safe=_sql_bounded)
+register("multiply", operations.multiply, _elementwise(operations.multiply_array), symbol="*", description="Multiply two numbers.",
+         sql=lambda a, b: a * b, sql_safe=_sql_bounded)
+register("divide", operations.divide, operations.divide_array, symbol="/", error="Cannot divide by zero!",
+         description="Divide two numbers.", sql=lambda a, b: a / b, sql_invalid=lambda a, b: b == 0,
+         sql_safe=_sql_divide_bounded)
+# SQL's % truncates towards zero (Python's follows the divisor) and power/sqrt
+# are not built into every SQLite, so these three have no SQL kernel
+register("power", operations.power, operations.power_array, symbol="**", error="Power is undefined or out of range!",
+         description="Raise a to the power of b.")
+register("modulo", operations.modulo, operations.modulo_array, symbol="%", error="Cannot take modulo by zero!",
+         description="Remainder of a divided by b.")
+register("sqrt", operations.sqrt, operations.sqrt_array, arity=1, error="Cannot take the square root of a negative number!",
+         description="Square root of a.")
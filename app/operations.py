@@ -10,14 +10,29 @@ Functions:
 - subtract(a: Union[int, float], b: Union[int, float]) -> Union[int, float]: Returns the difference when b is subtracted from a.
 - multiply(a: Union[int, float], b: Union[int, float]) -> Union[int, float]: Returns the product of a and b.
 - divide(a: Union[int, float], b: Union[int, float]) -> float: Returns the quotient when a is divided by b. Raises ValueError if b is zero.
+- power(a: Union[int, float], b: Union[int, float]) -> float: Returns a raised to the power of b. Raises ValueError if the result is undefined or too large.
+- modulo(a: Union[int, float], b: Union[int, float]) -> Union[int, float]: Returns the remainder of a divided by b. Raises ValueError if b is zero.
+- sqrt(a: Union[int, float]) -> float: Returns the square root of a. Raises ValueError if a is negative.
+
+Vectorized variants operate element-wise on whole sequences or NumPy arrays in a single pass:
+- add_array(a, b) -> np.ndarray
+- subtract_array(a, b) -> np.ndarray
+- multiply_array(a, b) -> np.ndarray
+- divide_array(a, b) -> Tuple[np.ndarray, np.ndarray]: Returns the quotients and a boolean mask
+  flagging the elements where b is zero (their quotient is NaN) instead of raising.
+- power_array(a, b), modulo_array(a, b), sqrt_array(a) -> Tuple[np.ndarray, np.ndarray]: Likewise return
+  the results and a mask flagging the elements where the operation is undefined.
 
 Usage:
 These functions can be imported and used in other modules or integrated into APIs
 to perform arithmetic operations based on user input.
 """
 
-from typing import Union  # Import Union for type hinting multiple possible types
+from typing import Sequence, Tuple, Union  # Import Union for type hinting multiple possible types
 import logging
+import math
+
+import numpy as np
 
 # Setup logger for operations module
 logger = logging.getLogger(__name__)
@@ -25,6 +40,9 @@ logger = logging.getLogger(__name__)
 # Define a type alias for numbers that can be either int or float
 Number = Union[int, float]
 
+# Define a type alias for the operands accepted by the vectorized kernels
+ArrayLike = Union[Sequence[Number], np.ndarray]
+
 def add(a: Number, b: Number) -> Number:
     """
     Add two numbers and return the result.
@@ -42,10 +60,10 @@ def add(a: Number, b: Number) -> Number:
     >>> add(2.5, 3)
     5.5
     """
-    logger.debug(f"Adding {a} and {b}")
+    logger.debug("Adding %s and %s", a, b)
     # Perform addition of a and b
     result = a + b
-    logger.debug(f"Addition result: {result}")
+    logger.debug("Addition result: %s", result)
     return result
 
 def subtract(a: Number, b: Number) -> Number:
@@ -65,10 +83,10 @@ def subtract(a: Number, b: Number) -> Number:
     >>> subtract(5.5, 2)
     3.5
     """
-    logger.debug(f"Subtracting {b} from {a}")
+    logger.debug("Subtracting %s from %s", b, a)
     # Perform subtraction of b from a
     result = a - b
-    logger.debug(f"Subtraction result: {result}")
+    logger.debug("Subtraction result: %s", result)
     return result
 
 def multiply(a: Number, b: Number) -> Number:
@@ -88,10 +106,10 @@ def multiply(a: Number, b: Number) -> Number:
     >>> multiply(2.5, 4)
     10.0
     """
-    logger.debug(f"Multiplying {a} and {b}")
+    logger.debug("Multiplying %s and %s", a, b)
     # Perform multiplication of a and b
     result = a * b
-    logger.debug(f"Multiplication result: {result}")
+    logger.debug("Multiplication result: %s", result)
     return result
 
 def divide(a: Number, b: Number) -> float:
@@ -118,15 +136,212 @@ def divide(a: Number, b: Number) -> float:
         ...
     ValueError: Cannot divide by zero!
     """
-    logger.debug(f"Dividing {a} by {b}")
+    logger.debug("Dividing %s by %s", a, b)
     # Check if the divisor is zero to prevent division by zero
     if b == 0:
-        logger.warning(f"Division by zero attempted: {a} / {b}")
+        logger.warning("Division by zero attempted: %s / %s", a, b)
         # Raise a ValueError with a descriptive message
         raise ValueError("Cannot divide by zero!")
     
     # Perform division of a by b and return the result as a float
     result = a / b
-    logger.debug(f"Division result: {result}")
+    logger.debug("Division result: %s", result)
+    return result
+
+def power(a: Number, b: Number) -> float:
+    """
+    Raise the first number to the power of the second.
+
+    Raises:
+    - ValueError: If the result is undefined (e.g. a negative base with a fractional
+      exponent, or zero to a negative power) or too large to represent.
+
+    Example:
+    >>> power(2, 3)
+    8.0
+    >>> power(4, 0.5)
+    2.0
+    """
+    logger.debug("Raising %s to the power of %s", a, b)
+    try:
+        result = math.pow(a, b)
+    except OverflowError:
+        raise ValueError("Power result is too large!")
+    except ValueError:
+        raise ValueError("Power is undefined for these operands!")
+    logger.debug("Power result: %s", result)
     return result
 
+def modulo(a: Number, b: Number) -> Number:
+    """
+    Return the remainder of the first number divided by the second.
+
+    The result takes the sign of the divisor, as with Python's % operator.
+
+    Raises:
+    - ValueError: If b is zero.
+
+    Example:
+    >>> modulo(7, 3)
+    1
+    >>> modulo(-7, 3)
+    2
+    """
+    logger.debug("Computing %s modulo %s", a, b)
+    if b == 0:
+        raise ValueError("Cannot take modulo by zero!")
+    result = a % b
+    logger.debug("Modulo result: %s", result)
+    return result
+
+def sqrt(a: Number) -> float:
+    """
+    Return the square root of a number.
+
+    Raises:
+    - ValueError: If a is negative.
+
+    Example:
+    >>> sqrt(9)
+    3.0
+    """
+    logger.debug("Taking the square root of %s", a)
+    if a < 0:
+        raise ValueError("Cannot take the square root of a negative number!")
+    result = math.sqrt(a)
+    logger.debug("Square root result: %s", result)
+    return result
+
+
+def _as_operands(a: ArrayLike, b: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert both operands to float64 arrays of the same shape.
+
+    Raises:
+    - ValueError: If the operands cannot be converted or their shapes differ.
+    """
+    try:
+        a_arr = np.asarray(a, dtype=np.float64)
+        b_arr = np.asarray(b, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("Operands must be sequences of numbers.")
+    if a_arr.shape != b_arr.shape:
+        raise ValueError(f"Operand shapes differ: {a_arr.shape} and {b_arr.shape}")
+    return a_arr, b_arr
+
+def add_array(a: ArrayLike, b: ArrayLike) -> np.ndarray:
+    """
+    Add two sequences of numbers element-wise.
+
+    Example:
+    >>> add_array([1, 2], [3, 4]).tolist()
+    [4.0, 6.0]
+    """
+    a_arr, b_arr = _as_operands(a, b)
+    logger.debug("Adding %d element pairs", a_arr.size)
+    return np.add(a_arr, b_arr)
+
+def subtract_array(a: ArrayLike, b: ArrayLike) -> np.ndarray:
+    """
+    Subtract the elements of b from the elements of a.
+
+    Example:
+    >>> subtract_array([5, 2], [3, 4]).tolist()
+    [2.0, -2.0]
+    """
+    a_arr, b_arr = _as_operands(a, b)
+    logger.debug("Subtracting %d element pairs", a_arr.size)
+    return np.subtract(a_arr, b_arr)
+
+def multiply_array(a: ArrayLike, b: ArrayLike) -> np.ndarray:
+    """
+    Multiply two sequences of numbers element-wise.
+
+    Example:
+    >>> multiply_array([2, 2.5], [3, 4]).tolist()
+    [6.0, 10.0]
+    """
+    a_arr, b_arr = _as_operands(a, b)
+    logger.debug("Multiplying %d element pairs", a_arr.size)
+    return np.multiply(a_arr, b_arr)
+
+def divide_array(a: ArrayLike, b: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Divide the elements of a by the elements of b.
+
+    Division by zero does not raise: the affected elements are set to NaN and
+    flagged in the returned mask.
+
+    Returns:
+    - Tuple[np.ndarray, np.ndarray]: The quotients and a boolean mask that is True
+      wherever the divisor was zero.
+
+    Example:
+    >>> quotients, zero_mask = divide_array([6, 5], [3, 0])
+    >>> quotients[0].item(), zero_mask.tolist()
+    (2.0, [False, True])
+    """
+    a_arr, b_arr = _as_operands(a, b)
+    logger.debug("Dividing %d element pairs", a_arr.size)
+    zero_mask = b_arr == 0
+    result = np.full(a_arr.shape, np.nan)
+    np.divide(a_arr, b_arr, out=result, where=~zero_mask)
+    return result, zero_mask
+
+def power_array(a: ArrayLike, b: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Raise the elements of a to the powers in b.
+
+    Returns the results and a mask that is True wherever the power is undefined
+    or overflows (the result there is NaN).
+
+    Example:
+    >>> results, invalid = power_array([2, -8, 10], [3, 0.5, 400])
+    >>> results[0].item(), invalid.tolist()
+    (8.0, [False, True, True])
+    """
+    a_arr, b_arr = _as_operands(a, b)
+    logger.debug("Raising %d element pairs to a power", a_arr.size)
+    with np.errstate(all="ignore"):
+        result = np.power(a_arr, b_arr)
+    invalid = ~np.isfinite(result) & np.isfinite(a_arr) & np.isfinite(b_arr)
+    result[invalid] = np.nan
+    return result, invalid
+
+def modulo_array(a: ArrayLike, b: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the element-wise remainders of a divided by b.
+
+    Returns the remainders and a mask that is True wherever b is zero (the
+    remainder there is NaN).
+
+    Example:
+    >>> remainders, zero_mask = modulo_array([7, -7, 1], [3, 3, 0])
+    >>> remainders[:2].tolist(), zero_mask.tolist()
+    ([1.0, 2.0], [False, False, True])
+    """
+    a_arr, b_arr = _as_operands(a, b)
+    logger.debug("Computing %d element pairs modulo", a_arr.size)
+    zero_mask = b_arr == 0
+    result = np.full(a_arr.shape, np.nan)
+    np.mod(a_arr, b_arr, out=result, where=~zero_mask)
+    return result, zero_mask
+
+def sqrt_array(a: ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the element-wise square roots of a.
+
+    Returns the roots and a mask that is True wherever a is negative (the root
+    there is NaN).
+
+    Example:
+    >>> roots, negative_mask = sqrt_array([9, -1])
+    >>> roots[0].item(), negative_mask.tolist()
+    (3.0, [False, True])
+    """
+    a_arr, _ = _as_operands(a, a)
+    logger.debug("Taking %d square roots", a_arr.size)
+    negative_mask = a_arr < 0
+    result = np.full(a_arr.shape, np.nan)
+    np.sqrt(a_arr, out=result, where=~negative_mask)
+    return result, negative_mask
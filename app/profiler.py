@@ -0,0 +1,125 @@
+"""
+Opt-in per-request database profiler.
+
+With DB_PROFILER=true every HTTP response carries
+
+- X-DB-Queries: the number of SQL statements the request executed, and
+- X-DB-Time: the time spent executing them, in milliseconds,
+
+counted until the response starts (a streamed body's later queries are not
+included). Statements slower than DB_SLOW_QUERY_MS are logged with their
+parameters and EXPLAIN plan, whether or not they ran inside a request.
+
+Queries are attributed to the request through a context variable, which
+Starlette copies into the threadpool running sync routes and SQLAlchemy into
+the greenlets of the async engine. The counting listeners run for every
+statement and return immediately while no request is being profiled.
+
+Tests enable the profiler per test and assert query budgets from the headers;
+see the `max_queries` fixture in tests/integration/conftest.py.
+"""
+
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Add X-DB-Queries / X-DB-Time headers and log slow queries
+DB_PROFILER = os.getenv("DB_PROFILER", "false").lower() == "true"
+# Statements at least this slow are logged with their EXPLAIN plan
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+
+QUERIES_HEADER = "X-DB-Queries"
+TIME_HEADER = "X-DB-Time"
+
+# Statements whose plan can be shown by prefixing EXPLAIN
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class QueryProfile:
+    """Statements executed, and the time spent in them, on behalf of one request."""
+
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def headers(self) -> dict:
+        return {QUERIES_HEADER: str(self.queries), TIME_HEADER: f"{self.seconds * 1000:.3f}"}
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("current_profile", default=None)
+
+
+def explain(conn, statement: str, parameters) -> Optional[str]:
+    """The database's plan for `statement`, or None if it cannot be explained."""
+    if statement.lstrip().split(None, 1)[0].upper() not in EXPLAINABLE:
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    # A raw cursor, so the EXPLAIN itself is neither profiled nor logged
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join(" ".join(str(value) for value in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f"<unavailable: {e}>"
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_profile_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and (DB_PROFILER or current_profile.get() is not None):
+        context._profile_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _profile_query(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_profile_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    profile = current_profile.get()
+    if profile is not None:
+        profile.queries += 1
+        profile.seconds += elapsed
+    if DB_PROFILER and elapsed * 1000 >= DB_SLOW_QUERY_MS:
+        plan = None if executemany else explain(conn, statement, parameters)
+        logger.warning(
+            "Slow query (%.1f ms): %s\nParameters: %r\nPlan:\n%s",
+            elapsed * 1000, statement, parameters, plan or "<not available>",
+        )
+
+
+class ProfilerMiddleware:
+    """ASGI middleware adding the X-DB-Queries and X-DB-Time headers while DB_PROFILER is on."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not DB_PROFILER:
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.extend((name.lower().encode(), value.encode()) for name, value in profile.headers().items())
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
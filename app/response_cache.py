@@ -0,0 +1,143 @@
+"""
+In-process cache of serialized calculation read responses.
+
+GET /calculations/ and GET /calculations/{id} store their JSON body here,
+keyed by user and by the response's ETag (which already encodes the user's
+calculation version and the request parameters). A key can therefore never
+serve data older than the user's last committed write, even when the write was
+handled by another worker process. Writes through the calculation routes also
+drop the user's entries in this process, so stale bodies do not sit in memory
+until they are evicted.
+
+The cache is an LRU bounded by the total size of the cached bodies.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from fastapi import Response
+
+from .calculation_versions import CACHE_CONTROL
+from .metrics import REGISTRY, counter, gauge
+
+# Total bytes of cached bodies, per worker process
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Larger bodies are served but not cached
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+
+
+class CachedResponse:
+    """A serialized JSON body plus the extra headers it was served with."""
+
+    __slots__ = ("body", "headers")
+
+    def __init__(self, body: bytes, headers: Dict[str, str]):
+        self.body = body
+        self.headers = headers
+
+    def to_response(self, etag: str) -> Response:
+        headers = dict(self.headers)
+        headers["ETag"] = etag
+        headers["Cache-Control"] = CACHE_CONTROL
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """LRU of `CachedResponse`s bounded by total body bytes, with per-user invalidation."""
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[Tuple[int, str], CachedResponse]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[Tuple[int, str]]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((user_id, key))
+            self.hits += 1
+            return entry
+
+    def put(self, user_id: int, key: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        entry = CachedResponse(body, headers or {})
+        if len(body) > self.max_entry_bytes or len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            self._remove((user_id, key))
+            self._entries[(user_id, key)] = entry
+            self._keys_by_user.setdefault(user_id, set()).add((user_id, key))
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return entry
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached response of one user."""
+        with self._lock:
+            keys = self._keys_by_user.pop(user_id, ())
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= len(entry.body)
+                    self.invalidations += 1
+
+    def _remove(self, key: Tuple[int, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry.body)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_ENTRY_BYTES)
+
+
+def _collect_response_cache():
+    stats = response_cache.stats()
+    yield gauge("response_cache_entries", "Calculation responses held in the response cache.", stats["entries"])
+    yield gauge("response_cache_bytes", "Bytes of cached calculation response bodies.", stats["bytes"])
+    yield gauge("response_cache_max_bytes", "Configured byte budget of the response cache.", stats["max_bytes"])
+    yield counter("response_cache_hits_total", "Response cache hits.", stats["hits"])
+    yield counter("response_cache_misses_total", "Response cache misses.", stats["misses"])
+    yield counter("response_cache_evictions_total", "Responses evicted to stay within the byte budget.", stats["evictions"])
+    yield counter("response_cache_invalidations_total", "Responses dropped because their user wrote to calculations.", stats["invalidations"])
+
+
+REGISTRY.register_collector(_collect_response_cache)
@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, FiniteFloat, model_validator
+
+from .operation_registry import OPERATIONS, type_pattern
 
 
 class UserBase(BaseModel):
@@ -38,9 +40,20 @@ class PasswordChange(BaseModel):
 
 
 class CalculationCreate(BaseModel):
-    a: float
-    b: float
-    type: str = Field(..., pattern="^(add|subtract|multiply|divide)$")
+    # inf/NaN operands (e.g. 1e400 in JSON) are rejected with a 422
+    a: FiniteFloat
+    b: Optional[FiniteFloat] = None
+    type: str = Field(..., pattern=type_pattern())
+
+    @model_validator(mode="after")
+    def check_operands(self):
+        if OPERATIONS[self.type].arity == 1:
+            # Unary operations ignore b; the column is NOT NULL, so store 0
+            if self.b is None:
+                self.b = 0.0
+        elif self.b is None:
+            raise ValueError(f"b is required for {self.type}")
+        return self
 
 
 class CalculationRead(CalculationCreate):
@@ -48,11 +61,75 @@ class CalculationRead(CalculationCreate):
     result: float
     user_id: int
     created_at: datetime
+    uuid: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
+class CalculationQueued(CalculationCreate):
+    """
+    A calculation acknowledged in write-behind mode, stored later under `uuid`.
+    Failed flushes are retried, but a row is lost if its user is deleted before
+    it is stored or the process dies with the row still buffered.
+    """
+    uuid: str
+    result: float
+    user_id: int
+    created_at: datetime
+
+
+class CalculationBatchCreate(BaseModel):
+    items: List[CalculationCreate] = Field(..., min_length=1)
+
+
+class CalculationBatchItemResult(BaseModel):
+    index: int
+    calculation: Optional[CalculationRead] = None
+    error: Optional[str] = None
+
+
+class CalculationBatchResult(BaseModel):
+    created: int
+    failed: int
+    results: List[CalculationBatchItemResult]
+
+
+class CalculationChanges(BaseModel):
+    a: Optional[FiniteFloat] = None
+    b: Optional[FiniteFloat] = None
+    type: Optional[str] = Field(None, pattern=type_pattern())
+
+
+class CalculationBulkUpdate(BaseModel):
+    # Filters, combined with AND; at least one is required
+    ids: Optional[List[int]] = None
+    type: Optional[str] = Field(None, pattern=type_pattern())
+    created_before: Optional[datetime] = None
+    # New operands and/or operation; omitted fields keep each row's value.
+    # Results are recomputed either way.
+    set: CalculationChanges = Field(default_factory=CalculationChanges)
+
+
+class CalculationBulkUpdateResult(BaseModel):
+    updated: int
+    failed: int
+
+
+class CalculationBulkDeleteResult(BaseModel):
+    deleted: int
+
+
+class CalculationStatsRead(BaseModel):
+    count: int
+    count_by_type: Dict[str, int]
+    sum: float
+    min: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+    latest_created_at: Optional[datetime] = None
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -1,12 +1,19 @@
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 from . import models, schemas
-from .dependencies import get_db
+from .hashing import hash_pool, compute_hash, check_hash
+from .metrics import REGISTRY, counter, gauge
+from .dependencies import get_async_db, get_db
 from .db import SessionLocal
 
 # SECRET_KEY should be in env vars in production
@@ -14,14 +21,97 @@ SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Resolved-user cache used by get_current_user; a size or TTL of 0 disables it
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
 
+class UserCache:
+    """
+    Bounded TTL + LRU cache of authenticated users keyed by token subject.
+
+    Entries are column snapshots rather than ORM instances, so nothing is tied
+    to the session that loaded them. The TTL bounds staleness across worker
+    processes; writes in this process invalidate their entries explicitly.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, subject: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, subject: str, user: models.User) -> None:
+        if not self.enabled:
+            return
+        snapshot = {column.key: getattr(user, column.key) for column in models.User.__table__.columns}
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *subjects: str) -> None:
+        with self._lock:
+            for subject in subjects:
+                self._entries.pop(subject, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+user_cache = UserCache(maxsize=AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL)
+
+def _collect_user_cache():
+    stats = user_cache.stats()
+    yield gauge("auth_user_cache_size", "Users held in the authenticated-user cache.", stats["size"])
+    yield counter("auth_user_cache_hits_total", "Authenticated-user cache hits.", stats["hits"])
+    yield counter("auth_user_cache_misses_total", "Authenticated-user cache misses.", stats["misses"])
+
+REGISTRY.register_collector(_collect_user_cache)
+
+# Hashing runs in the dedicated pool from hashing.py; the sync variants block
+# the calling (threadpool) thread, the async ones only await the result.
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return hash_pool.run(check_hash, plain_password, hashed_password)
 
 def hash_password(password):
-    return pwd_context.hash(password)
+    return hash_pool.run(compute_hash, password)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await hash_pool.run_async(check_hash, plain_password, hashed_password)
+
+async def hash_password_async(password):
+    return await hash_pool.run_async(compute_hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -33,22 +123,58 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _token_subject(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
         token_data = schemas.TokenData(username=username)
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+        raise _credentials_exception()
+    return token_data.username
+
+def _cached_user(subject: str) -> Optional[models.User]:
+    """Rebuild a cached user as a detached instance, ready to merge without a SELECT."""
+    if not user_cache.enabled:
+        return None
+    snapshot = user_cache.get(subject)
+    if snapshot is None:
+        return None
+    user = models.User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    # A plain def so FastAPI runs the blocking query in the threadpool
+    # instead of on the event loop.
+    subject = _token_subject(token)
+    cached = _cached_user(subject)
+    if cached is not None:
+        return db.merge(cached, load=False)
+
+    user = db.query(models.User).filter(models.User.username == subject).first()
+    if user is None:
+        raise _credentials_exception()
+    user_cache.set(subject, user)
+    return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    subject = _token_subject(token)
+    cached = _cached_user(subject)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+
+    result = await db.execute(select(models.User).where(models.User.username == subject))
+    user = result.scalars().first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    user_cache.set(subject, user)
     return user
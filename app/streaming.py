@@ -0,0 +1,196 @@
+"""
+WebSocket endpoint for high-rate streaming calculations: /ws/calculate.
+
+Clients send one JSON object per text frame,
+
+    {"id": 1, "op": "add", "a": 2, "b": 3}
+
+and receive one reply per request on the same connection, in request order:
+
+    {"id": 1, "result": 5.0}           or    {"id": 1, "error": "..."}
+
+Requests are pipelined: the client may send many before reading replies. A
+per-connection queue holds at most WS_MAX_IN_FLIGHT requests; while it is
+full the server stops reading from the socket, so a client that does not read
+its replies is slowed down by TCP flow control instead of growing the queue.
+Frames larger than WS_MAX_MESSAGE_BYTES close the connection with 1009.
+
+Messages skip Pydantic and the HTTP exception handlers entirely: they are
+parsed with `json.loads`, dispatched through the operation registry and
+answered with `json.dumps`.
+
+Authentication is optional and uses the same bearer token as the HTTP API,
+passed as `?token=` (browsers cannot set headers on a WebSocket) or in the
+Authorization header. With `?persist=true` an authenticated connection also
+stores every successful result in `calculations`, written in batches of up to
+WS_PERSIST_BATCH_SIZE rows; the reply then carries the new `calculation_id`.
+
+A connection holds no database connection while it is open: the token is
+checked in a session closed right after, and each persisted batch uses a
+session of its own.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, status
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from . import security
+from .calculations import insert_calculations
+from .dependencies import get_session_factory
+from .operation_registry import OPERATIONS
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Requests read from a connection but not yet answered
+WS_MAX_IN_FLIGHT = int(os.getenv("WS_MAX_IN_FLIGHT", "256"))
+# Largest accepted frame, in bytes
+WS_MAX_MESSAGE_BYTES = int(os.getenv("WS_MAX_MESSAGE_BYTES", "4096"))
+# Rows written per INSERT when persisting
+WS_PERSIST_BATCH_SIZE = int(os.getenv("WS_PERSIST_BATCH_SIZE", "500"))
+
+router = APIRouter()
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def evaluate_message(data: str) -> Tuple[dict, Optional[dict]]:
+    """
+    Answer one request frame.
+
+    Returns the reply and, for successful calculations, the row to persist.
+    """
+    try:
+        message = json.loads(data)
+    except ValueError:
+        return {"id": None, "error": "Invalid JSON"}, None
+    if not isinstance(message, dict):
+        return {"id": None, "error": "Expected a JSON object"}, None
+
+    request_id = message.get("id")
+    name = message.get("op")
+    operation = OPERATIONS.get(name) if isinstance(name, str) else None
+    if operation is None:
+        return {"id": request_id, "error": f"Unknown operation: {name}"}, None
+    a, b = message.get("a"), message.get("b")
+    if operation.arity == 1:
+        b = 0.0 if b is None else b
+    if not (_is_number(a) and _is_number(b)):
+        return {"id": request_id, "error": "a and b must be numbers"}, None
+
+    try:
+        a, b = float(a), float(b)
+    except OverflowError:
+        return {"id": request_id, "error": "a and b must be finite numbers"}, None
+    if not (math.isfinite(a) and math.isfinite(b)):
+        return {"id": request_id, "error": "a and b must be finite numbers"}, None
+    try:
+        result = float(operation.compute(a, b))
+    except (ValueError, OverflowError) as e:
+        return {"id": request_id, "error": str(e)}, None
+    if not math.isfinite(result):
+        return {"id": request_id, "error": "Result is not a finite number"}, None
+    return {"id": request_id, "result": result}, {"a": a, "b": b, "type": name, "result": result}
+
+
+def _authenticate(session_factory: Callable[[], Session], token: str) -> int:
+    with session_factory() as db:
+        return security.get_current_user(token, db).id
+
+
+def _persist(session_factory: Callable[[], Session], user_id: int, rows: List[dict]) -> List[int]:
+    with session_factory() as db:
+        created = insert_calculations(db, user_id, [{**row, "user_id": user_id} for row in rows])
+        ids = [calculation.id for calculation in created]
+        db.commit()
+    response_cache.invalidate_user(user_id)
+    return ids
+
+
+async def _answer(websocket: WebSocket, queue: asyncio.Queue, session_factory: Callable[[], Session],
+                  user_id: Optional[int]) -> None:
+    """Answer queued requests in order, persisting successful ones if `user_id` is set."""
+    try:
+        await _answer_batches(websocket, queue, session_factory, user_id)
+    except Exception:
+        logger.exception("Streaming calculation connection failed")
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+
+
+async def _answer_batches(websocket: WebSocket, queue: asyncio.Queue, session_factory: Callable[[], Session],
+                          user_id: Optional[int]) -> None:
+    while True:
+        # Take whatever is already queued, so persisted rows share one INSERT
+        frames = [await queue.get()]
+        while len(frames) < WS_PERSIST_BATCH_SIZE and not queue.empty():
+            frames.append(queue.get_nowait())
+
+        answered = [evaluate_message(frame) for frame in frames]
+        if user_id is not None:
+            persisted = [(reply, row) for reply, row in answered if row is not None]
+            if persisted:
+                ids = await run_in_threadpool(_persist, session_factory, user_id, [row for _, row in persisted])
+                for (reply, _), calculation_id in zip(persisted, ids):
+                    reply["calculation_id"] = calculation_id
+
+        for reply, _ in answered:
+            await websocket.send_text(json.dumps(reply))
+
+
+def _bearer_token(websocket: WebSocket, token: Optional[str]) -> Optional[str]:
+    if token:
+        return token
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    return credentials if scheme.lower() == "bearer" and credentials else None
+
+
+@router.websocket("/ws/calculate")
+async def calculate_stream(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    persist: bool = False,
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
+):
+    user_id = None
+    bearer = _bearer_token(websocket, token)
+    if bearer is not None:
+        try:
+            user_id = await run_in_threadpool(_authenticate, session_factory, bearer)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Could not validate credentials")
+            return
+    if persist and user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Authentication is required to persist results")
+        return
+
+    await websocket.accept()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=WS_MAX_IN_FLIGHT)
+    answering = asyncio.create_task(_answer(websocket, queue, session_factory, user_id if persist else None))
+    try:
+        while not answering.done():
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("text")
+            if data is None:
+                data = (message.get("bytes") or b"").decode("utf-8", errors="replace")
+            if len(data) > WS_MAX_MESSAGE_BYTES or len(data.encode()) > WS_MAX_MESSAGE_BYTES:
+                await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG, reason="Message too big")
+                break
+            # Waits while WS_MAX_IN_FLIGHT requests are pending
+            await queue.put(data)
+    finally:
+        answering.cancel()
+        try:
+            await answering
+        except asyncio.CancelledError:
+            pass
@@ -2,6 +2,7 @@ from typing import Generator, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from . import models, schemas, security
@@ -10,40 +11,53 @@ from .dependencies import get_db
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# The routes that hash passwords are async and await the hashing pool, so a
+# burst of logins never holds threadpool threads while it waits; their blocking
+# database work still runs in the threadpool, one short call at a time.
 
-@router.post("/register", response_model=schemas.UserRead, status_code=status.HTTP_201_CREATED)
-def create_user(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
-    user = models.User(
-        username=user_in.username,
-        email=user_in.email,
-        password_hash=security.hash_password(user_in.password),
-    )
+
+def _store_user(db: Session, user: models.User) -> models.User:
     db.add(user)
     try:
         db.commit()
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Username or email already exists")
+    # Drop anything cached for a previous account with the same name
+    security.user_cache.invalidate(user.username)
     db.refresh(user)
     return user
 
 
-@router.post("/login", response_model=schemas.Token)
-def login(
-    credentials: schemas.LoginRequest,
-    db: Session = Depends(get_db),
-):
-    if not credentials.username and not credentials.email:
-        raise HTTPException(status_code=400, detail="Username or email is required")
+@router.post("/register", response_model=schemas.UserRead, status_code=status.HTTP_201_CREATED)
+async def create_user(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+    user = models.User(
+        username=user_in.username,
+        email=user_in.email,
+        password_hash=await security.hash_password_async(user_in.password),
+    )
+    return await run_in_threadpool(_store_user, db, user)
 
+
+def _find_user(db: Session, credentials: schemas.LoginRequest) -> Optional[models.User]:
     query = db.query(models.User)
     if credentials.username:
         query = query.filter(models.User.username == credentials.username)
     if credentials.email:
         query = query.filter(models.User.email == credentials.email)
+    return query.first()
+
+
+@router.post("/login", response_model=schemas.Token)
+async def login(
+    credentials: schemas.LoginRequest,
+    db: Session = Depends(get_db),
+):
+    if not credentials.username and not credentials.email:
+        raise HTTPException(status_code=400, detail="Username or email is required")
 
-    user = query.first()
-    if not user or not security.verify_password(credentials.password, user.password_hash):
+    user = await run_in_threadpool(_find_user, db, credentials)
+    if not user or not await security.verify_password_async(credentials.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     access_token_expires = security.timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -59,6 +73,7 @@ def update_user_me(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(security.get_current_user),
 ):
+    previous_username = current_user.username
     if user_update.username:
         # Check if username already exists
         existing_user = db.query(models.User).filter(models.User.username == user_update.username).first()
@@ -79,23 +94,27 @@ def update_user_me(
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Username or email already exists")
+    security.user_cache.invalidate(previous_username, current_user.username)
     
     return current_user
 
 
 @router.post("/me/password", status_code=status.HTTP_200_OK)
-def change_password(
+async def change_password(
     password_change: schemas.PasswordChange,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(security.get_current_user),
 ):
-    if not security.verify_password(password_change.old_password, current_user.password_hash):
+    if not await security.verify_password_async(password_change.old_password, current_user.password_hash):
         raise HTTPException(status_code=400, detail="Incorrect old password")
     
     if password_change.old_password == password_change.new_password:
         raise HTTPException(status_code=400, detail="New password cannot be the same as old password")
 
-    current_user.password_hash = security.hash_password(password_change.new_password)
-    db.commit()
+    current_user.password_hash = await security.hash_password_async(password_change.new_password)
+    # Read before the commit expires it, which would reload it on the event loop
+    username = current_user.username
+    await run_in_threadpool(db.commit)
+    security.user_cache.invalidate(username)
     
     return {"message": "Password updated successfully"}
@@ -0,0 +1,272 @@
+"""
+Opt-in write-behind persistence for POST /calculations.
+
+With CALCULATION_WRITE_BEHIND=true a new calculation is computed, buffered in
+memory and acknowledged with 202 Accepted straight away, instead of waiting
+for its own INSERT, commit and refresh. The acknowledgement carries a `uuid`
+that the stored row keeps, so clients can find it once it has been written
+(the database id does not exist yet).
+
+A background thread flushes the buffer with one multi-row INSERT per user and
+one commit per flush, as soon as WRITE_BEHIND_BATCH_SIZE rows are waiting or
+the oldest row has waited WRITE_BEHIND_MAX_DELAY_MS. At most
+WRITE_BEHIND_MAX_ROWS rows are buffered per worker process; creates beyond
+that get a fast 503, which bounds both memory and the number of acknowledged
+rows that a crash could lose. The application's lifespan flushes everything
+left on shutdown.
+
+A flush that fails for a reason that may pass (the database is down, a
+connection drops) puts its rows back at the head of the buffer and is retried
+every WRITE_BEHIND_RETRY_DELAY_MS; meanwhile the buffer fills up and creates
+get 503s. Only rows the database rejects for good (an IntegrityError, e.g.
+their user was deleted meanwhile) are dropped, counted in
+write_behind_dropped_rows_total. Rows still buffered when the process crashes,
+or when the database is unreachable at shutdown, are lost.
+
+Until its flush, a calculation is missing from reads and stats.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal
+from .metrics import REGISTRY, Histogram, counter, gauge, histogram
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Acknowledge creates before they are stored
+CALCULATION_WRITE_BEHIND = os.getenv("CALCULATION_WRITE_BEHIND", "false").lower() == "true"
+# Rows buffered at once per worker process; further creates get a 503
+WRITE_BEHIND_MAX_ROWS = int(os.getenv("WRITE_BEHIND_MAX_ROWS", "10000"))
+# Flush as soon as this many rows are buffered...
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+# ...or once the oldest buffered row has waited this long
+WRITE_BEHIND_MAX_DELAY_MS = int(os.getenv("WRITE_BEHIND_MAX_DELAY_MS", "100"))
+# Seconds advertised in Retry-After when the buffer is full
+WRITE_BEHIND_RETRY_AFTER = int(os.getenv("WRITE_BEHIND_RETRY_AFTER", "1"))
+# Pause before retrying a flush that failed, e.g. while the database is down
+WRITE_BEHIND_RETRY_DELAY_MS = int(os.getenv("WRITE_BEHIND_RETRY_DELAY_MS", "1000"))
+
+
+class WriteBehindFull(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many calculations are waiting to be stored, please retry shortly",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class WriteBehindBuffer:
+    def __init__(self, enabled: bool, max_rows: int, batch_size: int, max_delay: float, retry_after: int = 1,
+                 retry_delay: float = 1.0, session_factory: Callable[[], Session] = SessionLocal):
+        self.enabled = enabled
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.retry_after = retry_after
+        self.retry_delay = retry_delay
+        self.session_factory = session_factory
+        self.flush_latency = Histogram()
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+        self.dropped_rows = 0
+        self.rejected = 0
+        self._rows: List[dict] = []
+        self._oldest: Optional[float] = None
+        # Rows taken from the buffer by a flush that has not finished yet
+        self._flushing = 0
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def submit(self, row: dict) -> None:
+        """
+        Buffer one computed row (the keyword arguments of a `Calculation`).
+
+        Raises:
+        - WriteBehindFull: If WRITE_BEHIND_MAX_ROWS rows are already buffered.
+        """
+        self.start()
+        with self._condition:
+            if len(self._rows) + self._flushing >= self.max_rows:
+                self.rejected += 1
+                raise WriteBehindFull(self.retry_after)
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+            if len(self._rows) == 1 or len(self._rows) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    if len(self._rows) >= self.batch_size:
+                        break
+                    if self._rows:
+                        remaining = self._oldest + self.max_delay - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed, retrying in %.1fs", self.retry_delay)
+                with self._condition:
+                    if not self._stopping:
+                        self._condition.wait(self.retry_delay)
+
+    def flush(self) -> int:
+        """
+        Store every buffered row now. Returns the number of rows stored.
+
+        Raises:
+        - Exception: The error of a batch that could not be stored; its rows
+          are back in the buffer.
+        """
+        stored = 0
+        with self._flush_lock:
+            while True:
+                with self._condition:
+                    rows, self._rows = self._rows[:self.batch_size], self._rows[self.batch_size:]
+                    if not self._rows:
+                        self._oldest = None
+                    self._flushing = len(rows)
+                if not rows:
+                    return stored
+                started = time.perf_counter()
+                try:
+                    batch_stored, unstored = self._store(rows)
+                except Exception:
+                    self._requeue(rows)
+                    raise
+                finally:
+                    with self._condition:
+                        self._flushing = 0
+                stored += batch_stored
+                if unstored:
+                    self._requeue(unstored)
+                    raise RuntimeError(f"{len(unstored)} buffered calculations could not be stored yet")
+                self.flush_latency.observe(time.perf_counter() - started)
+                self.flushes += 1
+
+    def _requeue(self, rows: List[dict]) -> None:
+        """Put the rows of a failed flush back at the head of the buffer, in order."""
+        with self._condition:
+            self._rows[:0] = rows
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self.failed_flushes += 1
+
+    def _store(self, rows: List[dict]) -> Tuple[int, List[dict]]:
+        """Store `rows`; returns how many were stored and those to retry later."""
+        # Imported here because `calculations` serves its create route from this buffer
+        from .calculations import insert_calculations
+
+        by_user: Dict[int, List[dict]] = {}
+        for row in rows:
+            by_user.setdefault(row["user_id"], []).append(row)
+
+        stored_users = []
+        unstored: List[dict] = []
+        with self.session_factory() as db:
+            try:
+                for user_id, user_rows in by_user.items():
+                    insert_calculations(db, user_id, user_rows)
+                db.commit()
+                stored_users = list(by_user)
+            except Exception:
+                db.rollback()
+                logger.exception("Write-behind flush of %d calculations failed, retrying per user", len(rows))
+                # One failing user (e.g. deleted meanwhile) must not sink everyone else's rows
+                for user_id, user_rows in by_user.items():
+                    try:
+                        insert_calculations(db, user_id, user_rows)
+                        db.commit()
+                        stored_users.append(user_id)
+                    except IntegrityError:
+                        db.rollback()
+                        self.dropped_rows += len(user_rows)
+                        logger.exception("Dropped %d buffered calculations of user %s", len(user_rows), user_id)
+                    except Exception:
+                        db.rollback()
+                        unstored.extend(user_rows)
+
+        for user_id in stored_users:
+            response_cache.invalidate_user(user_id)
+        stored = sum(len(by_user[user_id]) for user_id in stored_users)
+        self.flushed_rows += stored
+        return stored, unstored
+
+    def stop(self) -> None:
+        """Stop the flush thread and store whatever is still buffered."""
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._condition:
+            depth = len(self._rows) + self._flushing
+            oldest_age = time.monotonic() - self._oldest if self._oldest is not None else 0.0
+        return {
+            "queue_depth": depth,
+            "max_rows": self.max_rows,
+            "oldest_age": oldest_age,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_flushes": self.failed_flushes,
+            "dropped_rows": self.dropped_rows,
+            "rejected": self.rejected,
+        }
+
+
+write_behind = WriteBehindBuffer(
+    enabled=CALCULATION_WRITE_BEHIND,
+    max_rows=WRITE_BEHIND_MAX_ROWS,
+    batch_size=WRITE_BEHIND_BATCH_SIZE,
+    max_delay=WRITE_BEHIND_MAX_DELAY_MS / 1000,
+    retry_after=WRITE_BEHIND_RETRY_AFTER,
+    retry_delay=WRITE_BEHIND_RETRY_DELAY_MS / 1000,
+)
+
+
+def _collect_write_behind():
+    stats = write_behind.stats()
+    yield gauge("write_behind_queue_depth", "Acknowledged calculations not stored yet.", stats["queue_depth"])
+    yield gauge("write_behind_max_rows", "Calculations that may be buffered at once.", stats["max_rows"])
+    yield gauge("write_behind_oldest_age_seconds", "Time the oldest buffered calculation has waited.", stats["oldest_age"])
+    yield counter("write_behind_flushes_total", "Write-behind flushes.", stats["flushes"])
+    yield counter("write_behind_flushed_rows_total", "Buffered calculations stored.", stats["flushed_rows"])
+    yield counter("write_behind_failed_flushes_total", "Flushes whose calculations went back to the buffer.", stats["failed_flushes"])
+    yield counter("write_behind_dropped_rows_total", "Buffered calculations the database rejected for good.", stats["dropped_rows"])
+    yield counter("write_behind_rejected_total", "Creates rejected with a 503 because the buffer was full.", stats["rejected"])
+    yield histogram("write_behind_flush_duration_seconds", "Time to store one flushed batch.", write_behind.flush_latency)
+
+
+REGISTRY.register_collector(_collect_write_behind)
@@ -0,0 +1,108 @@
+"""
+Compare the ORM read path with the Core + direct JSON read path of
+GET /calculations/ for pages of 10, 100 and 1000 rows.
+
+    python -m benchmarks.calculation_reads [--repeat N]
+
+Each path runs the page query against an in-memory SQLite database and
+serializes the result to JSON bytes:
+
+- orm:  ORM `Calculation` objects, validated into `CalculationRead` and dumped
+        (what the response model does)
+- core: `READ_COLUMNS` rows serialized straight to JSON (`rows_to_json`)
+
+Latency is the median of N runs; allocations are the peak memory traced by
+tracemalloc during one run. Importing `app` creates its engine, so point
+DATABASE_URL at a database whose driver is installed, e.g. DATABASE_URL=sqlite://.
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import models, schemas
+from app.calculations import READ_COLUMNS, rows_to_json
+from app.db import Base
+
+SIZES = (10, 100, 1000)
+ADAPTER = TypeAdapter(List[schemas.CalculationRead])
+
+
+def setup_database(rows: int) -> Session:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = Session(bind=engine)
+    user = models.User(username="bench", email="bench@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    db.execute(insert(models.Calculation), [
+        {"a": i * 1.5, "b": 3.0, "type": "multiply", "result": i * 4.5, "user_id": user.id} for i in range(rows)
+    ])
+    db.commit()
+    return db
+
+
+def orm_page(db: Session, user_id: int, limit: int) -> bytes:
+    calculations = (
+        db.query(models.Calculation)
+        .filter(models.Calculation.user_id == user_id)
+        .order_by(models.Calculation.id)
+        .limit(limit)
+        .all()
+    )
+    body = ADAPTER.dump_json(ADAPTER.validate_python(calculations))
+    # Each request starts with an empty session
+    db.expunge_all()
+    return body
+
+
+def core_page(db: Session, user_id: int, limit: int) -> bytes:
+    rows = db.execute(
+        select(*READ_COLUMNS)
+        .where(models.Calculation.user_id == user_id)
+        .order_by(models.Calculation.id)
+        .limit(limit)
+    ).all()
+    return rows_to_json(rows)
+
+
+def measure(page, db: Session, user_id: int, limit: int, repeat: int) -> dict:
+    page(db, user_id, limit)  # warm up statement caches
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        page(db, user_id, limit)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    page(db, user_id, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_ms": statistics.median(timings) * 1000, "peak_kib": peak / 1024}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="Timed runs per path and size")
+    args = parser.parse_args(argv)
+
+    db = setup_database(max(SIZES))
+    user_id = db.execute(select(models.User.id)).scalar_one()
+
+    print(f"{'rows':>6} {'path':<5} {'median ms':>10} {'peak KiB':>10}")
+    for size in SIZES:
+        assert orm_page(db, user_id, size) == core_page(db, user_id, size)
+        for name, page in (("orm", orm_page), ("core", core_page)):
+            result = measure(page, db, user_id, size, args.repeat)
+            print(f"{size:>6} {name:<5} {result['median_ms']:>10.3f} {result['peak_kib']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
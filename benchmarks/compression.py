@@ -0,0 +1,106 @@
+"""
+CPU versus bytes of response compression on GET /calculations/ pages of 10,
+100 and 1000 `CalculationRead` rows, and on a streamed NDJSON export.
+
+    python -m benchmarks.compression [--repeat N] [--sizes 10,100,1000] [--chunk-rows N]
+
+For every algorithm and level `app/compression.py` can use (brotli only when
+the optional package is installed) it reports the compressed size, the ratio
+against the uncompressed body, and the best-of-N time to compress one body, both in
+µs and as input MB/s. `stream` rows compress the export of the same rows the
+way the middleware compresses a streamed body: one sync-flushed chunk per
+--chunk-rows rows (default CALCULATION_EXPORT_BATCH_SIZE), which costs some
+ratio in exchange for chunks that decode as they arrive.
+
+Bodies below COMPRESSION_MIN_SIZE are not compressed by the middleware; the
+10-row page shows why. Importing `app` creates its engine, so point
+DATABASE_URL at a database whose driver is installed, e.g. DATABASE_URL=sqlite://.
+"""
+
+import argparse
+import random
+import timeit
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Tuple
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+from app import schemas
+from app.calculations import CALCULATION_EXPORT_BATCH_SIZE
+from app.compression import COMPRESSION_MIN_SIZE, Encoder, available_algorithms
+
+ADAPTER = TypeAdapter(List[schemas.CalculationRead])
+LEVELS = {"gzip": (1, 6, 9), "deflate": (1, 6), "br": (1, 4, 11)}
+OPERATIONS = ("add", "subtract", "multiply", "divide", "power", "modulo")
+
+
+def calculation_rows(count: int, seed: int = 0) -> List[schemas.CalculationRead]:
+    """Rows shaped like real history: mixed operations, random operands, ascending ids and timestamps."""
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        a, b = round(rng.uniform(-1000, 1000), 3), round(rng.uniform(1, 1000), 3)
+        rows.append(schemas.CalculationRead(
+            id=i + 1, a=a, b=b, type=rng.choice(OPERATIONS), result=a / b, user_id=1,
+            created_at=started + timedelta(seconds=i * 37),
+        ))
+    return rows
+
+
+def page_body(rows: List[schemas.CalculationRead]) -> bytes:
+    return ADAPTER.dump_json(rows)
+
+
+def export_chunks(rows: List[schemas.CalculationRead], chunk_rows: int) -> List[bytes]:
+    """The NDJSON export of `rows`, in chunks of `chunk_rows` rows as GET /calculations/export streams it."""
+    lines = [to_json(row) + b"\n" for row in rows]
+    return [b"".join(lines[i:i + chunk_rows]) for i in range(0, len(lines), chunk_rows)]
+
+
+def compress_body(algorithm: str, level: int, body: bytes) -> bytes:
+    encoder = Encoder(algorithm, level)
+    return encoder.compress(body) + encoder.finish()
+
+
+def compress_stream(algorithm: str, level: int, chunks: List[bytes]) -> bytes:
+    encoder = Encoder(algorithm, level)
+    return b"".join(encoder.compress(chunk, flush=True) for chunk in chunks) + encoder.finish()
+
+
+def best_time(function: Callable[[], object], repeat: int) -> float:
+    """Best time per call in seconds."""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def settings() -> List[Tuple[str, int]]:
+    return [(algorithm, level) for algorithm in available_algorithms() for level in LEVELS[algorithm]]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed loops per measurement")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated page sizes in rows")
+    parser.add_argument("--chunk-rows", type=int, default=CALCULATION_EXPORT_BATCH_SIZE, help="Rows per streamed chunk")
+    args = parser.parse_args(argv)
+
+    print(f"COMPRESSION_MIN_SIZE={COMPRESSION_MIN_SIZE}, export chunk={args.chunk_rows} rows")
+    print(f"{'body':<12} {'encoding':<10} {'bytes':>9} {'ratio':>7} {'µs':>10} {'MB/s':>8}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        rows = calculation_rows(size)
+        body, chunks = page_body(rows), export_chunks(rows, args.chunk_rows)
+        print(f"{f'page {size}':<12} {'identity':<10} {len(body):>9} {1:>7.2f} {'-':>10} {'-':>8}")
+        for name, data, compress, raw in ((f"page {size}", body, compress_body, len(body)),
+                                          (f"stream {size}", chunks, compress_stream, sum(map(len, chunks)))):
+            for algorithm, level in settings():
+                compressed = compress(algorithm, level, data)
+                seconds = best_time(lambda: compress(algorithm, level, data), args.repeat)
+                print(f"{name:<12} {f'{algorithm}:{level}':<10} {len(compressed):>9} {raw / len(compressed):>7.2f} "
+                      f"{seconds * 1e6:>10.1f} {raw / seconds / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+End-to-end HTTP load test: throughput and latency percentiles per endpoint.
+
+    python -m benchmarks.load_test [--duration 30] [--concurrency 16]
+        [--database-url URL | --url http://host:port]
+        [--save-baseline benchmarks/baseline.json]
+        [--baseline benchmarks/baseline.json --threshold 0.2]
+
+Unless --url points at a running server, the database is migrated and the
+app started with uvicorn, against a fresh SQLite database in a temporary
+directory or against --database-url (e.g. a scratch Postgres database). Each of the --concurrency
+clients registers its own user, then sends requests drawn from MIX for
+--duration seconds with asyncio + httpx: the stateless /add ... /divide
+routes, login, and create/list/get/update/delete of its own calculations.
+
+The report lists requests, errors (4xx/5xx responses and failed connections),
+throughput and p50/p95/p99 latency per endpoint. --save-baseline writes it as
+JSON; --baseline compares against such a file and exits with status 1 when
+any endpoint's latency percentile grew, or its throughput shrank, by more than
+--threshold (a fraction, default 0.2). Compare runs made on the same machine
+with the same options.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Relative weight of each endpoint in the request mix
+MIX = {
+    "POST /add": 10,
+    "POST /subtract": 10,
+    "POST /multiply": 10,
+    "POST /divide": 10,
+    "POST /users/login": 2,
+    "POST /calculations": 15,
+    "GET /calculations": 15,
+    "GET /calculations/{id}": 15,
+    "PUT /calculations/{id}": 8,
+    "DELETE /calculations/{id}": 5,
+}
+
+PERCENTILES = (50, 95, 99)
+PASSWORD = "load-test-password"
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of `values` (which must be sorted)."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+class Client:
+    """One simulated user, with the calculations it has created so far."""
+
+    def __init__(self, http: httpx.AsyncClient, index: int, run_id: str):
+        self.http = http
+        self.username = f"load_{run_id}_{index}"
+        self.ids: List[int] = []
+        self.timings: Dict[str, List[float]] = {name: [] for name in MIX}
+        self.errors: Dict[str, int] = {name: 0 for name in MIX}
+
+    async def register(self) -> None:
+        response = await self.http.post("/users/register", json={
+            "username": self.username, "email": f"{self.username}@example.com", "password": PASSWORD,
+        })
+        response.raise_for_status()
+        await self.login()
+
+    async def login(self) -> httpx.Response:
+        response = await self.http.post("/users/login", json={"username": self.username, "password": PASSWORD})
+        if response.status_code == 200:
+            self.http.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        return response
+
+    def _operands(self) -> dict:
+        return {"a": round(random.uniform(-1000, 1000), 3), "b": round(random.uniform(1, 1000), 3)}
+
+    async def send(self, name: str) -> Optional[httpx.Response]:
+        """Send one request for the endpoint `name`; None if it does not apply yet."""
+        method, path = name.split(" ")
+        if path == "/users/login":
+            return await self.login()
+        if path == "/calculations":
+            if method == "GET":
+                return await self.http.get("/calculations/", params={"limit": 20})
+            operation = random.choice(("add", "subtract", "multiply", "divide"))
+            response = await self.http.post("/calculations/", json={**self._operands(), "type": operation})
+            if response.status_code == 201:
+                self.ids.append(response.json()["id"])
+            return response
+        if path == "/calculations/{id}":
+            if not self.ids:
+                return None
+            if method == "DELETE":
+                return await self.http.delete(f"/calculations/{self.ids.pop()}")
+            calculation_id = random.choice(self.ids)
+            if method == "PUT":
+                return await self.http.put(f"/calculations/{calculation_id}", json={**self._operands(), "type": "multiply"})
+            return await self.http.get(f"/calculations/{calculation_id}")
+        return await self.http.post(path, json=self._operands())
+
+    async def run(self, deadline: float) -> None:
+        names, weights = list(MIX), list(MIX.values())
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await self.send(name)
+            except httpx.HTTPError:
+                self.errors[name] += 1
+                continue
+            if response is None:
+                continue
+            self.timings[name].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                self.errors[name] += 1
+
+
+def summarize(clients: List[Client], elapsed: float) -> Dict[str, dict]:
+    report = {}
+    for name in MIX:
+        timings = sorted(t for client in clients for t in client.timings[name])
+        entry = {
+            "requests": len(timings),
+            "errors": sum(client.errors[name] for client in clients),
+            "rps": len(timings) / elapsed,
+        }
+        for p in PERCENTILES:
+            entry[f"p{p}_ms"] = percentile(timings, p) * 1000
+        report[name] = entry
+    return report
+
+
+def find_regressions(report: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Describe every endpoint that is slower, or serves fewer requests per second, than the baseline allows."""
+    regressions = []
+    for name, before in baseline.items():
+        after = report.get(name)
+        if after is None or not before["requests"] or not after["requests"]:
+            continue
+        for p in PERCENTILES:
+            key = f"p{p}_ms"
+            if after[key] > before[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {before[key]:.2f} -> {after[key]:.2f}")
+        if after["rps"] < before["rps"] * (1 - threshold):
+            regressions.append(f"{name}: rps {before['rps']:.1f} -> {after['rps']:.1f}")
+    return regressions
+
+
+def print_report(report: Dict[str, dict]) -> None:
+    print(f"{'endpoint':<28} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, entry in report.items():
+        print(f"{name:<28} {entry['requests']:>8} {entry['errors']:>6} {entry['rps']:>8.1f} "
+              f"{entry['p50_ms']:>8.2f} {entry['p95_ms']:>8.2f} {entry['p99_ms']:>8.2f}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_server(database_url: Optional[str], workers: int) -> Iterator[str]:
+    """Start the app with uvicorn and yield its base URL once it answers."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=database_url or f"sqlite:///{os.path.join(tmp, 'load_test.db')}")
+        env.pop("TEST_DATABASE_URL", None)
+        subprocess.run([sys.executable, "-m", "app.migrations", "upgrade"], cwd=PROJECT_ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        port = _free_port()
+        log = open(os.path.join(tmp, "server.log"), "w")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=PROJECT_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(300):
+                if server.poll() is not None:
+                    log.flush()
+                    raise RuntimeError("Server exited during startup:\n" + open(log.name).read())
+                try:
+                    httpx.get(url + "/", timeout=1)
+                    break
+                except httpx.HTTPError:
+                    time.sleep(0.1)
+            else:
+                raise RuntimeError("Server did not start within 30 seconds")
+            yield url
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+            log.close()
+
+
+async def load(url: str, concurrency: int, duration: float, warmup: float) -> Dict[str, dict]:
+    run_id = f"{int(time.time())}{random.randrange(1000)}"
+    # One client, and so one connection, per simulated user, like independent browsers
+    clients = [Client(httpx.AsyncClient(base_url=url, timeout=30), index, run_id) for index in range(concurrency)]
+    try:
+        await asyncio.gather(*(client.register() for client in clients))
+        if warmup:
+            await asyncio.gather(*(client.run(time.perf_counter() + warmup) for client in clients))
+            for client in clients:
+                client.timings = {name: [] for name in MIX}
+                client.errors = {name: 0 for name in MIX}
+        started = time.perf_counter()
+        await asyncio.gather(*(client.run(started + duration) for client in clients))
+        elapsed = time.perf_counter() - started
+    finally:
+        await asyncio.gather(*(client.http.aclose() for client in clients))
+    return summarize(clients, elapsed)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Load an already running server instead of starting one")
+    parser.add_argument("--database-url", help="Database of the started server (default: a temporary SQLite file)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the started server")
+    parser.add_argument("--concurrency", type=int, default=16, help="Simulated users sending requests at once")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="Unmeasured seconds before the run")
+    parser.add_argument("--seed", type=int, help="Seed of the request mix")
+    parser.add_argument("--save-baseline", help="Write the report to this JSON file")
+    parser.add_argument("--baseline", help="Fail if the report regresses against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression, as a fraction of the baseline")
+    args = parser.parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    if args.url:
+        report = asyncio.run(load(args.url, args.concurrency, args.duration, args.warmup))
+    else:
+        with run_server(args.database_url, args.workers) as url:
+            report = asyncio.run(load(url, args.concurrency, args.duration, args.warmup))
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({
+                "options": {"concurrency": args.concurrency, "duration": args.duration, "workers": args.workers},
+                "endpoints": report,
+            }, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["endpoints"]
+        regressions = find_regressions(report, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Microbenchmarks of the per-request building blocks: the `app/operations.py`
+kernels, the vectorized `Operation._compute_many` and `compute_batch` behind
+batch creates, `CalculationFactory.create_calculation`, `main.OperationRequest`
+and the `CalculationCreate` / `CalculationRead` schemas.
+
+    python -m benchmarks.microbench [--filter NAME] [--output results.json] [--compare old.json]
+
+Each benchmark calls one function in isolation. Time is the best of --repeat
+runs of a loop sized to take about 0.2 s (as `timeit` recommends, the minimum
+is the least disturbed measurement), reported in ns per call. Allocation is
+measured in separate, untimed loops under tracemalloc, averaged per call:
+
+- peak B/op: the peak memory a call allocates on top of what was in use
+  before it;
+- held B/op: what it still holds once it returns (caches, leaks);
+- blocks/op: the number of memory blocks it leaves allocated, from the
+  `count_diff` of tracemalloc snapshot statistics taken around the loop. The
+  loop keeps every return value alive, so the result's own objects (and numpy
+  buffers, which numpy reports to tracemalloc) are counted; temporaries freed
+  before the call returns are not, since snapshots only see live blocks.
+
+Importing `main` applies the app's logging setup, so the kernels' debug
+logging costs what it does in the server: set LOG_LEVEL=DEBUG to measure it
+enabled. Importing `app` also creates its engine, so point DATABASE_URL at a
+database whose driver is installed, e.g. DATABASE_URL=sqlite://.
+
+--output writes the results as JSON, together with the git commit and Python
+version; --compare prints the change against such a file.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app import models, operations, schemas
+from app.factory import CalculationFactory
+from app.operation_registry import compute_batch, get_operation
+from main import OperationRequest
+
+CREATE_DATA = {"a": 12.5, "b": 4, "type": "divide"}
+CREATE_JSON = json.dumps(CREATE_DATA).encode()
+CALCULATION = models.Calculation(
+    id=1, a=12.5, b=4.0, type="divide", result=3.125, user_id=1,
+    created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+)
+READ = schemas.CalculationRead.model_validate(CALCULATION)
+# A batch of CALCULATION_BATCH_MAX_SIZE-ish rows, as lists (the batch route) and arrays (one operation's share)
+BATCH_TYPES = [("add", "subtract", "multiply", "divide", "power", "modulo")[i % 6] for i in range(1000)]
+BATCH_A = [12.5 + i for i in range(1000)]
+BATCH_B = [4.0 + i % 7 for i in range(1000)]
+ARRAY_A = np.asarray(BATCH_A)
+ARRAY_B = np.asarray(BATCH_B)
+ADD = get_operation("add")
+# Allocations of the measurement itself, left out of the block counts
+SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+def benchmarks() -> List[Tuple[str, Callable[[], object]]]:
+    return [
+        ("operations.add", lambda: operations.add(12.5, 4.0)),
+        ("operations.subtract", lambda: operations.subtract(12.5, 4.0)),
+        ("operations.multiply", lambda: operations.multiply(12.5, 4.0)),
+        ("operations.divide", lambda: operations.divide(12.5, 4.0)),
+        ("operations.power", lambda: operations.power(12.5, 4.0)),
+        ("operations.modulo", lambda: operations.modulo(12.5, 4.0)),
+        ("operations.sqrt", lambda: operations.sqrt(12.5)),
+        ("operation_registry.get_operation+compute", lambda: get_operation("divide").compute(12.5, 4.0)),
+        ("Operation._compute_many(add, 1000)", lambda: ADD._compute_many(ARRAY_A, ARRAY_B)),
+        ("compute_batch(1000 mixed)", lambda: compute_batch(BATCH_TYPES, BATCH_A, BATCH_B)),
+        ("CalculationFactory.create_calculation", lambda: CalculationFactory.create_calculation(12.5, 4.0, "divide")),
+        ("OperationRequest(a, b)", lambda: OperationRequest(a=12.5, b=4)),
+        ("OperationRequest.model_validate_json", lambda: OperationRequest.model_validate_json(b'{"a": 12.5, "b": 4}')),
+        ("CalculationCreate.model_validate", lambda: schemas.CalculationCreate.model_validate(CREATE_DATA)),
+        ("CalculationCreate.model_validate_json", lambda: schemas.CalculationCreate.model_validate_json(CREATE_JSON)),
+        ("CalculationRead.model_validate(orm)", lambda: schemas.CalculationRead.model_validate(CALCULATION)),
+        ("CalculationRead.model_dump_json", lambda: READ.model_dump_json()),
+    ]
+
+
+def time_per_call(function: Callable[[], object], repeat: int) -> Tuple[float, int]:
+    """Best time per call in ns, and the loop size it was measured with."""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number * 1e9, number
+
+
+def _traced_peaks(function: Callable[[], object], calls: int) -> Tuple[float, float]:
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        peak_total = 0
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - current
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak_total / calls, (end - start) / calls
+
+
+def memory_per_call(function: Callable[[], object], calls: int) -> Tuple[float, float]:
+    """Peak bytes allocated during a call, and bytes still held after it, averaged over `calls` calls."""
+    function()  # populate caches outside the measurement
+    # The measurement itself allocates a little; an empty call measures that
+    overhead, _ = _traced_peaks(lambda: None, calls)
+    peak, held = _traced_peaks(function, calls)
+    return max(peak - overhead, 0.0), held
+
+
+def _traced_blocks(function: Callable[[], object], calls: int) -> float:
+    results: List[object] = [None] * calls
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        for index in range(calls):
+            results[index] = function()
+        after = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    finally:
+        tracemalloc.stop()
+    return sum(stat.count_diff for stat in after.compare_to(before, "filename")) / calls
+
+
+def blocks_per_call(function: Callable[[], object], calls: int) -> float:
+    """Memory blocks a call leaves allocated, its return value included, averaged over `calls` calls."""
+    function()  # populate caches outside the measurement
+    overhead = _traced_blocks(lambda: None, calls)
+    return max(_traced_blocks(function, calls) - overhead, 0.0)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed loops per benchmark")
+    parser.add_argument("--alloc-calls", type=int, default=1000, help="Calls traced to measure allocations")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Print the change against results previously written with --output")
+    args = parser.parse_args(argv)
+
+    previous: Dict[str, dict] = {}
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+
+    results = {}
+    print(f"{'benchmark':<42} {'ns/op':>10} {'peak B/op':>10} {'held B/op':>10} {'blocks/op':>10}"
+          + (f" {'change':>8}" if previous else ""))
+    for name, function in benchmarks():
+        if args.filter not in name:
+            continue
+        ns, number = time_per_call(function, args.repeat)
+        peak, held = memory_per_call(function, args.alloc_calls)
+        blocks = blocks_per_call(function, args.alloc_calls)
+        results[name] = {"ns_per_op": ns, "loops": number, "peak_bytes_per_op": peak, "held_bytes_per_op": held,
+                         "blocks_per_op": blocks}
+        line = f"{name:<42} {ns:>10.1f} {peak:>10.1f} {held:>10.1f} {blocks:>10.1f}"
+        if name in previous:
+            line += f" {ns / previous[name]['ns_per_op'] - 1:>+8.1%}"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,59 @@
 # main.py
 
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field, FiniteFloat, field_validator, model_validator
 from fastapi.exceptions import RequestValidationError
-from app.operations import add, subtract, multiply, divide
-from app.db import Base, engine
+from app.operation_registry import OPERATIONS, Operation
+from app.db import DATABASE_ASYNC
 from app.users import router as users_router
 from app.calculations import router as calculations_router
+from app.async_users import router as async_users_router
+from app.async_calculations import router as async_calculations_router
+from app.streaming import router as streaming_router
+from app.hashing import hash_pool
+from app.write_behind import write_behind
+from app.expressions import EXPRESSION_MAX_BINDINGS, ExpressionError, evaluate
+from app.metrics import REGISTRY, MetricsMiddleware
+from app.profiler import ProfilerMiddleware
+from app.compression import CompressionMiddleware
+from app.frontend import StaticPage
+from app.logging_config import setup_logging
+from contextlib import asynccontextmanager
+import numpy as np
 import uvicorn
 import logging
-import sys
-
-# Setup enhanced logging configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+import os
+
+# Setup non-blocking logging (background writer, sampling, rate limiting)
+setup_logging()
 logger = logging.getLogger(__name__)
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if write_behind.enabled:
+        write_behind.start()
+    yield
+    # Store every acknowledged calculation before the process exits
+    write_behind.stop()
+    hash_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+# Innermost, so request metrics include the time spent compressing
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilerMiddleware)
 
 # Setup templates directory
 templates = Jinja2Templates(directory="templates")
 
 # Pydantic model for request data
 class OperationRequest(BaseModel):
-    a: float = Field(..., description="The first number")
-    b: float = Field(..., description="The second number")
+    a: FiniteFloat = Field(..., description="The first number")
+    b: FiniteFloat = Field(..., description="The second number")
 
     @field_validator('a', 'b', mode='before')
     @classmethod
@@ -44,109 +63,213 @@ class OperationRequest(BaseModel):
             raise ValueError('Both a and b must be numbers.')
         try:
             return float(value)
-        except (TypeError, ValueError):
+        except (TypeError, ValueError, OverflowError):
             raise ValueError('Both a and b must be numbers.')
 
+# Pydantic model for request data of unary operations (e.g. sqrt)
+class UnaryOperationRequest(BaseModel):
+    a: FiniteFloat = Field(..., description="The operand")
+
+    @field_validator('a', mode='before')
+    @classmethod
+    def validate_number(cls, value):
+        """Validate that a is a number."""
+        if value is None:
+            raise ValueError('a must be a number.')
+        try:
+            return float(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError('a must be a number.')
+
 # Pydantic model for successful response
 class OperationResponse(BaseModel):
     result: float = Field(..., description="The result of the operation")
 
+# Upper bound on the number of operand pairs accepted by POST /batch/{op}
+BATCH_OPERATION_MAX_SIZE = int(os.getenv("BATCH_OPERATION_MAX_SIZE", "100000"))
+
+# Pydantic model for batch request data
+class BatchOperationRequest(BaseModel):
+    a: List[FiniteFloat] = Field(..., description="The first operand of every pair")
+    b: Optional[List[FiniteFloat]] = Field(None, description="The second operand of every pair (omitted for unary operations)")
+
+    @model_validator(mode='after')
+    def validate_lengths(self):
+        """Validate that a and b pair up and respect the batch size limit."""
+        if self.b is not None and len(self.a) != len(self.b):
+            raise ValueError('a and b must have the same length.')
+        if len(self.a) > BATCH_OPERATION_MAX_SIZE:
+            raise ValueError(f'At most {BATCH_OPERATION_MAX_SIZE} operand pairs are allowed.')
+        return self
+
+# Pydantic model for successful batch response
+class BatchOperationResponse(BaseModel):
+    results: List[Optional[float]] = Field(..., description="Element-wise results; null where the operation is undefined")
+    invalid: List[bool] = Field(..., description="True where the operation is undefined (e.g. division by zero)")
+
+# Pydantic model for expression evaluation data
+class EvaluateRequest(BaseModel):
+    expression: str = Field(..., description="Arithmetic expression, e.g. (a + b) * c / d")
+    bindings: List[Dict[str, FiniteFloat]] = Field(
+        default_factory=lambda: [{}],
+        description="Variable values; the expression is evaluated once per binding",
+        max_length=EXPRESSION_MAX_BINDINGS,
+    )
+
+# Pydantic model for successful expression evaluation response
+class EvaluateResponse(BaseModel):
+    results: List[Optional[float]] = Field(..., description="One result per binding; null where the expression is undefined")
+    invalid: List[bool] = Field(..., description="True where the expression divided by zero")
+
 # Pydantic model for error response
 class ErrorResponse(BaseModel):
     error: str = Field(..., description="Error message")
 
+def _log_context(request: Request) -> dict:
+    """Log extras tagging a record with its route, for sampling and rate limiting."""
+    route = getattr(request.scope.get("route"), "path", request.url.path)
+    return {"route": route, "rate_limit_key": f"{request.method} {route}"}
+
 # Custom Exception Handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
-    logger.error(f"HTTPException on {request.url.path} from {request.client.host if request.client else 'unknown'}: {exc.detail}")
+    # Client errors are routine; only server errors are logged at ERROR
+    level = logging.ERROR if exc.status_code >= 500 else logging.INFO
+    logger.log(
+        level, "HTTPException on %s from %s: %s",
+        request.url.path, request.client.host if request.client else 'unknown', exc.detail,
+        extra=_log_context(request),
+    )
     return JSONResponse(
         status_code=exc.status_code,
         content={"error": exc.detail},
+        headers=exc.headers,
     )
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     # Extracting error messages
     error_messages = "; ".join([f"{err['loc'][-1]}: {err['msg']}" for err in exc.errors()])
-    logger.warning(f"ValidationError on {request.url.path} from {request.client.host if request.client else 'unknown'}: {error_messages}")
+    logger.warning(
+        "ValidationError on %s from %s: %s",
+        request.url.path, request.client.host if request.client else 'unknown', error_messages,
+        extra=_log_context(request),
+    )
     return JSONResponse(
         status_code=400,
         content={"error": error_messages},
     )
 
+# Log extras for the stateless routes, built once instead of per request
+ROUTE_LOG = {route: {"route": route} for route in ["/", "/batch/{op}", "/evaluate"] + [f"/{name}" for name in OPERATIONS]}
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Expose request, database, cache and pool metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# The template only depends on the registered operations, so it is rendered once
+index_page = StaticPage(templates.get_template("index.html").render(operations=list(OPERATIONS)).encode())
+
 @app.get("/")
 async def read_root(request: Request):
     """
-    Serve the index.html template.
+    Serve the pre-rendered index.html, compressed as Accept-Encoding allows.
     """
-    logger.info(f"Root endpoint accessed from {request.client.host if request.client else 'unknown'}")
-    return templates.TemplateResponse("index.html", {"request": request})
+    logger.debug("Root endpoint accessed from %s", request.client.host if request.client else 'unknown', extra=ROUTE_LOG["/"])
+    return index_page.response(request)
 
-app.include_router(users_router)
-app.include_router(calculations_router)
-
-@app.post("/add", response_model=OperationResponse, responses={400: {"model": ErrorResponse}})
-async def add_route(operation: OperationRequest):
+def prefer_async_routes(sync_router: APIRouter, async_router: APIRouter) -> APIRouter:
     """
-    Add two numbers.
+    Return the sync router's routes with the async variant swapped in wherever
+    both define the same path and methods. Routes without an async variant stay
+    on the sync stack, and keeping the sync router's order keeps static paths
+    such as /calculations/export ahead of /calculations/{id}.
     """
-    logger.info(f"Add operation requested: {operation.a} + {operation.b}")
-    try:
-        result = add(operation.a, operation.b)
-        logger.info(f"Add operation successful: {operation.a} + {operation.b} = {result}")
-        return OperationResponse(result=result)
-    except Exception as e:
-        logger.error(f"Add Operation Error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=400, detail=str(e))
+    overrides = {(route.path, frozenset(route.methods)): route for route in async_router.routes}
+    merged = APIRouter()
+    merged.routes = [overrides.get((route.path, frozenset(route.methods)), route) for route in sync_router.routes]
+    return merged
+
+if DATABASE_ASYNC:
+    app.include_router(prefer_async_routes(users_router, async_users_router))
+    app.include_router(prefer_async_routes(calculations_router, async_calculations_router))
+else:
+    app.include_router(users_router)
+    app.include_router(calculations_router)
+app.include_router(streaming_router)
 
-@app.post("/subtract", response_model=OperationResponse, responses={400: {"model": ErrorResponse}})
-async def subtract_route(operation: OperationRequest):
+def operation_route(operation: Operation):
     """
-    Subtract two numbers.
+    Build the endpoint for one registered operation, e.g. POST /add.
     """
-    logger.info(f"Subtract operation requested: {operation.a} - {operation.b}")
-    try:
-        result = subtract(operation.a, operation.b)
-        logger.info(f"Subtract operation successful: {operation.a} - {operation.b} = {result}")
+    route = f"/{operation.name}"
+    log_extra = ROUTE_LOG[route]
+    title = operation.name.capitalize()
+    request_model = UnaryOperationRequest if operation.arity == 1 else OperationRequest
+
+    async def endpoint(request: request_model):
+        operands = (request.a,) if operation.arity == 1 else (request.a, request.b)
+        logger.info("%s operation requested: %s", title, operands, extra=log_extra)
+        try:
+            result = operation.compute(*operands)
+        except ValueError as e:
+            logger.info("%s Operation Error: %s", title, e, extra=log_extra)
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error("%s Operation Internal Error: %s", title, e, exc_info=True)
+            raise HTTPException(status_code=500, detail="Internal Server Error")
+        logger.info("%s operation successful: %s = %s", title, operands, result, extra=log_extra)
         return OperationResponse(result=result)
-    except Exception as e:
-        logger.error(f"Subtract Operation Error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/multiply", response_model=OperationResponse, responses={400: {"model": ErrorResponse}})
-async def multiply_route(operation: OperationRequest):
+    endpoint.__name__ = f"{operation.name}_route"
+    endpoint.__doc__ = operation.description
+    return endpoint
+
+# One route per registered operation
+for _operation in OPERATIONS.values():
+    app.add_api_route(
+        f"/{_operation.name}", operation_route(_operation), methods=["POST"],
+        response_model=OperationResponse, responses={400: {"model": ErrorResponse}},
+    )
+
+@app.post("/batch/{op}", response_model=BatchOperationResponse, responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}})
+async def batch_route(op: str, operation: BatchOperationRequest):
     """
-    Multiply two numbers.
+    Apply an operation element-wise to many operand pairs in one vectorized pass.
     """
-    logger.info(f"Multiply operation requested: {operation.a} * {operation.b}")
+    if op not in OPERATIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown operation: {op}")
+    logger.info("Batch %s operation requested for %d pairs", op, len(operation.a), extra=ROUTE_LOG["/batch/{op}"])
     try:
-        result = multiply(operation.a, operation.b)
-        logger.info(f"Multiply operation successful: {operation.a} * {operation.b} = {result}")
-        return OperationResponse(result=result)
-    except Exception as e:
-        logger.error(f"Multiply Operation Error: {str(e)}", exc_info=True)
+        result, invalid = OPERATIONS[op].compute_many(operation.a, operation.b)
+    except ValueError as e:
+        logger.info("Batch %s Operation Error: %s", op, e, extra=ROUTE_LOG["/batch/{op}"])
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/divide", response_model=OperationResponse, responses={400: {"model": ErrorResponse}})
-async def divide_route(operation: OperationRequest):
+    results = result.tolist()
+    for index in np.flatnonzero(invalid).tolist():
+        results[index] = None
+    return BatchOperationResponse(results=results, invalid=invalid.tolist())
+
+@app.post("/evaluate", response_model=EvaluateResponse, responses={400: {"model": ErrorResponse}})
+async def evaluate_route(request: EvaluateRequest):
     """
-    Divide two numbers.
+    Evaluate an arithmetic expression against one or more sets of variable values.
     """
-    logger.info(f"Divide operation requested: {operation.a} / {operation.b}")
+    logger.info("Evaluate requested: %s for %d bindings", request.expression, len(request.bindings), extra=ROUTE_LOG["/evaluate"])
     try:
-        result = divide(operation.a, operation.b)
-        logger.info(f"Divide operation successful: {operation.a} / {operation.b} = {result}")
-        return OperationResponse(result=result)
-    except ValueError as e:
-        logger.error(f"Divide Operation Error: {str(e)}", exc_info=True)
+        results, invalid = evaluate(request.expression, request.bindings)
+    except ExpressionError as e:
+        logger.info("Evaluate Error: %s", e, extra=ROUTE_LOG["/evaluate"])
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"Divide Operation Internal Error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+    return EvaluateResponse(results=results, invalid=invalid)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
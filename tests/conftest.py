@@ -9,6 +9,9 @@ import os
 # Set test database URL before importing app
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 os.environ["TEST_DATABASE_URL"] = f"sqlite:///{os.path.join(project_root, 'test.db')}"
+# Hash inline: the app's lifespan shuts the hashing pool down after every
+# TestClient, and respawning worker processes per test is slow
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
 
 from fastapi.testclient import TestClient
 from main import app
@@ -109,9 +112,15 @@ def page(browser):
     yield page
 
 from app.dependencies import get_db
+from app import security
+from app.response_cache import response_cache
 
 @pytest.fixture
 def client(db_session):
+    # Every test rolls its users back, so cached users and responses must not outlive it
+    security.user_cache.clear()
+    response_cache.clear()
+
     def override_get_db():
         try:
             yield db_session
@@ -9,7 +9,10 @@ from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from app import profiler, security
+from app.response_cache import response_cache
 from app.db import Base
+from app.dependencies import get_session_factory
 from app.users import get_db
 from main import app
 
@@ -29,6 +32,8 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_database():
+    # Start from the current schema even if the database file predates it
+    Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
@@ -59,6 +64,9 @@ def db_session() -> Session:
 
 @pytest.fixture(scope="function")
 def client(db_session):
+    security.user_cache.clear()
+    response_cache.clear()
+
     def override_get_db():
         try:
             yield db_session
@@ -66,6 +74,22 @@ def client(db_session):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: lambda: db_session
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
+
+@pytest.fixture
+def max_queries(monkeypatch):
+    """
+    Enable the query profiler and return a check that a response ran at most
+    `limit` SQL statements, e.g. `max_queries(client.get("/calculations/"), 3)`.
+    """
+    monkeypatch.setattr(profiler, "DB_PROFILER", True)
+
+    def check(response, limit: int) -> int:
+        count = int(response.headers[profiler.QUERIES_HEADER])
+        request = response.request
+        assert count <= limit, f"{request.method} {request.url.path} ran {count} queries, expected at most {limit}"
+        return count
+    return check
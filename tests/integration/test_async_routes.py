@@ -0,0 +1,100 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import security
+from app.response_cache import response_cache
+from app.async_calculations import router as async_calculations_router
+from app.async_users import router as async_users_router
+from app.calculations import router as calculations_router
+from app.db import Base
+from app.dependencies import get_async_db
+from app.users import router as users_router
+from main import prefer_async_routes
+
+
+@pytest.fixture
+def async_client(tmp_path):
+    """A client for an app serving the async routes from a throwaway aiosqlite database."""
+    db_path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+
+    # NullPool: every TestClient runs its own event loop, so connections must not be reused
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    session_factory = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(prefer_async_routes(users_router, async_users_router))
+    app.include_router(prefer_async_routes(calculations_router, async_calculations_router))
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    security.user_cache.clear()
+    response_cache.clear()
+
+    with TestClient(app) as client:
+        user = {"username": "asyncuser", "email": "async@example.com", "password": "password123"}
+        assert client.post("/users/register", json=user).status_code == 201
+        token = client.post("/users/login", json={"username": "asyncuser", "password": "password123"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+def test_prefer_async_routes_keeps_sync_order():
+    merged = prefer_async_routes(calculations_router, async_calculations_router)
+    paths = [(route.path, route.endpoint.__module__) for route in merged.routes]
+    assert ("/calculations/{id}", "app.async_calculations") in paths
+    assert ("/calculations/export", "app.calculations") in paths
+    # Static paths must still be matched before the /{id} catch-all
+    assert paths.index(("/calculations/export", "app.calculations")) < paths.index(("/calculations/{id}", "app.async_calculations"))
+
+
+def test_async_calculation_crud(async_client):
+    created = async_client.post("/calculations/", json={"a": 6, "b": 3, "type": "divide"})
+    assert created.status_code == 201
+    calc_id = created.json()["id"]
+    assert created.json()["result"] == 2.0
+
+    assert [c["id"] for c in async_client.get("/calculations/").json()] == [calc_id]
+
+    updated = async_client.put(f"/calculations/{calc_id}", json={"a": 6, "b": 3, "type": "multiply"})
+    assert updated.json()["result"] == 18.0
+    assert async_client.get(f"/calculations/{calc_id}").json()["result"] == 18.0
+
+    assert async_client.put(f"/calculations/{calc_id}", json={"a": 6, "b": 0, "type": "divide"}).status_code == 400
+
+    assert async_client.delete(f"/calculations/{calc_id}").status_code == 204
+    assert async_client.get(f"/calculations/{calc_id}").status_code == 404
+
+
+def test_async_user_profile_and_password(async_client):
+    response = async_client.put("/users/me", json={"email": "changed@example.com"})
+    assert response.status_code == 200
+    assert response.json()["email"] == "changed@example.com"
+
+    response = async_client.post("/users/me/password", json={"old_password": "password123", "new_password": "password456"})
+    assert response.status_code == 200
+    response = async_client.post("/users/login", json={"username": "asyncuser", "password": "password456"})
+    assert response.status_code == 200
+
+
+def test_async_writes_maintain_stats(async_client):
+    first = async_client.post("/calculations/", json={"a": 2, "b": 3, "type": "add"}).json()
+    async_client.post("/calculations/", json={"a": 4, "b": 5, "type": "multiply"})
+    async_client.put(f"/calculations/{first['id']}", json={"a": 7, "b": 3, "type": "subtract"})
+
+    stats = async_client.get("/calculations/stats").json()
+    assert stats["count_by_type"] == {"subtract": 1, "multiply": 1}
+    assert stats["sum"] == 24
+
+    async_client.delete(f"/calculations/{first['id']}")
+    stats = async_client.get("/calculations/stats").json()
+    assert stats["count"] == 1
+    assert stats["min"] == stats["max"] == 20
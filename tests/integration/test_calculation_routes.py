@@ -57,5 +57,332 @@ def test_delete_calculation(authorized_client, db_session):
     assert get_res.status_code == 404
 
 def test_invalid_calculation_type(authorized_client, db_session):
-    response = authorized_client.post("/calculations/", json={"a": 10, "b": 5, "type": "modulo"})
+    response = authorized_client.post("/calculations/", json={"a": 10, "b": 5, "type": "log"})
     assert response.status_code == 400  # Pydantic validation error converted to 400 by exception handler
+
+def test_registered_operations_in_calculations(authorized_client, db_session):
+    response = authorized_client.post("/calculations/", json={"a": 10, "b": 4, "type": "modulo"})
+    assert response.status_code == 201
+    assert response.json()["result"] == 2
+
+    # Unary operations do not need b
+    response = authorized_client.post("/calculations/", json={"a": 9, "type": "sqrt"})
+    assert response.status_code == 201
+    assert response.json()["result"] == 3
+
+    response = authorized_client.post("/calculations/", json={"a": 9, "type": "power"})
+    assert response.status_code == 400
+
+def test_create_calculations_batch(authorized_client, db_session):
+    items = [
+        {"a": 1, "b": 2, "type": "add"},
+        {"a": 4, "b": 0, "type": "divide"},
+        {"a": 3, "b": 3, "type": "multiply"},
+    ]
+    response = authorized_client.post("/calculations/batch", json={"items": items})
+    assert response.status_code == 201
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 1
+
+    results = data["results"]
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert results[0]["calculation"]["result"] == 3
+    assert results[1]["calculation"] is None
+    assert results[1]["error"] == "Cannot divide by zero!"
+    assert results[2]["calculation"]["result"] == 9
+
+    list_res = authorized_client.get("/calculations/")
+    assert len(list_res.json()) == 2
+
+def test_create_calculations_batch_overflow(authorized_client, db_session):
+    items = [{"a": 1e308, "b": 10, "type": "multiply"}, {"a": 2, "b": 3, "type": "multiply"}]
+    response = authorized_client.post("/calculations/batch", json={"items": items})
+    assert response.status_code == 201
+    data = response.json()
+    assert (data["created"], data["failed"]) == (1, 1)
+    assert data["results"][0]["error"] == "Result is out of range!"
+
+    # Nothing non-finite was stored
+    assert [calc["result"] for calc in authorized_client.get("/calculations/").json()] == [6]
+    assert authorized_client.get("/calculations/stats").json()["sum"] == 6
+    assert authorized_client.post("/calculations/", json=items[0]).status_code == 400
+
+    # Operands beyond float range parse to inf and are rejected up front
+    body = '{"items": [{"a": 1e400, "b": 1, "type": "add"}]}'
+    response = authorized_client.post("/calculations/batch", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    assert "finite" in response.json()["error"]
+    assert len(authorized_client.get("/calculations/").json()) == 1
+
+def test_create_calculations_batch_too_large(authorized_client, db_session, monkeypatch):
+    from app import calculations
+    monkeypatch.setattr(calculations, "CALCULATION_BATCH_MAX_SIZE", 2)
+    items = [{"a": 1, "b": 1, "type": "add"}] * 3
+    response = authorized_client.post("/calculations/batch", json={"items": items})
+    assert response.status_code == 413
+
+def test_read_calculations_cursor_pagination(authorized_client, db_session):
+    items = [{"a": i, "b": 1, "type": "add"} for i in range(5)]
+    authorized_client.post("/calculations/batch", json={"items": items})
+
+    first = authorized_client.get("/calculations/", params={"limit": 2})
+    assert [c["a"] for c in first.json()] == [0, 1]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = authorized_client.get("/calculations/", params={"limit": 2, "cursor": cursor})
+    assert [c["a"] for c in second.json()] == [2, 3]
+
+    last = authorized_client.get("/calculations/", params={"limit": 2, "cursor": second.headers["X-Next-Cursor"]})
+    assert [c["a"] for c in last.json()] == [4]
+    assert "X-Next-Cursor" not in last.headers
+
+    # skip/limit keeps working alongside the cursor
+    legacy = authorized_client.get("/calculations/", params={"skip": 3, "limit": 2})
+    assert [c["a"] for c in legacy.json()] == [3, 4]
+
+def test_read_calculations_invalid_cursor(authorized_client, db_session):
+    response = authorized_client.get("/calculations/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json()["error"] == "Invalid cursor"
+
+def test_export_calculations_ndjson(authorized_client, db_session):
+    import json
+    items = [{"a": i, "b": 2, "type": "multiply"} for i in range(3)]
+    authorized_client.post("/calculations/batch", json={"items": items})
+
+    response = authorized_client.get("/calculations/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["result"] for row in rows] == [0, 2, 4]
+    assert rows == authorized_client.get("/calculations/").json()
+
+def test_export_calculations_csv(authorized_client, db_session):
+    authorized_client.post("/calculations/", json={"a": 7, "b": 2, "type": "subtract"})
+
+    response = authorized_client.get("/calculations/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0] == "id,a,b,type,result,user_id,created_at,uuid"
+    assert len(lines) == 2
+    assert ",7.0,2.0,subtract,5.0," in lines[1]
+
+def test_export_calculations_invalid_format(authorized_client, db_session):
+    response = authorized_client.get("/calculations/export", params={"format": "xml"})
+    assert response.status_code == 400
+
+def test_calculation_stats_follow_writes(authorized_client, db_session):
+    from app import calculation_stats
+
+    stats = authorized_client.get("/calculations/stats").json()
+    assert stats["count"] == 0
+    assert stats["mean"] is None
+
+    ids = []
+    for item in ({"a": 1, "b": 2, "type": "add"}, {"a": 10, "b": 2, "type": "add"}, {"a": 3, "b": 3, "type": "multiply"}):
+        ids.append(authorized_client.post("/calculations/", json=item).json()["id"])
+    authorized_client.post("/calculations/batch", json={"items": [{"a": 20, "b": 4, "type": "divide"}]})
+
+    stats = authorized_client.get("/calculations/stats").json()
+    assert stats["count"] == 4
+    assert stats["count_by_type"] == {"add": 2, "multiply": 1, "divide": 1}
+    assert stats["sum"] == 3 + 12 + 9 + 5
+    assert stats["min"] == 3
+    assert stats["max"] == 12
+    assert stats["mean"] == 29 / 4
+    assert stats["latest_created_at"] is not None
+
+    # Updating the maximum and changing its type, then deleting the minimum
+    authorized_client.put(f"/calculations/{ids[1]}", json={"a": 1, "b": 1, "type": "subtract"})
+    authorized_client.delete(f"/calculations/{ids[0]}")
+
+    stats = authorized_client.get("/calculations/stats").json()
+    assert stats["count_by_type"] == {"subtract": 1, "multiply": 1, "divide": 1}
+    assert stats["sum"] == 0 + 9 + 5
+    assert stats["min"] == 0
+    assert stats["max"] == 9
+
+    # The incremental summary matches a full rebuild
+    user_id = authorized_client.get(f"/calculations/{ids[2]}").json()["user_id"]
+    incremental = calculation_stats.read_stats(db_session, user_id)
+    calculation_stats.rebuild(db_session, user_id=user_id)
+    assert calculation_stats.read_stats(db_session, user_id) == incremental
+
+def test_conditional_get_with_etag(authorized_client, db_session):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    created = authorized_client.post("/calculations/", json={"a": 1, "b": 2, "type": "add"}).json()
+
+    listing = authorized_client.get("/calculations/")
+    item = authorized_client.get(f"/calculations/{created['id']}")
+    list_etag, item_etag = listing.headers["ETag"], item.headers["ETag"]
+    assert list_etag != item_etag
+    assert authorized_client.get("/calculations/?limit=1").headers["ETag"] != list_etag
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(Engine, "before_cursor_execute", listener)
+    try:
+        not_modified = authorized_client.get("/calculations/", headers={"If-None-Match": list_etag})
+        assert authorized_client.get(f"/calculations/{created['id']}", headers={"If-None-Match": f'"other", W/{item_etag}'}).status_code == 304
+    finally:
+        event.remove(Engine, "before_cursor_execute", listener)
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == list_etag
+    assert not any("FROM calculations" in statement for statement in statements)
+
+    # Every write moves the version on
+    authorized_client.put(f"/calculations/{created['id']}", json={"a": 5, "b": 2, "type": "add"})
+    response = authorized_client.get("/calculations/", headers={"If-None-Match": list_etag})
+    assert response.status_code == 200
+    assert response.json()[0]["result"] == 7
+    assert response.headers["ETag"] != list_etag
+
+    etag = response.headers["ETag"]
+    authorized_client.delete(f"/calculations/{created['id']}")
+    assert authorized_client.get("/calculations/", headers={"If-None-Match": etag}).status_code == 200
+
+def test_calculation_reads_are_cached_until_a_write(authorized_client, db_session):
+    from app.response_cache import response_cache
+
+    created = authorized_client.post("/calculations/", json={"a": 2, "b": 3, "type": "multiply"}).json()
+    first = authorized_client.get("/calculations/")
+    hits = response_cache.stats()["hits"]
+    second = authorized_client.get("/calculations/")
+    assert response_cache.stats()["hits"] == hits + 1
+    assert second.content == first.content
+    assert second.json()[0]["result"] == 6
+
+    authorized_client.get(f"/calculations/{created['id']}")
+    assert authorized_client.get(f"/calculations/{created['id']}").json()["result"] == 6
+
+    authorized_client.put(f"/calculations/{created['id']}", json={"a": 2, "b": 5, "type": "multiply"})
+    assert response_cache.stats()["entries"] == 0
+    assert authorized_client.get("/calculations/").json()[0]["result"] == 10
+    assert authorized_client.get(f"/calculations/{created['id']}").json()["result"] == 10
+
+def test_fast_read_path_matches_response_model(authorized_client, db_session):
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    from app import schemas
+
+    for a, b, op in ((0.1, 0.2, "add"), (1e20, 3, "multiply"), (1, 3, "divide"), (-0.0, 1, "multiply")):
+        created = authorized_client.post("/calculations/", json={"a": a, "b": b, "type": op}).json()
+    # Written before results were checked for overflow; served as null like the response model does
+    db_session.add(models.Calculation(a=1e308, b=10, type="multiply", result=float("inf"), user_id=created["user_id"]))
+    db_session.commit()
+
+    response = authorized_client.get("/calculations/")
+    calculations = db_session.query(models.Calculation).order_by(models.Calculation.id).all()
+    adapter = TypeAdapter(List[schemas.CalculationRead])
+    assert response.content == adapter.dump_json(adapter.validate_python(calculations))
+
+    item = authorized_client.get(f"/calculations/{calculations[2].id}")
+    assert item.content == schemas.CalculationRead.model_validate(calculations[2]).model_dump_json().encode()
+    item = authorized_client.get(f"/calculations/{calculations[-1].id}")
+    assert item.content == schemas.CalculationRead.model_validate(calculations[-1]).model_dump_json().encode()
+    assert item.json()["result"] is None
+
+def test_bulk_delete(authorized_client, db_session, monkeypatch):
+    from app import calculations
+
+    monkeypatch.setattr(calculations, "CALCULATION_BULK_CHUNK_SIZE", 2)
+    items = [{"a": i, "b": 1, "type": "add" if i % 2 else "multiply"} for i in range(7)]
+    ids = [item["calculation"]["id"] for item in authorized_client.post("/calculations/batch", json={"items": items}).json()["results"]]
+
+    assert authorized_client.delete("/calculations/").status_code == 400
+
+    response = authorized_client.delete("/calculations/", params={"type": "multiply"})
+    assert response.status_code == 200
+    assert response.json() == {"deleted": 4}
+
+    response = authorized_client.delete("/calculations/", params={"ids": [ids[1], ids[2], ids[3]]})
+    assert response.json() == {"deleted": 2}
+
+    remaining = authorized_client.get("/calculations/").json()
+    assert [calc["id"] for calc in remaining] == [ids[5]]
+    stats = authorized_client.get("/calculations/stats").json()
+    assert stats["count_by_type"] == {"add": 1}
+    assert stats["min"] == stats["max"] == 6
+
+    created_before = "2999-01-01T00:00:00"
+    assert authorized_client.delete("/calculations/", params={"created_before": created_before}).json() == {"deleted": 1}
+
+def test_bulk_recompute(authorized_client, db_session, monkeypatch):
+    from app import calculations
+
+    monkeypatch.setattr(calculations, "CALCULATION_BULK_CHUNK_SIZE", 2)
+    items = [{"a": 6, "b": b, "type": "add"} for b in (1, 2, 0, 3, 0)]
+    ids = [item["calculation"]["id"] for item in authorized_client.post("/calculations/batch", json={"items": items}).json()["results"]]
+    etag = authorized_client.get("/calculations/").headers["ETag"]
+
+    # Set-based path: divide has a SQL kernel; rows with b = 0 are left alone
+    response = authorized_client.patch("/calculations/", json={"type": "add", "set": {"type": "divide"}})
+    assert response.json() == {"updated": 3, "failed": 2}
+    listing = authorized_client.get("/calculations/", headers={"If-None-Match": etag})
+    assert listing.status_code == 200
+    assert [(calc["type"], calc["result"]) for calc in listing.json()] == [
+        ("divide", 6.0), ("divide", 3.0), ("add", 6.0), ("divide", 2.0), ("add", 6.0)
+    ]
+
+    # Vectorized fallback: modulo has no SQL kernel
+    response = authorized_client.patch("/calculations/", json={"ids": ids[:3], "set": {"type": "modulo", "a": 7}})
+    assert response.json() == {"updated": 2, "failed": 1}
+    results = {calc["id"]: (calc["type"], calc["a"], calc["result"]) for calc in authorized_client.get("/calculations/").json()}
+    assert results[ids[0]] == ("modulo", 7.0, 0.0)
+    assert results[ids[1]] == ("modulo", 7.0, 1.0)
+    assert results[ids[2]] == ("add", 6.0, 6.0)
+
+    stats = authorized_client.get("/calculations/stats").json()
+    assert stats["count_by_type"] == {"modulo": 2, "add": 2, "divide": 1}
+    assert stats["sum"] == 0 + 1 + 6 + 2 + 6
+
+def test_large_reads_are_compressed(authorized_client, client, db_session):
+    import json
+    import zlib
+    items = [{"a": i, "b": 2, "type": "multiply"} for i in range(50)]
+    authorized_client.post("/calculations/batch", json={"items": items})
+
+    plain = authorized_client.get("/calculations/", headers={"Accept-Encoding": "identity"})
+    listing = authorized_client.get("/calculations/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in plain.headers
+    assert listing.headers["content-encoding"] == "gzip"
+    assert int(listing.headers["content-length"]) < len(plain.content) / 3
+    assert listing.json() == plain.json()
+    assert listing.headers["ETag"] == "W/" + plain.headers["ETag"]
+    assert authorized_client.get("/calculations/", headers={"If-None-Match": listing.headers["ETag"]}).status_code == 304
+
+    # The export is compressed chunk by chunk as it streams
+    with authorized_client.stream("GET", "/calculations/export", headers={"Accept-Encoding": "gzip"}) as export:
+        assert export.headers["content-encoding"] == "gzip"
+        assert "content-length" not in export.headers
+        raw = b"".join(export.iter_raw())
+    rows = [json.loads(line) for line in zlib.decompress(raw, 31).splitlines()]
+    assert rows == plain.json()
+
+    # Tiny responses are not worth compressing
+    assert "content-encoding" not in client.post("/add", json={"a": 1, "b": 2}, headers={"Accept-Encoding": "gzip"}).headers
+
+def test_bulk_recompute_flags_overflow(authorized_client, db_session):
+    items = [{"a": 1e200, "b": 1e200, "type": "add"}] * 2 + [{"a": 2, "b": 3, "type": "add"}]
+    authorized_client.post("/calculations/batch", json={"items": items})
+
+    # 1e200 * 1e200 overflows: those rows fail instead of storing inf
+    response = authorized_client.patch("/calculations/", json={"type": "add", "set": {"type": "multiply"}})
+    assert response.json() == {"updated": 1, "failed": 2}
+    listing = authorized_client.get("/calculations/")
+    assert listing.status_code == 200
+    assert [(calc["type"], calc["result"]) for calc in listing.json()] == [
+        ("add", 2e200), ("add", 2e200), ("multiply", 6.0)
+    ]
+    assert authorized_client.get("/calculations/stats").status_code == 200
+
+    # Large operands whose result fits are still recomputed, by the vectorized path
+    response = authorized_client.patch("/calculations/", json={"type": "add", "set": {"type": "divide"}})
+    assert response.json() == {"updated": 2, "failed": 0}
@@ -152,3 +152,140 @@ def test_divide_by_zero_api(client):
     # Assert that the 'error' field contains the correct error message
     assert "Cannot divide by zero!" in response.json()['error'], \
         f"Expected error message 'Cannot divide by zero!', got '{response.json()['error']}'"
+
+
+# ---------------------------------------------
+# Test Function: test_batch_api
+# ---------------------------------------------
+
+def test_batch_api(client):
+    """
+    Test the vectorized `/batch/{op}` endpoint, including per-element division by zero.
+    """
+    response = client.post('/batch/divide', json={'a': [10, 5, 9], 'b': [2, 0, 3]})
+    assert response.status_code == 200, f"Expected status code 200, got {response.status_code}"
+    assert response.json() == {'results': [5.0, None, 3.0], 'invalid': [False, True, False]}
+
+    response = client.post('/batch/add', json={'a': [1, 2], 'b': [3, 4]})
+    assert response.status_code == 200
+    assert response.json()['results'] == [4.0, 6.0]
+
+
+def test_batch_api_errors(client):
+    """
+    Test that the `/batch/{op}` endpoint rejects mismatched operands and unknown operations.
+    """
+    response = client.post('/batch/add', json={'a': [1, 2], 'b': [3]})
+    assert response.status_code == 400
+    assert 'same length' in response.json()['error']
+
+    response = client.post('/batch/log', json={'a': [1], 'b': [3]})
+    assert response.status_code == 404
+
+    # An overflowing pair is flagged instead of failing the whole batch
+    response = client.post('/batch/add', json={'a': [1e308, 1], 'b': [1e308, 2]})
+    assert response.status_code == 200
+    assert response.json() == {'results': [None, 3.0], 'invalid': [True, False]}
+    assert client.post('/multiply', json={'a': 1e308, 'b': 10}).status_code == 400
+
+    # Operands beyond float range parse to inf and are rejected as invalid input
+    headers = {'Content-Type': 'application/json'}
+    for path, body in (
+        ('/add', '{"a": 1e400, "b": 1}'),
+        ('/modulo', '{"a": 1e400, "b": 1}'),
+        ('/add', '{"a": 1%s, "b": 1}' % ('0' * 400)),
+        ('/batch/add', '{"a": [1e400], "b": [1]}'),
+        ('/evaluate', '{"expression": "a + 1", "bindings": [{"a": 1e400}]}'),
+    ):
+        response = client.post(path, content=body, headers=headers)
+        assert response.status_code == 400, path
+
+
+def test_registered_operation_routes(client):
+    """
+    Test the routes generated for the power, modulo and sqrt operations.
+    """
+    assert client.post('/power', json={'a': 2, 'b': 8}).json() == {'result': 256.0}
+    assert client.post('/modulo', json={'a': 10, 'b': 4}).json() == {'result': 2.0}
+    assert client.post('/sqrt', json={'a': 16}).json() == {'result': 4.0}
+
+    response = client.post('/sqrt', json={'a': -4})
+    assert response.status_code == 400
+    assert 'negative' in response.json()['error']
+
+    response = client.post('/batch/sqrt', json={'a': [4, -1]})
+    assert response.json() == {'results': [2.0, None], 'invalid': [False, True]}
+
+
+def test_evaluate_api(client):
+    """
+    Test the `/evaluate` endpoint with several bindings and with a rejected expression.
+    """
+    response = client.post('/evaluate', json={'expression': '(a + b) * c / d', 'bindings': [{'a': 1, 'b': 2, 'c': 4, 'd': 3}, {'a': 1, 'b': 2, 'c': 4, 'd': 0}]})
+    assert response.status_code == 200
+    assert response.json() == {'results': [4.0, None], 'invalid': [False, True]}
+
+    response = client.post('/evaluate', json={'expression': '2 * (3 + 4)'})
+    assert response.json()['results'] == [14.0]
+
+    response = client.post('/evaluate', json={'expression': 'a * 2', 'bindings': [{'a': 1e308}, {'a': 3}]})
+    assert response.status_code == 200
+    assert response.json() == {'results': [None, 6.0], 'invalid': [True, False]}
+
+    response = client.post('/evaluate', json={'expression': '__import__("os")'})
+    assert response.status_code == 400
+    assert 'Unsupported syntax' in response.json()['error']
+
+
+# ---------------------------------------------
+# Test Function: test_metrics_endpoint
+# ---------------------------------------------
+
+def test_metrics_endpoint(client):
+    """
+    Test that `/metrics` reports per-route request counts, latency and errors by route template.
+    """
+    client.post('/add', json={'a': 1, 'b': 2})
+    client.post('/divide', json={'a': 1, 'b': 0})
+    client.get('/calculations/123')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    body = response.text
+    assert 'http_requests_total{method="POST",route="/add",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/add",le="+Inf"}' in body
+    assert 'http_errors_total{status="400"}' in body
+    # Path parameters are reported by template, not by raw path
+    assert 'route="/calculations/{id}"' in body
+    assert 'route="/calculations/123"' not in body
+    assert 'http_requests_in_flight 1' in body
+    assert 'password_hash_queue_depth' in body
+    assert 'auth_user_cache_hits_total' in body
+
+
+# ---------------------------------------------
+# Test Function: test_index_page
+# ---------------------------------------------
+
+def test_index_page(client):
+    """
+    Test that `/` serves the pre-rendered page compressed as negotiated, with a strong ETag.
+    """
+    plain = client.get('/', headers={'Accept-Encoding': 'identity'})
+    assert plain.status_code == 200
+    assert plain.headers['content-type'] == 'text/html; charset=utf-8'
+    assert 'content-encoding' not in plain.headers
+    assert plain.headers['vary'] == 'Accept-Encoding'
+    assert plain.headers['cache-control'].startswith('public, max-age=')
+    assert '<option value="sqrt">Sqrt</option>' in plain.text
+
+    compressed = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['content-encoding'] == 'gzip'
+    assert compressed.content == plain.content  # decoded by the client
+    assert compressed.headers['etag'] != plain.headers['etag']
+
+    revalidated = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['etag']})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b''
+    assert revalidated.headers['etag'] == compressed.headers['etag']
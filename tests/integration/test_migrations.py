@@ -0,0 +1,84 @@
+import importlib
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app import migrations
+from app.db import Base
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _schema(engine, tables):
+    inspector = inspect(engine)
+    return {
+        name: (
+            {column["name"] for column in inspector.get_columns(name)},
+            {(index["name"], bool(index["unique"])) for index in inspector.get_indexes(name)},
+        )
+        for name in tables
+    }
+
+
+def test_upgrade_builds_the_model_schema(engine, tmp_path):
+    applied = migrations.upgrade(engine)
+    assert [m.version for m in applied] == [m.version for m in migrations.discover()]
+    assert migrations.pending_migrations(engine) == []
+    assert migrations.upgrade(engine) == []
+
+    reference = create_engine(f"sqlite:///{tmp_path / 'reference.db'}")
+    Base.metadata.create_all(bind=reference)
+    assert _schema(engine, Base.metadata.tables) == _schema(reference, Base.metadata.tables)
+
+
+def test_downgrade_and_upgrade_again(engine):
+    migrations.upgrade(engine)
+    reverted = migrations.downgrade(engine, to=3)
+    assert [m.version for m in reverted] == [5, 4]
+    assert "uuid" not in {c["name"] for c in inspect(engine).get_columns("calculations")}
+    assert not inspect(engine).has_table("calculation_versions")
+
+    assert [m.version for m in migrations.upgrade(engine)] == [4, 5]
+    migrations.downgrade(engine, to=0)
+    assert inspect(engine).get_table_names() == ["schema_migrations"]
+
+
+def test_upgrade_adopts_a_database_created_before_migrations(engine):
+    initial = importlib.import_module("app.migrations.versions.0001_initial")
+    initial.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, email, password_hash) VALUES (1, 'old', 'old@example.com', 'x')"))
+        conn.execute(text("INSERT INTO calculations (a, b, type, result, user_id) VALUES (1, 2, 'add', 3, 1), (2, 2, 'add', 4, 1), (3, 3, 'multiply', 9, 1)"))
+
+    migrations.upgrade(engine)
+    with engine.connect() as conn:
+        stats = conn.execute(text("SELECT type, count, total, min_result, max_result FROM calculation_stats ORDER BY type")).all()
+    assert [tuple(row) for row in stats] == [("add", 2, 7.0, 3.0, 4.0), ("multiply", 1, 9.0, 9.0, 9.0)]
+    assert "uuid" in {c["name"] for c in inspect(engine).get_columns("calculations")}
+
+
+class _PostgresConnection:
+    """Records statements; the pg_index lookup reports whether the index is invalid."""
+
+    def __init__(self, invalid):
+        self.dialect = type("Dialect", (), {"name": "postgresql"})()
+        self.invalid = invalid
+        self.statements = []
+
+    def execute(self, statement, parameters=None):
+        self.statements.append(str(statement))
+        return type("Result", (), {"scalar": lambda _: self.invalid})()
+
+
+@pytest.mark.parametrize("invalid, dropped", [(True, True), (False, False), (None, False)])
+def test_create_index_drops_an_invalid_leftover_on_postgres(invalid, dropped):
+    conn = _PostgresConnection(invalid)
+    migrations.create_index(conn, "ix_calculations_uuid", "calculations", "uuid", unique=True)
+    assert ("DROP INDEX CONCURRENTLY IF EXISTS ix_calculations_uuid" in conn.statements) is dropped
+    assert conn.statements[-1] == (
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_calculations_uuid ON calculations (uuid)")
@@ -0,0 +1,41 @@
+import logging
+
+from app import profiler
+
+
+def test_profiler_headers_are_opt_in(client):
+    response = client.post("/add", json={"a": 1, "b": 2})
+    assert profiler.QUERIES_HEADER not in response.headers
+
+
+def test_profiler_headers(client, max_queries):
+    response = client.post("/add", json={"a": 1, "b": 2})
+    assert max_queries(response, 0) == 0
+    assert float(response.headers[profiler.TIME_HEADER]) == 0.0
+
+    response = client.post("/users/register", json={"username": "profiled", "email": "profiled@example.com", "password": "password123"})
+    assert response.status_code == 201
+    assert int(response.headers[profiler.QUERIES_HEADER]) > 0
+    assert float(response.headers[profiler.TIME_HEADER]) > 0.0
+
+
+def test_calculation_query_budgets(authorized_client, max_queries):
+    created = authorized_client.post("/calculations/", json={"a": 1, "b": 2, "type": "add"})
+    max_queries(created, 8)
+    calc_id = created.json()["id"]
+
+    listed = authorized_client.get("/calculations/")
+    max_queries(listed, 2)
+    max_queries(authorized_client.get("/calculations/", headers={"If-None-Match": listed.headers["ETag"]}), 1)
+    max_queries(authorized_client.get(f"/calculations/{calc_id}"), 2)
+    max_queries(authorized_client.get("/calculations/stats"), 1)
+    max_queries(authorized_client.put(f"/calculations/{calc_id}", json={"a": 3, "b": 2, "type": "add"}), 11)
+
+
+def test_slow_queries_are_logged_with_plan(client, max_queries, monkeypatch, caplog):
+    monkeypatch.setattr(profiler, "DB_SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="app.profiler"):
+        client.post("/users/register", json={"username": "slow", "email": "slow@example.com", "password": "password123"})
+    slow = [record.getMessage() for record in caplog.records if record.name == "app.profiler"]
+    assert slow and all(message.startswith("Slow query") for message in slow)
+    assert any("Plan:" in message and "<not available>" not in message for message in slow)
@@ -0,0 +1,109 @@
+from contextlib import contextmanager
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app import streaming
+from app.dependencies import get_session_factory
+from main import app
+
+
+def test_stream_answers_pipelined_requests_in_order(client):
+    with client.websocket_connect("/ws/calculate") as ws:
+        for i in range(20):
+            ws.send_json({"id": i, "op": "multiply", "a": i, "b": 2})
+        replies = [ws.receive_json() for _ in range(20)]
+    assert [reply["id"] for reply in replies] == list(range(20))
+    assert [reply["result"] for reply in replies] == [i * 2 for i in range(20)]
+
+
+def test_stream_reports_errors_per_message(client):
+    with client.websocket_connect("/ws/calculate") as ws:
+        ws.send_json({"id": "a", "op": "divide", "a": 1, "b": 0})
+        ws.send_json({"id": "b", "op": "log", "a": 1, "b": 2})
+        ws.send_json({"id": "c", "op": "add", "a": "1", "b": 2})
+        ws.send_text("not json")
+        ws.send_json({"id": "d", "op": "sqrt", "a": 9})
+        replies = [ws.receive_json() for _ in range(5)]
+    assert replies[0] == {"id": "a", "error": "Cannot divide by zero!"}
+    assert "error" in replies[1] and replies[1]["id"] == "b"
+    assert "error" in replies[2] and replies[2]["id"] == "c"
+    assert replies[3] == {"id": None, "error": "Invalid JSON"}
+    assert replies[4] == {"id": "d", "result": 3.0}
+
+
+def test_stream_reports_out_of_range_operands_per_message(client):
+    with client.websocket_connect("/ws/calculate") as ws:
+        ws.send_text('{"id": 1, "op": "add", "a": 1%s, "b": 2}' % ("0" * 400))
+        ws.send_text('{"id": 2, "op": "add", "a": 1e400, "b": 2}')
+        ws.send_json({"id": 3, "op": "multiply", "a": 1e308, "b": 10})
+        ws.send_json({"id": 4, "op": "add", "a": 1, "b": 2})
+        replies = [ws.receive_json() for _ in range(4)]
+    assert [reply["id"] for reply in replies] == [1, 2, 3, 4]
+    assert all("error" in reply for reply in replies[:3])
+    assert replies[3] == {"id": 4, "result": 3.0}
+
+
+def test_stream_closes_on_oversized_message(client, monkeypatch):
+    monkeypatch.setattr(streaming, "WS_MAX_MESSAGE_BYTES", 64)
+    with client.websocket_connect("/ws/calculate") as ws:
+        ws.send_text("x" * 65)
+        with pytest.raises(WebSocketDisconnect) as exc:
+            ws.receive_json()
+    assert exc.value.code == 1009
+
+
+def test_stream_persist_requires_authentication(client):
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect("/ws/calculate?persist=true") as ws:
+            ws.receive_json()
+    assert exc.value.code == 1008
+
+
+def test_stream_rejects_invalid_token(client):
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect("/ws/calculate?token=invalid") as ws:
+            ws.receive_json()
+    assert exc.value.code == 1008
+
+
+def test_stream_persists_results_when_authenticated(authorized_client, token):
+    with authorized_client.websocket_connect(f"/ws/calculate?token={token}&persist=true") as ws:
+        ws.send_json({"id": 1, "op": "add", "a": 2, "b": 3})
+        ws.send_json({"id": 2, "op": "divide", "a": 1, "b": 0})
+        ws.send_json({"id": 3, "op": "power", "a": 2, "b": 10})
+        replies = [ws.receive_json() for _ in range(3)]
+    assert "calculation_id" in replies[0] and "calculation_id" in replies[2]
+    assert "calculation_id" not in replies[1]
+
+    stored = authorized_client.get("/calculations/").json()
+    assert [(c["id"], c["type"], c["result"]) for c in stored] == [
+        (replies[0]["calculation_id"], "add", 5.0),
+        (replies[2]["calculation_id"], "power", 1024.0),
+    ]
+    assert authorized_client.get("/calculations/stats").json()["count"] == 2
+
+
+def test_stream_holds_no_session_while_open(authorized_client, token, db_session):
+    events = []
+
+    @contextmanager
+    def session():
+        events.append("open")
+        try:
+            yield db_session
+        finally:
+            events.append("close")
+
+    app.dependency_overrides[get_session_factory] = lambda: session
+    with authorized_client.websocket_connect(f"/ws/calculate?token={token}") as ws:
+        ws.send_json({"id": 1, "op": "add", "a": 2, "b": 3})
+        assert ws.receive_json() == {"id": 1, "result": 5.0}
+        # Only the token check used a session, and it is closed again
+        assert events == ["open", "close"]
+
+    events.clear()
+    with authorized_client.websocket_connect(f"/ws/calculate?token={token}&persist=true") as ws:
+        ws.send_json({"id": 1, "op": "add", "a": 2, "b": 3})
+        assert "calculation_id" in ws.receive_json()
+        assert events == ["open", "close", "open", "close"]
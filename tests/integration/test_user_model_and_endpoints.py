@@ -50,3 +50,35 @@ def test_login_user(client, db_session):
         json={"username": "bob", "password": "wrongpassword"}
     )
     assert response_fail.status_code == 401
+
+
+def test_register_returns_503_when_hashing_overloaded(client, monkeypatch):
+    from app import hashing
+
+    monkeypatch.setattr(hashing.hash_pool, "queue_size", 0)
+    response = client.post(
+        "/users/register",
+        json={"username": "busyuser", "email": "busy@example.com", "password": "password123"},
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_password_routes_await_the_hash_pool(client, monkeypatch):
+    from app import hashing
+
+    # The blocking variant would hold a threadpool thread while the pool works
+    def blocking_run(*args):
+        raise AssertionError("hash_pool.run blocks a threadpool thread")
+
+    monkeypatch.setattr(hashing.hash_pool, "run", blocking_run)
+    user = {"username": "awaiter", "email": "awaiter@example.com", "password": "password123"}
+    assert client.post("/users/register", json=user).status_code == 201
+    login = client.post("/users/login", json={"username": "awaiter", "password": "password123"})
+    assert login.status_code == 200
+    response = client.post(
+        "/users/me/password",
+        json={"old_password": "password123", "new_password": "password456"},
+        headers={"Authorization": f"Bearer {login.json()['access_token']}"},
+    )
+    assert response.status_code == 200
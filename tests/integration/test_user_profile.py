@@ -53,3 +53,31 @@ def test_change_password_wrong_old(authorized_client: TestClient):
     )
     assert response.status_code == 400
     assert response.json()["error"] == "Incorrect old password"
+
+def test_cached_user_invalidated_on_rename(authorized_client: TestClient):
+    # Warm the cache for the current token
+    assert authorized_client.get("/calculations/").status_code == 200
+    hits_before = security.user_cache.stats()["hits"]
+    assert authorized_client.get("/calculations/").status_code == 200
+    assert security.user_cache.stats()["hits"] == hits_before + 1
+
+    response = authorized_client.put("/users/me", json={"username": "renameduser"})
+    assert response.status_code == 200
+
+    # The token still names the old username, which no longer resolves
+    assert authorized_client.get("/calculations/").status_code == 401
+
+def test_cached_user_sees_new_password(authorized_client: TestClient, test_user: dict):
+    new_password = "newpassword123"
+    response = authorized_client.post(
+        "/users/me/password",
+        json={"old_password": test_user["password"], "new_password": new_password}
+    )
+    assert response.status_code == 200
+
+    # A stale cached hash would reject the new password as the old one
+    response = authorized_client.post(
+        "/users/me/password",
+        json={"old_password": new_password, "new_password": "thirdpassword123"}
+    )
+    assert response.status_code == 200
@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import async_calculations, calculations
+from app.write_behind import WriteBehindBuffer
+
+
+@pytest.fixture
+def buffer(db_session, monkeypatch):
+    # Thresholds the tests never reach keep the flush thread idle, so they flush explicitly
+    buffer = WriteBehindBuffer(enabled=True, max_rows=3, batch_size=5, max_delay=60, session_factory=lambda: db_session)
+    monkeypatch.setattr(calculations, "write_behind", buffer)
+    monkeypatch.setattr(async_calculations, "write_behind", buffer)
+    yield buffer
+    buffer.stop()
+
+
+def test_create_is_acknowledged_before_it_is_stored(authorized_client, buffer):
+    response = authorized_client.post("/calculations/", json={"a": 6, "b": 3, "type": "divide"})
+    assert response.status_code == 202
+    queued = response.json()
+    assert queued["result"] == 2.0 and queued["uuid"]
+    assert buffer.stats()["queue_depth"] == 1
+    assert authorized_client.get("/calculations/").json() == []
+
+    assert buffer.flush() == 1
+    stored = authorized_client.get("/calculations/").json()
+    assert [(c["uuid"], c["result"]) for c in stored] == [(queued["uuid"], 2.0)]
+    assert authorized_client.get("/calculations/stats").json()["count"] == 1
+    assert buffer.stats()["queue_depth"] == 0
+
+    # The export carries the uuid too
+    exported = authorized_client.get("/calculations/export").json()
+    assert exported["uuid"] == queued["uuid"]
+    csv_lines = authorized_client.get("/calculations/export", params={"format": "csv"}).text.splitlines()
+    assert csv_lines[1].endswith("," + queued["uuid"])
+
+
+def test_full_buffer_rejects_creates(authorized_client, buffer):
+    for i in range(3):
+        assert authorized_client.post("/calculations/", json={"a": i, "b": 1, "type": "add"}).status_code == 202
+    response = authorized_client.post("/calculations/", json={"a": 9, "b": 1, "type": "add"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    # Stopping stores everything that was acknowledged
+    buffer.stop()
+    results = [c["result"] for c in authorized_client.get("/calculations/").json()]
+    assert results == [1.0, 2.0, 3.0]
+    assert buffer.stats()["flushes"] == 1
+
+
+def test_failed_flush_keeps_the_rows_for_a_retry(authorized_client, db_session, monkeypatch):
+    database_up = False
+
+    def session_factory():
+        if not database_up:
+            raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+        return db_session
+
+    buffer = WriteBehindBuffer(enabled=True, max_rows=3, batch_size=5, max_delay=60, session_factory=session_factory)
+    monkeypatch.setattr(calculations, "write_behind", buffer)
+    monkeypatch.setattr(async_calculations, "write_behind", buffer)
+    queued = [authorized_client.post("/calculations/", json={"a": i, "b": 1, "type": "add"}).json() for i in range(2)]
+
+    with pytest.raises(OperationalError):
+        buffer.flush()
+    stats = buffer.stats()
+    assert (stats["queue_depth"], stats["failed_flushes"], stats["dropped_rows"]) == (2, 1, 0)
+    assert authorized_client.get("/calculations/").json() == []
+
+    database_up = True
+    assert buffer.flush() == 2
+    stored = authorized_client.get("/calculations/").json()
+    assert sorted(c["uuid"] for c in stored) == sorted(q["uuid"] for q in queued)
+    assert buffer.stats()["queue_depth"] == 0
+    buffer.stop()
+
+
+def test_invalid_calculation_is_not_buffered(authorized_client, buffer):
+    response = authorized_client.post("/calculations/", json={"a": 1, "b": 0, "type": "divide"})
+    assert response.status_code == 400
+    assert buffer.stats()["queue_depth"] == 0
+
+
+def test_write_behind_metrics(client):
+    body = client.get("/metrics").text
+    assert "write_behind_queue_depth" in body
+    assert "write_behind_flush_duration_seconds_count" in body
+    assert "write_behind_failed_flushes_total" in body
@@ -3,6 +3,8 @@
 import pytest  # Import the pytest framework for writing and running tests
 from typing import Union  # Import Union for type hinting multiple possible types
 from app.operations import add, subtract, multiply, divide  # Import the calculator functions from the operations module
+from app.operations import add_array, subtract_array, multiply_array, divide_array  # Import the vectorized kernels
+import numpy as np  # Import NumPy to build array operands
 
 # Define a type alias for numbers that can be either int or float
 Number = Union[int, float]
@@ -232,3 +234,45 @@ def test_divide_by_zero() -> None:
     # Assert that the exception message contains the expected error message
     assert "Cannot divide by zero!" in str(excinfo.value), \
         f"Expected error message 'Cannot divide by zero!', but got '{excinfo.value}'"
+
+
+# ---------------------------------------------
+# Unit Tests for the Vectorized Kernels
+# ---------------------------------------------
+
+@pytest.mark.parametrize(
+    "kernel, expected",
+    [
+        (add_array, [5.0, -1.0, 6.0]),
+        (subtract_array, [-1.0, -5.0, 1.0]),
+        (multiply_array, [6.0, -6.0, 8.75]),
+    ],
+    ids=["add_array", "subtract_array", "multiply_array"]
+)
+def test_array_kernels(kernel, expected) -> None:
+    """
+    Test that the vectorized kernels compute element-wise results for lists and arrays alike.
+    """
+    a = [2, -3, 3.5]
+    b = [3, 2, 2.5]
+    assert kernel(a, b).tolist() == expected
+    assert kernel(np.array(a), np.array(b)).tolist() == expected
+
+
+def test_divide_array_flags_division_by_zero() -> None:
+    """
+    Test that 'divide_array' masks division by zero instead of raising.
+    """
+    result, zero_mask = divide_array([6, 5, 0], [3, 0, 2])
+    assert zero_mask.tolist() == [False, True, False]
+    assert result[0] == 2.0
+    assert np.isnan(result[1])
+    assert result[2] == 0.0
+
+
+def test_array_kernels_reject_mismatched_shapes() -> None:
+    """
+    Test that operands of different lengths raise a ValueError.
+    """
+    with pytest.raises(ValueError, match="Operand shapes differ"):
+        add_array([1, 2], [1])
@@ -0,0 +1,168 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import CompressionMiddleware, Encoder, parse_rules, parse_setting
+
+ROWS = [{"id": i, "a": i * 1.5, "b": 3.0, "type": "multiply", "result": i * 4.5} for i in range(100)]
+CHUNKS = [b'{"id": %d, "type": "multiply"}\n' % i * 20 for i in range(5)]
+
+
+app = FastAPI()
+
+
+@app.get("/rows")
+async def rows():
+    return JSONResponse(ROWS, headers={"ETag": '"page"'})
+
+
+@app.get("/small")
+async def small():
+    return JSONResponse({"result": 5.0})
+
+
+@app.get("/stream")
+async def stream():
+    async def body():
+        for chunk in CHUNKS:
+            yield chunk
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@app.get("/image")
+async def image():
+    return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+
+@app.get("/precompressed")
+async def precompressed():
+    return Response(gzip.compress(b"x" * 2000), media_type="text/html", headers={"Content-Encoding": "gzip"})
+
+
+def make_client(**options) -> TestClient:
+    return TestClient(CompressionMiddleware(app, **options))
+
+
+def test_parse_setting():
+    assert parse_setting("gzip:1", None) == ("gzip", 1)
+    assert parse_setting("deflate", None) == ("deflate", 1)
+    assert parse_setting("off", ("gzip", 6)) is None
+    assert parse_setting("", ("gzip", 6)) == ("gzip", 6)
+    with pytest.raises(ValueError):
+        parse_setting("lzma", None)
+
+
+def test_parse_rules():
+    assert parse_rules("application/json, text/csv=gzip:9, /metrics=off", ("gzip", 6)) == {
+        "application/json": ("gzip", 6), "text/csv": ("gzip", 9), "/metrics": None,
+    }
+
+
+def test_brotli_falls_back_to_gzip_when_missing(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert parse_setting("br:11", None) == ("gzip", 1)
+
+
+def test_negotiate():
+    negotiate = CompressionMiddleware.negotiate
+    assert negotiate(("gzip", 1), "gzip, deflate") == ("gzip", 1)
+    assert negotiate(("deflate", 9), "gzip") == ("gzip", 1)
+    assert negotiate(("gzip", 1), "identity") is None
+    assert negotiate(("gzip", 1), "gzip;q=0, *") == (("deflate", 1) if compression.brotli is None else ("br", 4))
+    assert negotiate(None, "gzip") is None
+
+
+@pytest.mark.parametrize("algorithm, decompress", [
+    ("gzip", lambda: zlib.decompressobj(31)),
+    ("deflate", lambda: zlib.decompressobj(15)),
+])
+def test_encoder_flushed_chunks_decode_as_they_arrive(algorithm, decompress):
+    encoder, decoder = Encoder(algorithm, 6), decompress()
+    for chunk in CHUNKS:
+        assert decoder.decompress(encoder.compress(chunk, flush=True)) == chunk
+    assert decoder.decompress(encoder.finish()) == b""
+    assert decoder.eof
+
+
+def test_large_json_is_compressed():
+    client = make_client(min_size=1024)
+    plain = client.get("/rows", headers={"Accept-Encoding": "identity"})
+    response = client.get("/rows", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in plain.headers
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(plain.content) / 3
+    assert response.content == plain.content
+    assert response.headers["etag"] == 'W/"page"'
+    assert plain.headers["etag"] == '"page"'
+
+
+def test_small_bodies_and_other_media_types_are_left_alone():
+    client = make_client(min_size=1024)
+    for path in ("/small", "/image"):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+    response = client.get("/precompressed", headers={"Accept-Encoding": "gzip"})
+    assert response.content == b"x" * 2000
+
+
+def test_route_and_content_type_overrides():
+    client = make_client(min_size=10, routes="/rows=off")
+    assert "content-encoding" not in client.get("/rows", headers={"Accept-Encoding": "gzip"}).headers
+    assert client.get("/stream", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
+
+    client = make_client(min_size=10, content_types="application/json=deflate:9")
+    assert client.get("/rows", headers={"Accept-Encoding": "gzip, deflate"}).headers["content-encoding"] == "deflate"
+    assert "content-encoding" not in client.get("/stream", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_disabled():
+    client = make_client(enabled=False, min_size=10)
+    assert "content-encoding" not in client.get("/rows", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def asgi_messages(app, path: str, accept_encoding: bytes) -> list:
+    scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+             "headers": [(b"accept-encoding", accept_encoding)], "http_version": "1.1", "scheme": "http",
+             "server": ("test", 80), "root_path": ""}
+    sent = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # The client stays connected
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+def test_streamed_body_is_compressed_chunk_by_chunk():
+    start, *bodies = asgi_messages(CompressionMiddleware(app, min_size=len(CHUNKS[0])), "/stream", b"gzip")
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+
+    decoder = zlib.decompressobj(31)
+    decoded = [decoder.decompress(message["body"]) for message in bodies]
+    # Every chunk can be decoded as soon as it is received
+    assert decoded[:len(CHUNKS)] == CHUNKS
+    assert b"".join(decoded) == b"".join(CHUNKS)
+    assert decoder.eof
+    assert [message["more_body"] for message in bodies][-1] is False
+
+
+def test_streamed_body_is_buffered_up_to_the_threshold():
+    start, *bodies = asgi_messages(CompressionMiddleware(app, min_size=10 ** 6), "/stream", b"gzip")
+    assert b"content-encoding" not in dict(start["headers"])
+    assert b"".join(message["body"] for message in bodies) == b"".join(CHUNKS)
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+from app.db import PoolStats, instrument_pool_events, instrumented_pool_class, pool_options, pool_stats, to_async_url
+
+
+def test_to_async_url():
+    assert to_async_url("postgresql+psycopg2://u:p@h:5432/db") == "postgresql+asyncpg://u:p@h:5432/db"
+    assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+
+
+def test_pool_options_skip_in_memory_sqlite():
+    assert pool_options("sqlite://", QueuePool) == {}
+    assert pool_options("sqlite:///:memory:", QueuePool) == {}
+    assert pool_options("sqlite:///./test.db", QueuePool)["pool_size"] > 0
+
+
+def test_pool_stats_track_checkouts_waits_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool_class(QueuePool, PoolStats()),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    instrument_pool_events(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+        assert pool_stats(engine)["checked_out"] == 1
+        # The only connection is checked out, so a second checkout times out
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 1
+    assert stats["connects"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait"]["count"] == 2
+    assert stats["wait"]["max"] >= 0.05
+
+    engine.dispose()
+    assert pool_stats(engine)["closes"] == 1
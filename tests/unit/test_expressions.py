@@ -0,0 +1,68 @@
+import pytest
+
+from app import expressions
+from app.expressions import ExpressionError, compile_expression, evaluate
+
+
+def test_evaluate_many_bindings():
+    results, invalid = evaluate("(a + b) * c / d", [{"a": 1, "b": 2, "c": 4, "d": 2}, {"a": 1, "b": 1, "c": 1, "d": 0}])
+    assert results == [6.0, None]
+    assert invalid == [False, True]
+
+
+def test_literals_and_unary_minus():
+    assert evaluate("-(2 + 3) * 1.5 + +1", [{}]) == ([-6.5], [False])
+
+
+def test_registered_operators_and_functions():
+    results, invalid = evaluate("sqrt(x) + 2 ** 3 % 5", [{"x": 16}, {"x": -1}])
+    assert results == [7.0, None]
+    assert invalid == [False, True]
+
+
+def test_compiled_expressions_are_cached():
+    compile_expression.cache_clear()
+    first = compile_expression("x * 2")
+    assert compile_expression("x * 2") is first
+    assert first.variables == frozenset({"x"})
+    assert compile_expression.cache_info().hits == 1
+
+
+@pytest.mark.parametrize("text", [
+    "a // 2",
+    "sqrt(a, b)",
+    "abs(a)",
+    "a.real",
+    "a if b else c",
+    "True + 1",
+    "'1' + 1",
+    "a +",
+    "__import__('os')",
+])
+def test_rejects_unsupported_syntax(text):
+    with pytest.raises(ExpressionError):
+        compile_expression(text)
+
+
+def test_enforces_limits(monkeypatch):
+    monkeypatch.setattr(expressions, "EXPRESSION_MAX_DEPTH", 4)
+    monkeypatch.setattr(expressions, "EXPRESSION_MAX_NODES", 5)
+    compile_expression.cache_clear()
+    with pytest.raises(ExpressionError, match="nested"):
+        compile_expression("((((a + 1) + 1) + 1) + 1)")
+    with pytest.raises(ExpressionError, match="terms"):
+        compile_expression("(a + b) * (c + d)")
+    with pytest.raises(ExpressionError, match="longer"):
+        compile_expression("1" * (expressions.EXPRESSION_MAX_LENGTH + 1))
+    compile_expression.cache_clear()
+
+
+def test_missing_variable():
+    with pytest.raises(ExpressionError, match="Missing value for variable: b"):
+        evaluate("a + b", [{"a": 1}])
+
+
+@pytest.mark.parametrize("text", ["1" + "0" * 400, "1e400 * a"])
+def test_rejects_out_of_range_literals(text):
+    with pytest.raises(ExpressionError, match="Numeric literal out of range"):
+        compile_expression(text)
@@ -0,0 +1,44 @@
+import gzip
+
+import pytest
+
+from app import frontend
+from app.frontend import StaticPage, parse_accept_encoding
+
+BODY = b"<html>" + b"calculator " * 200 + b"</html>"
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip, br;q=0.5, identity;q=0") == {"gzip": 1.0, "br": 0.5, "identity": 0.0}
+    assert parse_accept_encoding(None) == {}
+    assert parse_accept_encoding("gzip;q=bogus") == {"gzip": 0.0}
+
+
+def test_variants_are_compressed_up_front():
+    page = StaticPage(BODY)
+    body, etag = page.variants["gzip"]
+    assert gzip.decompress(body) == BODY
+    assert len(body) < len(BODY)
+    assert len({etag for _, etag in page.variants.values()}) == len(page.variants)
+    # Rendering the same bytes again yields the same ETags, e.g. in every worker
+    assert StaticPage(BODY).variants["gzip"] == page.variants["gzip"]
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, "identity"),
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0, deflate", "identity"),
+    ("*", "gzip"),
+    ("deflate", "identity"),
+    ("identity;q=0", "identity"),
+])
+def test_negotiate_without_brotli(monkeypatch, header, expected):
+    monkeypatch.setattr(frontend, "brotli", None)
+    assert StaticPage(BODY).negotiate(header) == expected
+
+
+@pytest.mark.skipif(frontend.brotli is None, reason="brotli is not installed")
+def test_negotiate_prefers_brotli():
+    page = StaticPage(BODY)
+    assert page.negotiate("gzip, deflate, br") == "br"
+    assert page.negotiate("gzip, br;q=0.5") == "gzip"
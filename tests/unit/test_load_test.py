@@ -0,0 +1,31 @@
+from benchmarks.load_test import find_regressions, percentile
+
+
+def test_percentile_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 50) == 0.0
+
+
+def _entry(rps, p50, p95, p99, requests=100):
+    return {"requests": requests, "errors": 0, "rps": rps, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+def test_find_regressions_respects_threshold():
+    baseline = {"POST /add": _entry(100, 10, 20, 30), "GET /calculations": _entry(50, 5, 10, 15)}
+    within = {"POST /add": _entry(85, 11.9, 23, 35), "GET /calculations": _entry(50, 5, 10, 15)}
+    assert find_regressions(within, baseline, 0.2) == []
+
+    slower = {"POST /add": _entry(70, 10, 25, 30), "GET /calculations": _entry(50, 5, 10, 15)}
+    assert find_regressions(slower, baseline, 0.2) == [
+        "POST /add: p95_ms 20.00 -> 25.00",
+        "POST /add: rps 100.0 -> 70.0",
+    ]
+
+
+def test_find_regressions_skips_endpoints_without_samples():
+    baseline = {"DELETE /calculations/{id}": _entry(0, 0, 0, 0, requests=0)}
+    assert find_regressions({"DELETE /calculations/{id}": _entry(10, 5, 5, 5)}, baseline, 0.2) == []
@@ -0,0 +1,48 @@
+import logging
+import queue
+
+from app.logging_config import DroppingQueueHandler, RateLimiter, RouteSampler, parse_sample_rates
+
+
+def make_record(level=logging.INFO, msg="message", **extra):
+    record = logging.LogRecord("test", level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("/add=0.1, /divide=2,broken") == {"/add": 0.1, "/divide": 1.0}
+    assert parse_sample_rates("") == {}
+
+
+def test_route_sampler_only_samples_tagged_low_severity_records():
+    sampler = RouteSampler({"/add": 0.0})
+    assert not sampler.filter(make_record(route="/add"))
+    assert sampler.filter(make_record(route="/subtract"))
+    assert sampler.filter(make_record())
+    assert sampler.filter(make_record(level=logging.ERROR, route="/add"))
+
+
+def test_rate_limiter_suppresses_and_reports(monkeypatch):
+    from app import logging_config
+
+    now = [0.0]
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: now[0])
+    limiter = RateLimiter(burst=2, interval=60)
+    allowed = [limiter.filter(make_record(rate_limit_key="POST /add")) for _ in range(5)]
+    assert allowed == [True, True, False, False, False]
+    # Other keys have their own budget
+    assert limiter.filter(make_record(rate_limit_key="POST /divide"))
+
+    now[0] = 61.0
+    record = make_record(msg="bad request", rate_limit_key="POST /add")
+    assert limiter.filter(record)
+    assert record.msg == "bad request (suppressed 3 similar messages)"
+
+
+def test_dropping_queue_handler_never_blocks():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(make_record())
+    handler.handle(make_record())
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
@@ -0,0 +1,35 @@
+from app.metrics import Counter, Gauge, Histogram, HistogramFamily, Registry, histogram
+
+
+def test_histogram_snapshot_is_cumulative():
+    h = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        h.observe(value)
+    snapshot = h.snapshot()
+    assert snapshot["buckets"] == {0.1: 1, 1.0: 3, float("inf"): 4}
+    assert snapshot["count"] == 4
+    assert snapshot["max"] == 5.0
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests.", ("route",)))
+    in_flight = registry.register(Gauge("in_flight", "In flight."))
+    latency = registry.register(HistogramFamily("latency_seconds", "Latency.", ("route",), buckets=(0.5,)))
+    requests.inc("/add")
+    requests.inc("/add")
+    in_flight.set(value=3)
+    latency.observe(0.25, "/add")
+    source = Histogram(buckets=(1.0,))
+    source.observe(2.0)
+    registry.register_collector(lambda: [histogram("wait_seconds", "Wait.", source)])
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/add"} 2' in lines
+    assert "in_flight 3" in lines
+    assert 'latency_seconds_bucket{route="/add",le="0.5"} 1' in lines
+    assert 'latency_seconds_bucket{route="/add",le="+Inf"} 1' in lines
+    assert 'latency_seconds_count{route="/add"} 1' in lines
+    assert 'wait_seconds_bucket{le="1"} 0' in lines
+    assert "wait_seconds_count 1" in lines
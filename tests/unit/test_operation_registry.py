@@ -0,0 +1,66 @@
+import pytest
+
+from app import operation_registry
+from app.factory import CalculationFactory
+from app.operation_registry import OPERATIONS, Operation, compute_batch, get_operation, type_pattern
+
+
+@pytest.mark.parametrize("name, a, b, expected", [
+    ("power", 2, 10, 1024.0),
+    ("modulo", -7, 3, 2),
+    ("sqrt", 9, None, 3.0),
+])
+def test_new_operations(name, a, b, expected):
+    assert CalculationFactory.create_calculation(a, b, name) == expected
+
+
+@pytest.mark.parametrize("name, a, b, message", [
+    ("power", 10, 400, "too large"),
+    ("power", -8, 0.5, "undefined"),
+    ("modulo", 1, 0, "modulo by zero"),
+    ("sqrt", -1, None, "negative"),
+])
+def test_new_operations_errors(name, a, b, message):
+    with pytest.raises(ValueError, match=message):
+        get_operation(name).compute(a, b)
+
+
+def test_vector_kernels_match_scalar_kernels():
+    a, b = [7.0, 3.5, 2.0, 9.0], [2.0, -4.0, 3.0, 0.5]
+    for operation in OPERATIONS.values():
+        values, invalid = operation.compute_many(a, b)
+        assert not invalid.any(), operation.name
+        assert values.tolist() == pytest.approx([operation.compute(x, y) for x, y in zip(a, b)]), operation.name
+
+
+def test_compute_batch_groups_by_type():
+    results, errors = compute_batch(["add", "divide", "add", "divide", "log"], [1, 6, 2, 1, 1], [1, 3, 2, 0, 1])
+    assert results[:3].tolist() == [2.0, 2.0, 4.0]
+    assert errors == [None, None, None, "Cannot divide by zero!", "Invalid operation type: log"]
+
+
+def test_overflow_is_undefined():
+    with pytest.raises(ValueError, match="out of range"):
+        get_operation("multiply").compute(1e308, 10)
+    values, invalid = get_operation("add").compute_many([1e308, 1, float("inf")], [1e308, 2, 1])
+    assert invalid.tolist() == [True, False, False]
+    assert values[1] == 3.0 and values[2] == float("inf")
+    results, errors = compute_batch(["multiply", "divide", "add"], [1e308, 1e308, 1], [10, 0.1, 2])
+    assert errors == ["Result is out of range!", "Result is out of range!", None]
+    assert results[2] == 3.0
+
+
+def test_register_derives_vector_kernel(monkeypatch):
+    monkeypatch.setattr(operation_registry, "OPERATIONS", dict(OPERATIONS))
+
+    def hypot(a, b):
+        if a < 0 or b < 0:
+            raise ValueError("Negative side")
+        return (a * a + b * b) ** 0.5
+
+    operation = operation_registry.register("hypot", hypot)
+    assert isinstance(operation, Operation)
+    values, invalid = operation.compute_many([3, -1], [4, 1])
+    assert values[0] == 5.0
+    assert invalid.tolist() == [False, True]
+    assert "hypot" in type_pattern()
@@ -0,0 +1,47 @@
+from app.response_cache import ResponseCache
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = ResponseCache(max_bytes=10, max_entry_bytes=10)
+    cache.put(1, "a", b"1234")
+    cache.put(1, "b", b"1234")
+    assert cache.get(1, "a").body == b"1234"
+    cache.put(2, "c", b"1234")
+
+    assert cache.get(1, "b") is None
+    assert cache.get(1, "a") is not None
+    stats = cache.stats()
+    assert stats["bytes"] == 8
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_skips_oversized_entries():
+    cache = ResponseCache(max_bytes=100, max_entry_bytes=4)
+    entry = cache.put(1, "a", b"12345", {"X-Next-Cursor": "abc"})
+    assert entry.headers == {"X-Next-Cursor": "abc"}
+    assert cache.get(1, "a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_invalidate_user_only_drops_that_user():
+    cache = ResponseCache(max_bytes=100, max_entry_bytes=100)
+    cache.put(1, "a", b"one")
+    cache.put(1, "b", b"two")
+    cache.put(2, "a", b"three")
+    cache.invalidate_user(1)
+
+    assert cache.get(1, "a") is None
+    assert cache.get(2, "a").body == b"three"
+    assert cache.stats()["bytes"] == 5
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_to_response_sets_validators():
+    cache = ResponseCache(max_bytes=100, max_entry_bytes=100)
+    response = cache.put(1, '"tag"', b"[]", {"X-Next-Cursor": "abc"}).to_response('"tag"')
+    assert response.body == b"[]"
+    assert response.headers["ETag"] == '"tag"'
+    assert response.headers["X-Next-Cursor"] == "abc"
+    assert response.headers["Content-Type"] == "application/json"
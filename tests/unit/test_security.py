@@ -1,3 +1,5 @@
+import pytest
+
 from app.security import hash_password, verify_password
 
 
@@ -8,3 +10,70 @@ def test_hash_and_verify_password():
     assert password_hash != raw_password
     assert verify_password(raw_password, password_hash)
     assert not verify_password("wrongpassword", password_hash)
+
+
+def test_user_cache_lru_and_ttl(monkeypatch):
+    from app import security
+    from app.models import User
+
+    now = [1000.0]
+    monkeypatch.setattr(security.time, "monotonic", lambda: now[0])
+    cache = security.UserCache(maxsize=2, ttl=10)
+    for name in ("alice", "bob", "carol"):
+        cache.set(name, User(id=1, username=name, email=f"{name}@example.com", password_hash="x"))
+
+    # "alice" was evicted as least recently used
+    assert cache.get("alice") is None
+    assert cache.get("bob")["username"] == "bob"
+
+    now[0] += 11
+    assert cache.get("carol") is None
+    assert cache.stats() == {"size": 1, "maxsize": 2, "hits": 1, "misses": 2}
+
+    cache.invalidate("bob")
+    assert cache.stats()["size"] == 0
+
+
+def test_hash_pool_rejects_when_full():
+    from app.hashing import HashPool, HashingOverloaded, compute_hash
+
+    pool = HashPool(workers=0, queue_size=0, retry_after=3)
+    with pytest.raises(HashingOverloaded) as excinfo:
+        pool.run(compute_hash, "supersecret123")
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.headers == {"Retry-After": "3"}
+    assert pool.stats()["rejected"] == 1
+
+
+def test_hash_pool_worker_process_and_stats():
+    from app.hashing import HashPool, check_hash, compute_hash
+
+    pool = HashPool(workers=1, queue_size=4)
+    try:
+        password_hash = pool.run(compute_hash, "supersecret123")
+        assert pool.run(check_hash, "supersecret123", password_hash)
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] == 1
+    assert stats["latency"]["count"] == 2
+
+
+def test_hash_pool_replaces_a_broken_executor():
+    import os
+    from concurrent.futures.process import BrokenProcessPool
+
+    from app.hashing import HashPool, check_hash, compute_hash
+
+    pool = HashPool(workers=1, queue_size=4)
+    try:
+        # A worker dying breaks its executor...
+        with pytest.raises(BrokenProcessPool):
+            pool.run(os._exit, 1)
+        # ...which is replaced for the next job
+        assert pool.run(check_hash, "supersecret123", pool.run(compute_hash, "supersecret123"))
+    finally:
+        pool.shutdown()
+    assert pool.stats()["queue_depth"] == 0